@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Path, HTTPException, File, UploadFile, Depends
-from typing import List
+from typing import List, Optional
 from dependencies import get_es_client
 from elasticsearch import AsyncElasticsearch
 from service.data.data_loader_elastic_search import (
@@ -12,6 +12,7 @@ from service.data.data_loader_elastic_search import (
     delete_documents_by_customer,
     bulk_delete_documents
 )
+from service.data.es_write_policy import RefreshPolicy, RefreshQuery
 from service.models.schemas import AccessoryRow, BulkDeleteInput
 from service.utils.helpers import sanitize_for_es
 router = APIRouter()
@@ -48,7 +49,8 @@ ACCESSORY_COLUMNS_CONFIG = {
 @router.post("/upload-accessory/{customer_id}")
 async def upload_accessory_data(
     customer_id: str = Path(..., description="Mã khách hàng."),
-    file: UploadFile = File(..., description="File Excel chứa dữ liệu phụ kiện."),
+    file: UploadFile = File(..., description="File Excel (.xlsx/.xls), CSV hoặc Parquet chứa dữ liệu phụ kiện."),
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -60,14 +62,15 @@ async def upload_accessory_data(
         raise HTTPException(status_code=503, detail="Không thể kết nối đến Elasticsearch.")
     
     try:
-        content = await file.read()
         sanitized_customer_id = sanitize_for_es(customer_id)
         success, failed = await process_and_index_data(
             es_client=es_client,
             customer_id=sanitized_customer_id,
             index_name=ACCESSORIES_INDEX,
-            file_content=content,
-            columns_config=ACCESSORY_COLUMNS_CONFIG
+            file_content=file.file,
+            filename=file.filename,
+            columns_config=ACCESSORY_COLUMNS_CONFIG,
+            refresh=refresh
         )
         
         return {
@@ -85,6 +88,7 @@ async def upload_accessory_data(
 async def add_accessory(
     customer_id: str,
     accessory_data: AccessoryRow,
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -99,7 +103,7 @@ async def add_accessory(
         if not doc_id:
             raise HTTPException(status_code=400, detail="Thiếu 'accessory_code' trong dữ liệu đầu vào.")
 
-        response = await index_single_document(es_client, ACCESSORIES_INDEX, sanitized_customer_id, doc_id, accessory_dict)
+        response = await index_single_document(es_client, ACCESSORIES_INDEX, sanitized_customer_id, doc_id, accessory_dict, refresh=refresh)
         return {"message": "Phụ kiện đã được thêm/cập nhật thành công.", "result": response.body}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -109,6 +113,7 @@ async def update_accessory(
     customer_id: str,
     accessory_id: str,
     accessory_data: AccessoryRow,
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -135,7 +140,8 @@ async def update_accessory(
             ACCESSORIES_INDEX, 
             sanitized_customer_id, 
             accessory_id, 
-            accessory_dict
+            accessory_dict,
+            refresh=refresh
         )
         
         result_status = response.body.get('result')
@@ -154,6 +160,7 @@ async def update_accessory(
 async def delete_accessory(
     customer_id: str,
     accessory_id: str,
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -163,7 +170,7 @@ async def delete_accessory(
         raise HTTPException(status_code=503, detail="Không thể kết nối đến Elasticsearch.")
     try:
         sanitized_customer_id = sanitize_for_es(customer_id)
-        response = await delete_single_document(es_client, ACCESSORIES_INDEX, sanitized_customer_id, accessory_id)
+        response = await delete_single_document(es_client, ACCESSORIES_INDEX, sanitized_customer_id, accessory_id, refresh=refresh)
         return {"message": "Phụ kiện đã được xóa thành công.", "result": response.body}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -172,6 +179,7 @@ async def delete_accessory(
 async def add_accessories_bulk(
     customer_id: str,
     accessories: List[AccessoryRow],
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -188,7 +196,8 @@ async def add_accessories_bulk(
             ACCESSORIES_INDEX, 
             sanitized_customer_id, 
             accessory_dicts, 
-            id_field='accessory_code'
+            id_field='accessory_code',
+            refresh=refresh
         )
         return {
             "message": "Thao tác hàng loạt hoàn tất.",
@@ -201,7 +210,8 @@ async def add_accessories_bulk(
 @router.post("/insert-accessory/{customer_id}")
 async def append_accessory_data_from_file(
     customer_id: str = Path(..., description="Mã khách hàng."),
-    file: UploadFile = File(..., description="File Excel chứa dữ liệu phụ kiện để nạp thêm."),
+    file: UploadFile = File(..., description="File Excel (.xlsx/.xls), CSV hoặc Parquet chứa dữ liệu phụ kiện để nạp thêm."),
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -212,14 +222,15 @@ async def append_accessory_data_from_file(
         raise HTTPException(status_code=503, detail="Không thể kết nối đến Elasticsearch.")
     
     try:
-        content = await file.read()
         sanitized_customer_id = sanitize_for_es(customer_id)
         success, failed_items = await process_and_upsert_file_data(
             es_client=es_client,
             customer_id=sanitized_customer_id,
             index_name=ACCESSORIES_INDEX,
-            file_content=content,
-            columns_config=ACCESSORY_COLUMNS_CONFIG
+            file_content=file.file,
+            filename=file.filename,
+            columns_config=ACCESSORY_COLUMNS_CONFIG,
+            refresh=refresh
         )
         
         return {
@@ -235,6 +246,7 @@ async def append_accessory_data_from_file(
 @router.delete("/accessories/{customer_id}")
 async def delete_all_accessories_by_customer(
     customer_id: str = Path(..., description="Mã khách hàng để xóa tất cả phụ kiện."),
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -247,7 +259,8 @@ async def delete_all_accessories_by_customer(
         response = await delete_documents_by_customer(
             es_client, 
             ACCESSORIES_INDEX, 
-            sanitized_customer_id
+            sanitized_customer_id,
+            refresh=refresh
         )
         deleted_count = response.get('deleted', 0)
         return {"message": f"Đã xóa thành công {deleted_count} phụ kiện cho khách hàng '{customer_id}'.", "details": response}
@@ -258,6 +271,7 @@ async def delete_all_accessories_by_customer(
 async def delete_accessories_bulk(
     customer_id: str,
     delete_input: BulkDeleteInput,
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -272,7 +286,8 @@ async def delete_accessories_bulk(
             ACCESSORIES_INDEX,
             sanitized_customer_id,
             delete_input.ids,
-            id_field="accessory_code"
+            id_field="accessory_code",
+            refresh=refresh
         )
         deleted_count = response.get('deleted', 0)
         return {"message": f"Đã xóa thành công {deleted_count} phụ kiện.", "details": response}
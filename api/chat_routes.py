@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Path, HTTPException, Depends
+from fastapi import APIRouter, Path, Query, HTTPException, Depends
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from service.agents.agent_service import create_agent_executor, invoke_agent_with_memory, clear_chat_history_for_customer
-from service.models.schemas import ChatbotRequest, ChatHistoryResponse
+from service.agents.agent_service import create_agent_executor, invoke_agent_with_memory, clear_chat_history_for_customer, get_chat_model
+from service.models.schemas import ChatbotRequest, ChatHistoryResponse, CompactChatHistoryResponse
 from database.database import get_db, Customer, ChatThread, ChatHistory, ChatCustomer
 from elasticsearch import AsyncElasticsearch
 from dependencies import get_es_client
-from typing import List
+from typing import List, Optional
+from sqlalchemy import and_
 
 router = APIRouter()
 
@@ -70,14 +71,15 @@ async def chat(
             customer_config.service_feature_enabled = '2' in access_str
             customer_config.accessory_feature_enabled = '3' in access_str
             
+        llm = get_chat_model(llm_provider, api_key, customer_id=customer_id)
+        fast_llm = get_chat_model(llm_provider, api_key, tier="fast", customer_id=customer_id)
         agent_executor = create_agent_executor(
             es_client=es_client,
             db=db,
             customer_id=customer_id,
             customer_config=customer_config,
             thread_id=threadId,
-            llm_provider=llm_provider,
-            api_key=api_key
+            llm=llm
         )
 
         response = await invoke_agent_with_memory(
@@ -86,7 +88,10 @@ async def chat(
             threadId, 
             user_input, 
             db,
-            es_client=es_client
+            es_client=es_client,
+            llm=llm,
+            fast_llm=fast_llm,
+            customer_config=customer_config
         )
 
         return {"response": response['output']}
@@ -108,7 +113,17 @@ async def get_chat_history(
     """
     Lấy toàn bộ lịch sử chat của một thread_id của customer_id theo thứ tự mới nhất đến cũ nhất.
     """
-    history = db.query(ChatHistory).filter(
+    history = db.query(
+        ChatHistory.id,
+        ChatHistory.customer_id,
+        ChatHistory.thread_id,
+        ChatThread.thread_name,
+        ChatHistory.role,
+        ChatHistory.message
+    ).outerjoin(ChatThread, and_(
+        ChatThread.customer_id == ChatHistory.customer_id,
+        ChatThread.thread_id == ChatHistory.thread_id
+    )).filter(
         ChatHistory.customer_id == customer_id,
         ChatHistory.thread_id == thread_id
     ).order_by(ChatHistory.id.desc()).all()
@@ -116,7 +131,45 @@ async def get_chat_history(
     if not history:
         raise HTTPException(status_code=404, detail="Không tìm thấy lịch sử chat.")
         
-    return history
+    return [row._asdict() for row in history]
+
+@router.get("/chat-history/{customer_id}/{thread_id}/compact", response_model=CompactChatHistoryResponse)
+async def get_compact_chat_history(
+    customer_id: str = Path(..., description="Mã khách hàng."),
+    thread_id: str = Path(..., description="Mã phiên chat."),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Số tin nhắn tối đa (mới nhất trước)."),
+    before_id: Optional[int] = Query(None, description="Chỉ lấy tin nhắn có id nhỏ hơn giá trị này (trang tiếp theo)."),
+    db: Session = Depends(get_db)
+):
+    """
+    Lịch sử chat của một thread dạng gọn: tên và trạng thái thread trả về một lần,
+    mỗi tin nhắn chỉ gồm id, role và nội dung (mới nhất trước).
+    """
+    query = db.query(ChatHistory.id, ChatHistory.role, ChatHistory.message).filter(
+        ChatHistory.customer_id == customer_id,
+        ChatHistory.thread_id == thread_id
+    )
+    if before_id is not None:
+        query = query.filter(ChatHistory.id < before_id)
+    query = query.order_by(ChatHistory.id.desc())
+    if limit:
+        query = query.limit(limit)
+    messages = query.all()
+
+    thread = db.query(ChatThread).filter(
+        ChatThread.customer_id == customer_id,
+        ChatThread.thread_id == thread_id
+    ).first()
+    if not messages and not thread:
+        raise HTTPException(status_code=404, detail="Không tìm thấy lịch sử chat.")
+
+    return {
+        "customer_id": customer_id,
+        "thread_id": thread_id,
+        "thread_name": thread.thread_name if thread else None,
+        "status": thread.status if thread else None,
+        "messages": [row._asdict() for row in messages]
+    }
 
 @router.post("/chat-history-clear/{customer_id}")
 async def clear_history(
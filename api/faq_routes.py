@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Path, HTTPException, Depends, File, UploadFile
 from fastapi.responses import StreamingResponse
-from typing import List
+from typing import List, Optional
 from dependencies import get_es_client
 from elasticsearch import AsyncElasticsearch
 from service.data.data_loader_elastic_search import (
@@ -10,6 +10,9 @@ from service.data.data_loader_elastic_search import (
     delete_documents_by_customer,
     process_and_upsert_file_data
 )
+from service.data.catalog_generation import catalog_filter
+from service.data.tenant_placement import resolve_search_target
+from service.data.es_write_policy import RefreshPolicy, RefreshQuery
 from service.models.schemas import FaqRow, FaqCreate
 from service.utils.helpers import sanitize_for_es
 import hashlib
@@ -34,21 +37,20 @@ FAQ_COLUMNS_CONFIG = {
 
 async def get_all_faqs_by_customer(es_client: AsyncElasticsearch, index_name: str, customer_id: str):
     """Lấy tất cả các document của một customer_id."""
+    search_index, search_routing = await resolve_search_target(index_name, customer_id)
     try:
         response = await es_client.search(
-            index=index_name,
+            index=search_index,
             body={
                 "query": {
-                    "term": {
-                        "customer_id": customer_id
-                    }
+                    "bool": {"filter": await catalog_filter(index_name, customer_id)}
                 },
                 "size": 1000,
                 "sort": [
                     {"created_at": {"order": "desc"}} 
                 ] 
             },
-            routing=customer_id
+            routing=search_routing
         )
         return [hit['_source'] for hit in response['hits']['hits']]
     except Exception as e:
@@ -71,6 +73,7 @@ async def get_all_faqs(
 async def add_faq(
     customer_id: str,
     faq_data: FaqCreate,
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """Thêm mới một cặp FAQ. ID sẽ được tự động tạo."""
@@ -99,7 +102,7 @@ async def add_faq(
         faq_dict['faq_id'] = doc_id
         faq_dict['created_at'] = datetime.now(timezone.utc)
         
-        response = await index_single_document(es_client, FAQ_INDEX, sanitized_customer_id, doc_id, faq_dict)
+        response = await index_single_document(es_client, FAQ_INDEX, sanitized_customer_id, doc_id, faq_dict, refresh=refresh)
         return {"message": "FAQ đã được thêm thành công.", "faq_id": doc_id, "result": response.body}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -109,6 +112,7 @@ async def update_faq(
     customer_id: str,
     faq_id: str,
     faq_data: FaqCreate,
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -141,7 +145,8 @@ async def update_faq(
             FAQ_INDEX, 
             sanitized_customer_id, 
             faq_id, 
-            faq_dict
+            faq_dict,
+            refresh=refresh
         )
 
         result_status = response.body.get('result')
@@ -160,6 +165,7 @@ async def update_faq(
 async def delete_faq(
     customer_id: str,
     faq_id: str,
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """Xóa một cặp FAQ."""
@@ -167,7 +173,7 @@ async def delete_faq(
         raise HTTPException(status_code=503, detail="Không thể kết nối đến Elasticsearch.")
     try:
         sanitized_customer_id = sanitize_for_es(customer_id)
-        response = await delete_single_document(es_client, FAQ_INDEX, sanitized_customer_id, faq_id)
+        response = await delete_single_document(es_client, FAQ_INDEX, sanitized_customer_id, faq_id, refresh=refresh)
         return {"message": "FAQ đã được xóa thành công.", "result": response.body}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -175,6 +181,7 @@ async def delete_faq(
 @router.delete("/faqs/{customer_id}")
 async def delete_all_faqs(
     customer_id: str = Path(..., description="Mã khách hàng để xóa tất cả FAQs."),
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """Xóa TẤT CẢ các cặp FAQ của một khách hàng."""
@@ -182,7 +189,7 @@ async def delete_all_faqs(
         raise HTTPException(status_code=503, detail="Không thể kết nối đến Elasticsearch.")
     try:
         sanitized_customer_id = sanitize_for_es(customer_id)
-        response = await delete_documents_by_customer(es_client, FAQ_INDEX, sanitized_customer_id)
+        response = await delete_documents_by_customer(es_client, FAQ_INDEX, sanitized_customer_id, refresh=refresh)
         deleted_count = response.get('deleted', 0)
         return {"message": f"Đã xóa thành công {deleted_count} FAQs cho khách hàng '{customer_id}'.", "details": response}
     except Exception as e:
@@ -191,7 +198,8 @@ async def delete_all_faqs(
 @router.post("/insert-faq/{customer_id}")
 async def append_faq_data_from_file(
     customer_id: str = Path(..., description="Mã khách hàng."),
-    file: UploadFile = File(..., description="File Excel chứa dữ liệu FAQ để nạp thêm."),
+    file: UploadFile = File(..., description="File Excel (.xlsx/.xls), CSV hoặc Parquet chứa dữ liệu FAQ để nạp thêm."),
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -202,14 +210,15 @@ async def append_faq_data_from_file(
         raise HTTPException(status_code=503, detail="Không thể kết nối đến Elasticsearch.")
     
     try:
-        content = await file.read()
         sanitized_customer_id = sanitize_for_es(customer_id)
         success, failed_items = await process_and_upsert_file_data(
             es_client=es_client,
             customer_id=sanitized_customer_id,
             index_name=FAQ_INDEX,
-            file_content=content,
-            columns_config=FAQ_COLUMNS_CONFIG
+            file_content=file.file,
+            filename=file.filename,
+            columns_config=FAQ_COLUMNS_CONFIG,
+            refresh=refresh
         )
         
         return {
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
 from service.models.schemas import StoreInfo, StoreInfoUpdate
 from database.database import get_db, StoreInfo as StoreInfoModel
+from service.utils.store_info_cache import invalidate_store_info
 
 router = APIRouter()
 
@@ -15,6 +16,7 @@ def get_or_create_store_info(db: Session, customer_id: str) -> StoreInfoModel:
         db.add(store_info)
         db.commit()
         db.refresh(store_info)
+        invalidate_store_info(customer_id)
     return store_info
 
 @router.get("/store-info/{customer_id}", response_model=StoreInfo)
@@ -47,6 +49,7 @@ async def update_store_info(
         
         db.commit()
         db.refresh(store_info)
+        invalidate_store_info(customer_id)
         
         return {
             "message": f"Thông tin cửa hàng của khách hàng '{customer_id}' đã được cập nhật.",
@@ -76,6 +79,7 @@ async def delete_store_info(customer_id: str, db: Session = Depends(get_db)):
             store_info.info_more = None
             
             db.commit()
+            invalidate_store_info(customer_id)
             return {"message": f"Thông tin cửa hàng của khách hàng '{customer_id}' đã được reset về mặc định."}
         else:
             return {"message": f"Không tìm thấy thông tin cửa hàng cho khách hàng '{customer_id}'."}
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from database.database import get_db, SystemInstruction
 from service.models.schemas import InstructionsUpdate, Instruction
 from typing import List
+from service.agents.instruction_store import bump_instruction_version, refresh_instruction_snapshot
 
 router = APIRouter()
 
@@ -32,7 +33,9 @@ def update_instructions(
             db.add(instruction)
         updated_instructions.append(instruction)
     
+    bump_instruction_version(db)
     db.commit()
+    refresh_instruction_snapshot()
     
     for instruction in updated_instructions:
         db.refresh(instruction)
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from sqlalchemy import select, func, union_all, literal, cast, null, tuple_, String, Integer
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 from pydantic import BaseModel, ConfigDict, Field
 
 from database.database import get_db, ProductOrder, ServiceOrder, AccessoryOrder
+from config.settings import SHOP_TIMEZONE
 
 router = APIRouter()
 
@@ -38,69 +41,147 @@ class AccessoryOrderResponse(BaseOrderResponse):
     ten_phu_kien: str
     so_luong: int
 
+class OrderFeedItem(BaseOrderResponse):
+    order_type: str
+    ma_san_pham: Optional[str] = None
+    ten_san_pham: Optional[str] = None
+    ma_dich_vu: Optional[str] = None
+    ten_dich_vu: Optional[str] = None
+    loai_dich_vu: Optional[str] = None
+    ten_san_pham_sua_chua: Optional[str] = None
+    ma_phu_kien: Optional[str] = None
+    ten_phu_kien: Optional[str] = None
+    so_luong: Optional[int] = None
+
 class AllOrdersResponse(BaseModel):
+    """Mặc định chỉ có `orders`/`next_cursor`; với group_by_type=true chỉ có ba danh sách theo loại."""
     customer_id: str
     total_orders: int
-    product_orders: List[ProductOrderResponse]
-    service_orders: List[ServiceOrderResponse]
-    accessory_orders: List[AccessoryOrderResponse]
+    orders: Optional[List[OrderFeedItem]] = None
+    next_cursor: Optional[str] = None
+    product_orders: Optional[List[ProductOrderResponse]] = None
+    service_orders: Optional[List[ServiceOrderResponse]] = None
+    accessory_orders: Optional[List[AccessoryOrderResponse]] = None
+
+# Loại đơn hàng -> (model, tiền tố order_id do tools.py sinh ra)
+ORDER_MODELS = {
+    "product": (ProductOrder, "DHSP_"),
+    "service": (ServiceOrder, "DHDV_"),
+    "accessory": (AccessoryOrder, "DHPK_"),
+}
+
+_ORDER_COMMON_COLUMNS = (
+    "order_id", "customer_id", "thread_id", "ten_khach_hang", "so_dien_thoai",
+    "dia_chi", "loai_don_hang", "status", "created_at"
+)
+_ORDER_DETAIL_COLUMNS = {
+    "ma_san_pham": String, "ten_san_pham": String, "ma_dich_vu": String, "ten_dich_vu": String,
+    "loai_dich_vu": String, "ten_san_pham_sua_chua": String, "ma_phu_kien": String,
+    "ten_phu_kien": String, "so_luong": Integer
+}
+
+def _unified_orders(customer_id: str, thread_id: Optional[str] = None):
+    """
+    Gộp ba bảng đơn hàng bằng UNION ALL thành một bảng con chung cột (cột không có ở bảng nào
+    thì là NULL), mỗi nhánh đã lọc theo customer_id/thread_id để dùng chỉ mục của từng bảng.
+    """
+    selects = []
+    for order_type, (model, _) in ORDER_MODELS.items():
+        columns = [getattr(model, name) for name in _ORDER_COMMON_COLUMNS]
+        columns.append(literal(order_type).label("order_type"))
+        for name, column_type in _ORDER_DETAIL_COLUMNS.items():
+            column = getattr(model, name, None)
+            columns.append(column.label(name) if column is not None else cast(null(), column_type).label(name))
+        query = select(*columns).where(model.customer_id == customer_id)
+        if thread_id:
+            query = query.where(model.thread_id == thread_id)
+        selects.append(query)
+    return union_all(*selects).subquery("orders")
+
+def _local_day(created_at, dialect_name: str):
+    """Ngày theo múi giờ cửa hàng của cột created_at (lưu giờ UTC, không kèm múi giờ)."""
+    if dialect_name == "postgresql":
+        return func.date(func.timezone(SHOP_TIMEZONE, func.timezone("UTC", created_at)))
+    # SQLite (môi trường benchmark) không có bảng múi giờ: dùng độ lệch hiện tại của múi giờ cửa hàng.
+    offset = datetime.now(ZoneInfo(SHOP_TIMEZONE)).utcoffset()
+    return func.date(created_at, f"{int(offset.total_seconds())} seconds")
 
-@router.get("/orders/{customer_id}", response_model=AllOrdersResponse)
+def _encode_cursor(created_at: datetime, order_id: str) -> str:
+    return f"{created_at.isoformat()}|{order_id}"
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, order_id = cursor.split("|", 1)
+        return datetime.fromisoformat(created_at), order_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor không hợp lệ.")
+
+def _orders_by_type(db: Session, customer_id: str, thread_id: Optional[str], limit: Optional[int],
+                    offset: Optional[int]) -> AllOrdersResponse:
+    # Dạng cũ: mỗi loại đơn một danh sách, limit/offset áp dụng riêng cho từng loại.
+    lists = {}
+    for order_type, (model, _) in ORDER_MODELS.items():
+        query = db.query(model).filter(model.customer_id == customer_id)
+        if thread_id:
+            query = query.filter(model.thread_id == thread_id)
+        query = query.order_by(model.created_at.desc())
+        if limit:
+            query = query.offset(offset).limit(limit)
+        lists[order_type] = query.all()
+    return AllOrdersResponse(
+        customer_id=customer_id,
+        total_orders=sum(len(orders) for orders in lists.values()),
+        product_orders=[ProductOrderResponse.model_validate(order) for order in lists["product"]],
+        service_orders=[ServiceOrderResponse.model_validate(order) for order in lists["service"]],
+        accessory_orders=[AccessoryOrderResponse.model_validate(order) for order in lists["accessory"]]
+    )
+
+@router.get("/orders/{customer_id}", response_model=AllOrdersResponse, response_model_exclude_unset=True)
 async def get_all_orders_by_customer(
     customer_id: str = Path(..., description="Mã khách hàng"),
     thread_id: Optional[str] = Query(None, description="Lọc theo thread_id (tùy chọn)"),
-    limit: Optional[int] = Query(None, description="Giới hạn số lượng đơn hàng trả về"),
+    limit: Optional[int] = Query(None, description="Số đơn hàng tối đa của cả trang (với group_by_type=true: của mỗi loại)"),
     offset: Optional[int] = Query(0, description="Bỏ qua số lượng đơn hàng"),
+    cursor: Optional[str] = Query(None, description="Lấy trang tiếp theo sau cursor (next_cursor của trang trước)"),
+    group_by_type: bool = Query(False, description="Trả về dạng cũ: ba danh sách product_orders/service_orders/accessory_orders thay cho orders"),
     db: Session = Depends(get_db)
 ):
     """
-    Lấy tất cả đơn hàng của một customer_id.
-    Có thể lọc theo thread_id và phân trang.
+    Lấy tất cả đơn hàng của một customer_id, mới nhất trước, bằng một truy vấn gộp cả ba loại đơn
+    (`orders`). Có thể lọc theo thread_id và phân trang bằng cursor (khuyến nghị) hoặc offset; `limit`
+    là số đơn của cả trang. Với group_by_type=true, trả về ba danh sách theo loại như trước, `limit`
+    áp dụng cho từng loại.
     """
     try:
-        # Base queries
-        product_query = db.query(ProductOrder).filter(ProductOrder.customer_id == customer_id)
-        service_query = db.query(ServiceOrder).filter(ServiceOrder.customer_id == customer_id)
-        accessory_query = db.query(AccessoryOrder).filter(AccessoryOrder.customer_id == customer_id)
+        if group_by_type:
+            return _orders_by_type(db, customer_id, thread_id, limit, offset)
 
-        # Filter by thread_id if provided
-        if thread_id:
-            product_query = product_query.filter(ProductOrder.thread_id == thread_id)
-            service_query = service_query.filter(ServiceOrder.thread_id == thread_id)
-            accessory_query = accessory_query.filter(AccessoryOrder.thread_id == thread_id)
-
-        # Order by created_at desc (newest first)
-        product_query = product_query.order_by(ProductOrder.created_at.desc())
-        service_query = service_query.order_by(ServiceOrder.created_at.desc())
-        accessory_query = accessory_query.order_by(AccessoryOrder.created_at.desc())
-
-        # Apply pagination if specified
+        orders = _unified_orders(customer_id, thread_id)
+        query = select(orders)
+        if cursor:
+            cursor_created_at, cursor_order_id = _decode_cursor(cursor)
+            query = query.where(tuple_(orders.c.created_at, orders.c.order_id) < tuple_(cursor_created_at, cursor_order_id))
+        query = query.order_by(orders.c.created_at.desc(), orders.c.order_id.desc())
         if limit:
-            product_query = product_query.offset(offset).limit(limit)
-            service_query = service_query.offset(offset).limit(limit)
-            accessory_query = accessory_query.offset(offset).limit(limit)
-
-        # Execute queries
-        product_orders = product_query.all()
-        service_orders = service_query.all()
-        accessory_orders = accessory_query.all()
+            query = query.limit(limit)
+            if offset and not cursor:
+                query = query.offset(offset)
+        rows = [dict(row) for row in db.execute(query).mappings()]
 
-        # Calculate total orders
-        total_orders = len(product_orders) + len(service_orders) + len(accessory_orders)
-
-        # Convert to response models
-        product_responses = [ProductOrderResponse.model_validate(order) for order in product_orders]
-        service_responses = [ServiceOrderResponse.model_validate(order) for order in service_orders]
-        accessory_responses = [AccessoryOrderResponse.model_validate(order) for order in accessory_orders]
+        feed = [OrderFeedItem.model_validate(row) for row in rows]
+        next_cursor = None
+        if limit and len(rows) == limit:
+            next_cursor = _encode_cursor(rows[-1]["created_at"], rows[-1]["order_id"])
 
         return AllOrdersResponse(
             customer_id=customer_id,
-            total_orders=total_orders,
-            product_orders=product_responses,
-            service_orders=service_responses,
-            accessory_orders=accessory_responses
+            total_orders=len(feed),
+            orders=feed,
+            next_cursor=next_cursor
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Lỗi khi lấy đơn hàng: {str(e)}")
 
@@ -204,36 +285,41 @@ async def get_accessory_orders_by_customer(
 async def get_orders_summary_by_customer(
     customer_id: str = Path(..., description="Mã khách hàng"),
     thread_id: Optional[str] = Query(None, description="Lọc theo thread_id (tùy chọn)"),
+    days: Optional[int] = Query(None, ge=1, description="Chỉ tính đơn hàng trong số ngày gần nhất (tùy chọn)"),
     db: Session = Depends(get_db)
 ):
     """
-    Lấy tóm tắt đơn hàng của một customer_id (chỉ số lượng).
+    Lấy tóm tắt đơn hàng của một customer_id: số lượng theo loại, theo trạng thái và theo ngày,
+    tính bằng một truy vấn GROUP BY (loại × trạng thái × ngày) trên danh sách đơn gộp.
     """
     try:
-        # Base queries for counting
-        product_query = db.query(ProductOrder).filter(ProductOrder.customer_id == customer_id)
-        service_query = db.query(ServiceOrder).filter(ServiceOrder.customer_id == customer_id)
-        accessory_query = db.query(AccessoryOrder).filter(AccessoryOrder.customer_id == customer_id)
-
-        # Filter by thread_id if provided
-        if thread_id:
-            product_query = product_query.filter(ProductOrder.thread_id == thread_id)
-            service_query = service_query.filter(ServiceOrder.thread_id == thread_id)
-            accessory_query = accessory_query.filter(AccessoryOrder.thread_id == thread_id)
+        orders = _unified_orders(customer_id, thread_id)
+        day = _local_day(orders.c.created_at, db.get_bind().dialect.name)
+        query = select(
+            orders.c.order_type, orders.c.status, day.label("day"), func.count().label("count")
+        ).group_by(orders.c.order_type, orders.c.status, day)
+        if days:
+            query = query.where(orders.c.created_at >= datetime.now(timezone.utc) - timedelta(days=days))
 
-        # Count orders
-        product_count = product_query.count()
-        service_count = service_query.count()
-        accessory_count = accessory_query.count()
-        total_count = product_count + service_count + accessory_count
+        counts_by_type = {order_type: 0 for order_type in ORDER_MODELS}
+        counts_by_status = {}
+        counts_by_day = {}
+        for order_type, status, order_day, count in db.execute(query):
+            counts_by_type[order_type] += count
+            counts_by_status[status] = counts_by_status.get(status, 0) + count
+            if order_day is not None:
+                order_day = str(order_day)
+                counts_by_day[order_day] = counts_by_day.get(order_day, 0) + count
 
         return {
             "customer_id": customer_id,
             "thread_id": thread_id,
-            "total_orders": total_count,
-            "product_orders_count": product_count,
-            "service_orders_count": service_count,
-            "accessory_orders_count": accessory_count
+            "total_orders": sum(counts_by_type.values()),
+            "product_orders_count": counts_by_type["product"],
+            "service_orders_count": counts_by_type["service"],
+            "accessory_orders_count": counts_by_type["accessory"],
+            "by_status": counts_by_status,
+            "by_day": dict(sorted(counts_by_day.items(), reverse=True))
         }
 
     except Exception as e:
@@ -255,53 +341,30 @@ async def update_order_status(
     Cập nhật trạng thái của đơn hàng dựa theo customer_id, thread_id và order_id.
     """
     try:
-        # Try to find the order in all three tables
-        order = None
+        # Tiền tố order_id cho biết bảng chứa đơn; mã không theo quy ước thì thử lần lượt các bảng.
+        candidates = [
+            (order_type, model) for order_type, (model, prefix) in ORDER_MODELS.items()
+            if order_id.startswith(prefix)
+        ] or [(order_type, model) for order_type, (model, _) in ORDER_MODELS.items()]
+
         order_type = None
-        
-        # Check ProductOrder first
-        product_order = db.query(ProductOrder).filter(
-            ProductOrder.customer_id == customer_id,
-            ProductOrder.thread_id == thread_id,
-            ProductOrder.order_id == order_id
-        ).first()
-        
-        if product_order:
-            order = product_order
-            order_type = "product"
-        else:
-            # Check ServiceOrder
-            service_order = db.query(ServiceOrder).filter(
-                ServiceOrder.customer_id == customer_id,
-                ServiceOrder.thread_id == thread_id,
-                ServiceOrder.order_id == order_id
-            ).first()
-            
-            if service_order:
-                order = service_order
-                order_type = "service"
-            else:
-                # Check AccessoryOrder
-                accessory_order = db.query(AccessoryOrder).filter(
-                    AccessoryOrder.customer_id == customer_id,
-                    AccessoryOrder.thread_id == thread_id,
-                    AccessoryOrder.order_id == order_id
-                ).first()
-                
-                if accessory_order:
-                    order = accessory_order
-                    order_type = "accessory"
-        
-        if not order:
+        for candidate_type, model in candidates:
+            updated = db.query(model).filter(
+                model.order_id == order_id,
+                model.customer_id == customer_id,
+                model.thread_id == thread_id
+            ).update({model.status: request.status}, synchronize_session=False)
+            if updated:
+                order_type = candidate_type
+                break
+
+        if not order_type:
             raise HTTPException(
                 status_code=404, 
                 detail=f"Không tìm thấy đơn hàng với customer_id={customer_id}, thread_id={thread_id}, order_id={order_id}"
             )
-        
-        # Update status
-        order.status = request.status
+
         db.commit()
-        db.refresh(order)
         
         return {
             "message": "Cập nhật trạng thái thành công",
@@ -309,7 +372,7 @@ async def update_order_status(
             "thread_id": thread_id,
             "order_id": order_id,
             "order_type": order_type,
-            "status": order.status,
+            "status": request.status,
             "updated_at": datetime.now().isoformat()
         }
         
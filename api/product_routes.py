@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Path, HTTPException, File, UploadFile, Depends
-from typing import List
+from typing import List, Optional
 from dependencies import get_es_client
 from elasticsearch import AsyncElasticsearch
 from service.data.data_loader_elastic_search import (
@@ -12,6 +12,7 @@ from service.data.data_loader_elastic_search import (
     delete_documents_by_customer,
     bulk_delete_documents
 )
+from service.data.es_write_policy import RefreshPolicy, RefreshQuery
 from service.models.schemas import ProductRow, BulkDeleteInput
 from service.utils.helpers import sanitize_for_es
 
@@ -49,7 +50,8 @@ PRODUCT_COLUMNS_CONFIG = {
 @router.post("/upload-product/{customer_id}")
 async def upload_product_data(
     customer_id: str = Path(..., description="Mã khách hàng."),
-    file: UploadFile = File(..., description="File Excel chứa dữ liệu sản phẩm."),
+    file: UploadFile = File(..., description="File Excel (.xlsx/.xls), CSV hoặc Parquet chứa dữ liệu sản phẩm."),
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -61,14 +63,15 @@ async def upload_product_data(
         raise HTTPException(status_code=503, detail="Không thể kết nối đến Elasticsearch.")
     
     try:
-        content = await file.read()
         sanitized_customer_id = sanitize_for_es(customer_id)
         success, failed = await process_and_index_data(
             es_client=es_client,
             customer_id=sanitized_customer_id,
             index_name=PRODUCTS_INDEX,
-            file_content=content,
-            columns_config=PRODUCT_COLUMNS_CONFIG
+            file_content=file.file,
+            filename=file.filename,
+            columns_config=PRODUCT_COLUMNS_CONFIG,
+            refresh=refresh
         )
         
         return {
@@ -86,6 +89,7 @@ async def upload_product_data(
 async def add_product(
     customer_id: str,
     product_data: ProductRow,
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -100,7 +104,7 @@ async def add_product(
         if not doc_id:
             raise HTTPException(status_code=400, detail="Thiếu 'ma_san_pham' trong dữ liệu đầu vào.")
         
-        response = await index_single_document(es_client, PRODUCTS_INDEX, sanitized_customer_id, doc_id, product_dict)
+        response = await index_single_document(es_client, PRODUCTS_INDEX, sanitized_customer_id, doc_id, product_dict, refresh=refresh)
         return {"message": "Sản phẩm đã được thêm/cập nhật thành công.", "result": response.body}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -110,6 +114,7 @@ async def update_product(
     customer_id: str,
     product_id: str,
     product_data: ProductRow,
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -136,7 +141,8 @@ async def update_product(
             PRODUCTS_INDEX, 
             sanitized_customer_id, 
             product_id, 
-            product_dict
+            product_dict,
+            refresh=refresh
         )
         
         result_status = response.body.get('result')
@@ -155,6 +161,7 @@ async def update_product(
 async def delete_product(
     customer_id: str,
     product_id: str,
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -164,7 +171,7 @@ async def delete_product(
         raise HTTPException(status_code=503, detail="Không thể kết nối đến Elasticsearch.")
     try:
         sanitized_customer_id = sanitize_for_es(customer_id)
-        response = await delete_single_document(es_client, PRODUCTS_INDEX, sanitized_customer_id, product_id)
+        response = await delete_single_document(es_client, PRODUCTS_INDEX, sanitized_customer_id, product_id, refresh=refresh)
         return {"message": "Sản phẩm đã được xóa thành công.", "result": response.body}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -173,6 +180,7 @@ async def delete_product(
 async def add_products_bulk(
     customer_id: str,
     products: List[ProductRow],
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -189,7 +197,8 @@ async def add_products_bulk(
             PRODUCTS_INDEX, 
             sanitized_customer_id, 
             product_dicts, 
-            id_field='ma_san_pham'
+            id_field='ma_san_pham',
+            refresh=refresh
         )
         return {
             "message": "Thao tác hàng loạt hoàn tất.",
@@ -202,7 +211,8 @@ async def add_products_bulk(
 @router.post("/insert-product/{customer_id}")
 async def append_product_data_from_file(
     customer_id: str = Path(..., description="Mã khách hàng."),
-    file: UploadFile = File(..., description="File Excel chứa dữ liệu sản phẩm để nạp thêm."),
+    file: UploadFile = File(..., description="File Excel (.xlsx/.xls), CSV hoặc Parquet chứa dữ liệu sản phẩm để nạp thêm."),
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -213,14 +223,15 @@ async def append_product_data_from_file(
         raise HTTPException(status_code=503, detail="Không thể kết nối đến Elasticsearch.")
     
     try:
-        content = await file.read()
         sanitized_customer_id = sanitize_for_es(customer_id)
         success, failed_items = await process_and_upsert_file_data(
             es_client=es_client,
             customer_id=sanitized_customer_id,
             index_name=PRODUCTS_INDEX,
-            file_content=content,
-            columns_config=PRODUCT_COLUMNS_CONFIG
+            file_content=file.file,
+            filename=file.filename,
+            columns_config=PRODUCT_COLUMNS_CONFIG,
+            refresh=refresh
         )
         
         return {
@@ -236,6 +247,7 @@ async def append_product_data_from_file(
 @router.delete("/products/{customer_id}")
 async def delete_all_products_by_customer(
     customer_id: str = Path(..., description="Mã khách hàng để xóa tất cả sản phẩm."),
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -248,7 +260,8 @@ async def delete_all_products_by_customer(
         response = await delete_documents_by_customer(
             es_client, 
             PRODUCTS_INDEX, 
-            sanitized_customer_id
+            sanitized_customer_id,
+            refresh=refresh
         )
         deleted_count = response.get('deleted', 0)
         return {"message": f"Đã xóa thành công {deleted_count} sản phẩm cho khách hàng '{customer_id}'.", "details": response}
@@ -259,6 +272,7 @@ async def delete_all_products_by_customer(
 async def delete_products_bulk(
     customer_id: str,
     delete_input: BulkDeleteInput,
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -273,7 +287,8 @@ async def delete_products_bulk(
             PRODUCTS_INDEX,
             sanitized_customer_id,
             delete_input.ids,
-            id_field="ma_san_pham"
+            id_field="ma_san_pham",
+            refresh=refresh
         )
         deleted_count = response.get('deleted', 0)
         return {"message": f"Đã xóa thành công {deleted_count} sản phẩm.", "details": response}
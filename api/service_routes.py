@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Path, HTTPException, File, UploadFile, Depends
-from typing import List
+from typing import List, Optional
 from dependencies import get_es_client
 from elasticsearch import AsyncElasticsearch
 from service.data.data_loader_elastic_search import (
@@ -12,6 +12,7 @@ from service.data.data_loader_elastic_search import (
     delete_documents_by_customer,
     bulk_delete_documents
 )
+from service.data.es_write_policy import RefreshPolicy, RefreshQuery
 from service.models.schemas import ServiceRow, BulkDeleteInput
 from service.utils.helpers import sanitize_for_es
 router = APIRouter()
@@ -44,7 +45,8 @@ SERVICE_COLUMNS_CONFIG = {
 @router.post("/upload-service/{customer_id}")
 async def upload_service_data(
     customer_id: str = Path(..., description="Mã khách hàng."),
-    file: UploadFile = File(..., description="File Excel chứa dữ liệu dịch vụ."),
+    file: UploadFile = File(..., description="File Excel (.xlsx/.xls), CSV hoặc Parquet chứa dữ liệu dịch vụ."),
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -56,14 +58,15 @@ async def upload_service_data(
         raise HTTPException(status_code=503, detail="Không thể kết nối đến Elasticsearch.")
     
     try:
-        content = await file.read()
         sanitized_customer_id = sanitize_for_es(customer_id)
         success, failed = await process_and_index_data(
             es_client=es_client,
             customer_id=sanitized_customer_id,
             index_name=SERVICES_INDEX,
-            file_content=content,
-            columns_config=SERVICE_COLUMNS_CONFIG
+            file_content=file.file,
+            filename=file.filename,
+            columns_config=SERVICE_COLUMNS_CONFIG,
+            refresh=refresh
         )
         
         return {
@@ -81,6 +84,7 @@ async def upload_service_data(
 async def add_service(
     customer_id: str,
     service_data: ServiceRow,
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -95,7 +99,7 @@ async def add_service(
         if not doc_id:
             raise HTTPException(status_code=400, detail="Thiếu 'ma_dich_vu' trong dữ liệu đầu vào.")
 
-        response = await index_single_document(es_client, SERVICES_INDEX, sanitized_customer_id, doc_id, service_dict)
+        response = await index_single_document(es_client, SERVICES_INDEX, sanitized_customer_id, doc_id, service_dict, refresh=refresh)
         return {"message": "Dịch vụ đã được thêm/cập nhật thành công.", "result": response.body}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -105,6 +109,7 @@ async def update_service(
     customer_id: str,
     service_id: str,
     service_data: ServiceRow,
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -131,7 +136,8 @@ async def update_service(
             SERVICES_INDEX, 
             sanitized_customer_id, 
             service_id, 
-            service_dict
+            service_dict,
+            refresh=refresh
         )
         
         result_status = response.body.get('result')
@@ -150,6 +156,7 @@ async def update_service(
 async def delete_service(
     customer_id: str,
     service_id: str,
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -159,7 +166,7 @@ async def delete_service(
         raise HTTPException(status_code=503, detail="Không thể kết nối đến Elasticsearch.")
     try:
         sanitized_customer_id = sanitize_for_es(customer_id)
-        response = await delete_single_document(es_client, SERVICES_INDEX, sanitized_customer_id, service_id)
+        response = await delete_single_document(es_client, SERVICES_INDEX, sanitized_customer_id, service_id, refresh=refresh)
         return {"message": "Dịch vụ đã được xóa thành công.", "result": response.body}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -168,6 +175,7 @@ async def delete_service(
 async def add_services_bulk(
     customer_id: str,
     services: List[ServiceRow],
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -184,7 +192,8 @@ async def add_services_bulk(
             SERVICES_INDEX, 
             sanitized_customer_id, 
             service_dicts, 
-            id_field='ma_dich_vu'
+            id_field='ma_dich_vu',
+            refresh=refresh
         )
         return {
             "message": "Thao tác hàng loạt hoàn tất.",
@@ -197,7 +206,8 @@ async def add_services_bulk(
 @router.post("/insert-service/{customer_id}")
 async def append_service_data_from_file(
     customer_id: str = Path(..., description="Mã khách hàng."),
-    file: UploadFile = File(..., description="File Excel chứa dữ liệu dịch vụ để nạp thêm."),
+    file: UploadFile = File(..., description="File Excel (.xlsx/.xls), CSV hoặc Parquet chứa dữ liệu dịch vụ để nạp thêm."),
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -208,14 +218,15 @@ async def append_service_data_from_file(
         raise HTTPException(status_code=503, detail="Không thể kết nối đến Elasticsearch.")
     
     try:
-        content = await file.read()
         sanitized_customer_id = sanitize_for_es(customer_id)
         success, failed_items = await process_and_upsert_file_data(
             es_client=es_client,
             customer_id=sanitized_customer_id,
             index_name=SERVICES_INDEX,
-            file_content=content,
-            columns_config=SERVICE_COLUMNS_CONFIG
+            file_content=file.file,
+            filename=file.filename,
+            columns_config=SERVICE_COLUMNS_CONFIG,
+            refresh=refresh
         )
         
         return {
@@ -231,6 +242,7 @@ async def append_service_data_from_file(
 @router.delete("/services/{customer_id}")
 async def delete_all_services_by_customer(
     customer_id: str = Path(..., description="Mã khách hàng để xóa tất cả dịch vụ."),
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -243,7 +255,8 @@ async def delete_all_services_by_customer(
         response = await delete_documents_by_customer(
             es_client, 
             SERVICES_INDEX, 
-            sanitized_customer_id
+            sanitized_customer_id,
+            refresh=refresh
         )
         deleted_count = response.get('deleted', 0)
         return {"message": f"Đã xóa thành công {deleted_count} dịch vụ cho khách hàng '{customer_id}'.", "details": response}
@@ -254,6 +267,7 @@ async def delete_all_services_by_customer(
 async def delete_services_bulk(
     customer_id: str,
     delete_input: BulkDeleteInput,
+    refresh: Optional[RefreshPolicy] = RefreshQuery,
     es_client: AsyncElasticsearch = Depends(get_es_client)
 ):
     """
@@ -268,7 +282,8 @@ async def delete_services_bulk(
             SERVICES_INDEX,
             sanitized_customer_id,
             delete_input.ids,
-            id_field="ma_dich_vu"
+            id_field="ma_dich_vu",
+            refresh=refresh
         )
         deleted_count = response.get('deleted', 0)
         return {"message": f"Đã xóa thành công {deleted_count} dịch vụ.", "details": response}
@@ -19,6 +19,10 @@ from api import (
     info_store_routes
 )
 from database.database import init_db
+from service.data.data_loader_elastic_search import ensure_shared_indices_exist
+from service.data.es_write_policy import flush_write_buffers
+from service.agents.chat_history_writer import flush_chat_history
+from service.utils.zalo_outbox import start_zalo_dispatcher, stop_zalo_dispatcher
 import dependencies
 import os
 os.environ["LANGCHAIN_DEBUG"] = "true"
@@ -48,13 +52,21 @@ async def lifespan(app: FastAPI):
     # Initialize all clients on startup
     await dependencies.init_es_client()
     await dependencies.init_weaviate_client()
+    if dependencies.es_client:
+        await ensure_shared_indices_exist(dependencies.es_client)
+    start_zalo_dispatcher()
     
     yield
     
     # Close all clients on shutdown
     print("Application shutdown...")
-    await dependencies.close_es_client()
-    await dependencies.close_weaviate_client()
+    # Mỗi bước chạy độc lập: một bước lỗi không làm bỏ qua việc đóng các client còn lại.
+    for shutdown_step in (stop_zalo_dispatcher, flush_write_buffers, flush_chat_history,
+                          dependencies.close_es_client, dependencies.close_weaviate_client):
+        try:
+            await shutdown_step()
+        except Exception as e:
+            print(f"⚠️ Lỗi khi tắt ứng dụng ở bước '{shutdown_step.__name__}': {e}")
     print("All clients closed. Shutdown complete.")
 
 app = FastAPI(**APP_CONFIG, lifespan=lifespan)
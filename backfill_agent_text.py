@@ -0,0 +1,77 @@
+"""
+Dựng các đoạn mô tả cho agent (`agent_text`, `agent_text_wholesale`) cho các bản ghi đã nạp trước khi có.
+
+Tìm kiếm chỉ lấy đoạn mô tả dựng sẵn trong _source, nên bản ghi cũ cần được bổ sung. Công cụ duyệt các
+index chia sẻ (và index riêng `<index>-t-*`), chỉ cập nhật bản ghi còn thiếu, có thể chạy lại nhiều lần.
+
+Cách dùng:
+    python backfill_agent_text.py                    # products, services, accessories
+    python backfill_agent_text.py products
+"""
+import argparse
+import asyncio
+import sys
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_scan, async_bulk
+
+from config.settings import ELASTIC_HOST, ES_BULK_CHUNK_SIZE
+from service.data.data_loader_elastic_search import (
+    SHARED_INDEX_TYPES,
+    AGENT_TEXT_FIELD,
+    AGENT_TEXT_WHOLESALE_FIELD,
+    add_agent_text,
+    ensure_shared_indices_exist
+)
+
+AGENT_INDICES = [name for name, data_type in SHARED_INDEX_TYPES.items() if data_type != "faq"]
+
+async def _update_actions(es_client: AsyncElasticsearch, index_name: str, counter: dict):
+    data_type = SHARED_INDEX_TYPES[index_name]
+    async for hit in async_scan(es_client, index=f"{index_name},{index_name}-t-*",
+                                query={"query": {"bool": {"must_not": {"exists": {"field": AGENT_TEXT_WHOLESALE_FIELD}}}}}):
+        counter["seen"] += 1
+        doc = add_agent_text(data_type, dict(hit["_source"]))
+        action = {
+            "_op_type": "update",
+            "_index": hit["_index"],
+            "_id": hit["_id"],
+            "doc": {field: doc[field] for field in (AGENT_TEXT_FIELD, AGENT_TEXT_WHOLESALE_FIELD)}
+        }
+        if hit.get("_routing"):
+            action["routing"] = hit["_routing"]
+        yield action
+
+async def backfill_index(es_client: AsyncElasticsearch, index_name: str):
+    counter = {"seen": 0}
+    success, errors = await async_bulk(es_client, _update_actions(es_client, index_name, counter),
+                                       chunk_size=ES_BULK_CHUNK_SIZE, raise_on_error=False)
+    print(f"✅ {index_name}: cập nhật {success}/{counter['seen']} bản ghi.")
+    if errors:
+        print(f"❌ {index_name}: {len(errors)} bản ghi lỗi, ví dụ: {errors[:3]}")
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bổ sung đoạn mô tả cho agent cho dữ liệu đã nạp.")
+    parser.add_argument("indices", nargs="*", default=AGENT_INDICES, help="Tên index chia sẻ.")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.indices if name not in AGENT_INDICES]
+    if unknown:
+        print(f"❌ Index không hợp lệ: {', '.join(unknown)}")
+        return 1
+
+    es_client = AsyncElasticsearch(hosts=[ELASTIC_HOST])
+    try:
+        # Cập nhật mapping (các trường mô tả không đánh chỉ mục) trước khi ghi.
+        await ensure_shared_indices_exist(es_client)
+        for index_name in args.indices:
+            await backfill_index(es_client, index_name)
+        return 0
+    except Exception as e:
+        print(f"❌ Lỗi khi bổ sung agent_text: {e}")
+        return 1
+    finally:
+        await es_client.close()
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,180 @@
+"""
+Benchmark offline cho pipeline chat: đo p50/p95/p99, throughput khi chạy song song
+nhiều luồng chat, và cấp phát bộ nhớ mỗi lượt. Không cần mạng: LLM, Elasticsearch và
+Weaviate đều được thay bằng bản giả lập tất định trong `benchmarks/fakes.py`.
+
+Ví dụ:
+    python -m benchmarks.bench_chat
+    python -m benchmarks.bench_chat --iterations 200 --concurrency 1,8,32 --llm-latency-ms 300
+    python -m benchmarks.bench_chat --json bench_output.json
+    BENCH_ELASTIC_HOST=http://localhost:9200 python -m benchmarks.bench_chat --real-es
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+from typing import Any, Callable, Dict, List
+
+from benchmarks.harness import configure_offline_environment
+
+BENCH_TURNS = [
+    "Chào shop",
+    "Shop có iPhone 13 Pro Max không?",
+    "iPhone 15 màu xanh 256GB giá bao nhiêu?",
+    "Xem thêm các máy iPhone khác",
+    "Thay pin iPhone 12 bao nhiêu tiền?",
+    "Thay màn hình iPhone 14 Pro hết bao nhiêu?",
+    "Cho em xem ốp lưng iPhone 13",
+    "iPhone 13 và ốp lưng cho máy đó giá sao?",
+    "Chính sách đổi trả của shop thế nào?",
+    "Có hỗ trợ trả góp không?",
+    "Địa chỉ cửa hàng ở đâu?",
+    "Sạc nhanh 20W còn hàng không?",
+]
+
+def _parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark offline cho pipeline chat.")
+    parser.add_argument("--iterations", type=int, default=50, help="Số lần đo tuần tự cho mỗi kịch bản.")
+    parser.add_argument("--concurrency", default="1,4,16", help="Danh sách mức song song, ví dụ '1,4,16'.")
+    parser.add_argument("--turns-per-thread", type=int, default=6, help="Số lượt mỗi luồng chat khi đo throughput.")
+    parser.add_argument("--alloc-iterations", type=int, default=20, help="Số lượt đo cấp phát bộ nhớ.")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Độ trễ giả lập mỗi lần gọi LLM.")
+    parser.add_argument("--es-latency-ms", type=float, default=0.0, help="Độ trễ giả lập mỗi request ES.")
+    parser.add_argument("--weaviate-latency-ms", type=float, default=0.0, help="Độ trễ giả lập truy vấn Weaviate.")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--services", type=int, default=200)
+    parser.add_argument("--accessories", type=int, default=500)
+    parser.add_argument("--only", default="", help="Chỉ chạy các kịch bản có tên chứa chuỗi này (phân tách bằng dấu phẩy).")
+    parser.add_argument("--real-es", action="store_true", help="Dùng Elasticsearch cục bộ tại BENCH_ELASTIC_HOST thay vì bản giả lập.")
+    parser.add_argument("--database-url", default=None, help="Mặc định là một file SQLite tạm.")
+    parser.add_argument("--json", dest="json_path", default=None, help="Ghi kết quả ra file JSON.")
+    parser.add_argument("--verbose", action="store_true", help="Không ẩn log của ứng dụng.")
+    return parser.parse_args(argv)
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+def _print_table(out, title: str, rows: List[Dict[str, Any]], columns: List[str]):
+    out.write(f"\n== {title} ==\n")
+    widths = {c: max(len(c), *(len(_fmt(r.get(c))) for r in rows)) for c in columns}
+    out.write("  ".join(c.ljust(widths[c]) for c in columns) + "\n")
+    for row in rows:
+        out.write("  ".join(_fmt(row.get(c)).ljust(widths[c]) for c in columns) + "\n")
+
+def _fmt(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+async def run_benchmarks(args: argparse.Namespace, out) -> Dict[str, Any]:
+    from benchmarks.fakes import ScriptedChatModel
+    from benchmarks.harness import (build_offline_stack, measure_allocations, measure_latency,
+                                    measure_throughput, summarize_latencies)
+    from database.database import Customer, SessionLocal
+    from service.agents.agent_service import create_agent_executor, invoke_agent_with_memory
+    from service.retrieve.retrieve_vector_service import retrieve_documents
+    from service.retrieve.search_service import (search_accessories, search_faqs, search_products,
+                                                 search_services)
+
+    es_client = None
+    if args.real_es:
+        from elasticsearch import AsyncElasticsearch
+        es_client = AsyncElasticsearch(hosts=[os.environ["BENCH_ELASTIC_HOST"]])
+
+    stack = await build_offline_stack(
+        catalog_sizes={"n_products": args.products, "n_services": args.services, "n_accessories": args.accessories},
+        es_latency_ms=args.es_latency_ms,
+        weaviate_latency_ms=args.weaviate_latency_ms,
+        es_client=es_client,
+    )
+    es, customer_id = stack.es_client, stack.customer_id
+    llm = ScriptedChatModel(latency_ms=args.llm_latency_ms)
+
+    async def chat_turn(thread_id: str, user_input: str):
+        db = SessionLocal()
+        try:
+            customer_config = db.query(Customer).filter(Customer.customer_id == customer_id).first()
+            executor = create_agent_executor(
+                es_client=es, db=db, customer_id=customer_id, customer_config=customer_config,
+                thread_id=thread_id, llm=llm,
+            )
+            return await invoke_agent_with_memory(executor, customer_id, thread_id, user_input, db, es_client=es)
+        finally:
+            db.close()
+
+    scenarios: Dict[str, Callable[[int], Any]] = {
+        "search_products": lambda i: search_products(es, customer_id, "100000001", model="iPhone 13"),
+        "search_products+filter": lambda i: search_products(
+            es, customer_id, "100000001", model="iPhone 13", original_query="iPhone 13 giá bao nhiêu", llm=llm),
+        "search_services": lambda i: search_services(es, customer_id, "100000001", ten_dich_vu="Thay pin", ten_san_pham="iPhone 12"),
+        "search_services_fallback": lambda i: search_services(es, customer_id, "100000001", ten_dich_vu="pinn", ten_san_pham="iPhone 12"),
+        "search_accessories": lambda i: search_accessories(es, customer_id, "100000001", ten_phu_kien="Ốp lưng"),
+        "search_faqs": lambda i: search_faqs(es, customer_id, "Shop có hỗ trợ trả góp không?"),
+        "retrieve_documents": lambda i: retrieve_documents("chính sách đổi trả", customer_id),
+        "agent_turn": lambda i: chat_turn(f"1000{abs(i) % 97:05d}", BENCH_TURNS[i % len(BENCH_TURNS)]),
+    }
+    only = [s.strip() for s in args.only.split(",") if s.strip()]
+    if only:
+        scenarios = {name: fn for name, fn in scenarios.items() if any(o in name for o in only)}
+
+    results: Dict[str, Any] = {"latency": {}, "throughput": [], "allocations": {}}
+    for name, fn in scenarios.items():
+        samples = await measure_latency(fn, args.iterations)
+        results["latency"][name] = summarize_latencies(samples)
+
+    if "agent_turn" in scenarios:
+        for concurrency in [int(c) for c in args.concurrency.split(",") if c.strip()]:
+            async def threaded_turn(worker_id: int, i: int, _c=concurrency):
+                return await chat_turn(f"2{_c:03d}{worker_id:05d}", BENCH_TURNS[i % len(BENCH_TURNS)])
+            results["throughput"].append(await measure_throughput(threaded_turn, concurrency, args.turns_per_thread))
+        results["allocations"]["agent_turn"] = await measure_allocations(scenarios["agent_turn"], args.alloc_iterations)
+
+    if es_client is not None:
+        await es_client.close()
+    return results
+
+def main(argv: List[str] = None) -> Dict[str, Any]:
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+    database_url = configure_offline_environment(args.database_url)
+    out = sys.stdout
+
+    with open(os.devnull, "w") as devnull:
+        redirect = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)
+        with redirect:
+            results = asyncio.run(run_benchmarks(args, out))
+
+    results["meta"] = {
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database_url": database_url,
+        "args": vars(args),
+    }
+
+    latency_rows = [{"scenario": name, **stats} for name, stats in results["latency"].items()]
+    _print_table(out, "Độ trễ tuần tự (ms)", latency_rows,
+                 ["scenario", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+    if results["throughput"]:
+        _print_table(out, "Throughput agent_turn theo số luồng chat song song", results["throughput"],
+                     ["concurrency", "count", "throughput_ops_s", "p50_ms", "p95_ms", "p99_ms"])
+    if results["allocations"]:
+        alloc_rows = [{"scenario": name, **stats} for name, stats in results["allocations"].items()]
+        _print_table(out, "Cấp phát bộ nhớ mỗi lượt (tracemalloc)", alloc_rows,
+                     ["scenario", "iterations", "peak_kib_per_turn", "retained_kib_per_turn", "retained_blocks_per_turn"])
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        out.write(f"\nĐã ghi kết quả vào {args.json_path}\n")
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Dựng môi trường offline cho benchmark: SQLite thay Postgres, FakeElasticsearch,
+FakeWeaviateClient và dữ liệu cửa hàng mẫu. Phải gọi `configure_offline_environment`
+TRƯỚC KHI import bất kỳ module nào của ứng dụng (database.database đọc DATABASE_URL lúc import).
+"""
+import hashlib
+import math
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+BENCH_CUSTOMER_ID = "bench-shop-01"
+
+def configure_offline_environment(database_url: Optional[str] = None) -> str:
+    """Trỏ ứng dụng sang SQLite cục bộ và tắt mọi cấu hình mạng. Trả về DATABASE_URL đã dùng."""
+    if not database_url:
+        workdir = tempfile.mkdtemp(prefix="chatbot-bench-")
+        database_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["ELASTIC_HOST"] = os.environ.get("BENCH_ELASTIC_HOST", "")
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    os.environ.pop("LANGCHAIN_DEBUG", None)
+    os.environ["LANGCHAIN_TRACING_V2"] = "false"
+    return database_url
+
+
+# ---------------------------------------------------------------------------
+# Dữ liệu mẫu
+# ---------------------------------------------------------------------------
+
+_PHONE_MODELS = [
+    "iPhone 11", "iPhone 12", "iPhone 12 Pro", "iPhone 13", "iPhone 13 Pro Max", "iPhone 14",
+    "iPhone 14 Pro", "iPhone 15", "iPhone 15 Pro Max", "Samsung Galaxy S23", "Samsung Galaxy A54",
+    "Oppo Reno10", "Xiaomi 13T",
+]
+_COLORS = ["Đen", "Trắng", "Xanh", "Đỏ", "Tím", "Vàng", "Titan Tự nhiên"]
+_CAPACITIES = ["64GB", "128GB", "256GB", "512GB"]
+_SERVICES = ["Thay pin", "Thay màn hình", "Ép kính", "Thay camera sau", "Fix sọc màn", "Thay loa trong"]
+_ACCESSORIES = ["Ốp lưng", "Sạc nhanh 20W", "Cáp Lightning", "Tai nghe Bluetooth", "Kính cường lực", "Kính hiển vi KAISI"]
+_FAQS = [
+    ("Cửa hàng mở cửa lúc mấy giờ?", "Dạ bên em mở cửa từ 8h đến 21h hằng ngày ạ."),
+    ("Có hỗ trợ trả góp không?", "Dạ bên em hỗ trợ trả góp 0% qua thẻ tín dụng ạ."),
+    ("Bảo hành bao lâu?", "Dạ máy cũ bảo hành 6 tháng, máy mới bảo hành 12 tháng ạ."),
+    ("Có giao hàng tận nơi không?", "Dạ bên em giao hàng toàn quốc, nội thành miễn phí ạ."),
+]
+
+def build_catalog(n_products: int = 500, n_services: int = 200, n_accessories: int = 500,
+                  seed: int = 7) -> Dict[str, List[dict]]:
+    """Sinh catalog tất định có cùng cấu trúc với dữ liệu đã qua `process_and_index_data`."""
+    rng = random.Random(seed)
+    products = []
+    for i in range(n_products):
+        model = rng.choice(_PHONE_MODELS)
+        products.append({
+            "ma_san_pham": f"SP{i:06d}",
+            "model": model,
+            "mau_sac": rng.choice(_COLORS),
+            "dung_luong": rng.choice(_CAPACITIES),
+            "bao_hanh": rng.choice(["6 tháng", "12 tháng"]),
+            "tinh_trang_may": rng.choice(["Đẹp 99%", "Trầy xước nhẹ", "Mới 100%"]),
+            "loai_thiet_bi": rng.choice(["Cũ", "Mới"]),
+            "tinh_trang_pin": float(rng.randint(80, 100)),
+            "gia": float(rng.randint(30, 400) * 100_000),
+            "gia_buon": float(rng.randint(25, 380) * 100_000),
+            "ton_kho": rng.randint(0, 20),
+            "ghi_chu": "Máy zin, nguyên bản" if rng.random() < 0.3 else None,
+        })
+    services = []
+    for i in range(n_services):
+        services.append({
+            "ma_dich_vu": f"DV{i:05d}",
+            "ten_dich_vu": rng.choice(_SERVICES),
+            "ten_san_pham": rng.choice(_PHONE_MODELS),
+            "loai_dich_vu": rng.choice(["Pin Lithium", "Linh kiện zin", "Linh kiện OEM"]),
+            "gia": float(rng.randint(3, 60) * 100_000),
+            "gia_buon": float(rng.randint(2, 50) * 100_000),
+            "bao_hanh": "6 tháng",
+            "ghi_chu": None,
+        })
+    accessories = []
+    for i in range(n_accessories):
+        name = rng.choice(_ACCESSORIES)
+        accessories.append({
+            "accessory_code": f"PK{i:06d}",
+            "accessory_name": f"{name} {rng.choice(_PHONE_MODELS)}",
+            "category": name.split()[0],
+            "properties": rng.choice(["Màu đen", "Màu trong suốt", "Loại 1", "0"]),
+            "lifecare_price": float(rng.randint(1, 30) * 50_000),
+            "sale_price": float(rng.randint(1, 25) * 50_000),
+            "trademark": rng.choice(["Apple", "Baseus", "Anker", "KAISI"]),
+            "guarantee": "3 tháng",
+            "inventory": rng.randint(0, 100),
+            "specifications": "Mô tả chi tiết phụ kiện " * 20,
+            "avatar_images": f"https://cdn.example.invalid/pk/{i}.jpg",
+            "link_accessory": f"https://shop.example.invalid/pk/{i}",
+        })
+    faqs = [{"question": q, "answer": a, "image": None, "classification": "Chung"} for q, a in _FAQS]
+    documents = [
+        {"text": "Chính sách đổi trả trong 7 ngày nếu lỗi do nhà sản xuất. " * 10, "source": "chinh-sach.txt"},
+        {"text": "Hỗ trợ trả góp qua thẻ tín dụng và công ty tài chính. " * 10, "source": "tra-gop.txt"},
+        {"text": "Giao hàng toàn quốc, nội thành nhận trong 2 giờ. " * 10, "source": "giao-hang.txt"},
+    ]
+    return {"products": products, "services": services, "accessories": accessories,
+            "faqs": faqs, "documents": documents}
+
+
+@dataclass
+class OfflineStack:
+    """Các client giả lập đã nạp dữ liệu, dùng chung cho benchmark và load test."""
+    es_client: Any
+    weaviate_client: Any
+    customer_id: str
+    catalog: Dict[str, List[dict]]
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+async def build_offline_stack(customer_id: str = BENCH_CUSTOMER_ID, catalog_sizes: Optional[Dict[str, int]] = None,
+                              es_latency_ms: float = 0.0, weaviate_latency_ms: float = 0.0,
+                              es_client: Any = None, weaviate_client: Any = None) -> OfflineStack:
+    """
+    Tạo bảng SQLite, seed cấu hình khách hàng + system instruction, nạp catalog vào ES
+    (giả lập hoặc ES cục bộ nếu truyền `es_client`) qua chính các hàm nạp dữ liệu của ứng dụng.
+    Truyền lại `es_client`/`weaviate_client` của lần gọi trước để seed nhiều customer_id dùng chung client.
+    """
+    import dependencies
+    from create_db import DEFAULT_INSTRUCTIONS
+    from database.database import Base, Customer, SessionLocal, SystemInstruction, engine
+    from service.data import data_loader_elastic_search as loader
+    from service.data.data_loader_vector_db import DOCUMENT_CLASS_NAME
+    from service.retrieve import retrieve_vector_service
+    from service.utils.helpers import sanitize_for_es, sanitize_for_weaviate
+
+    from benchmarks.fakes import FakeElasticsearch, FakeEmbeddings, FakeWeaviateClient
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if not db.query(Customer).filter(Customer.customer_id == customer_id).first():
+            db.add(Customer(customer_id=customer_id, ai_name="Mai", ai_role="nhân viên tư vấn điện thoại",
+                            custom_prompt="Luôn trả lời ngắn gọn."))
+        for key, value in DEFAULT_INSTRUCTIONS.items():
+            if not db.query(SystemInstruction).filter(SystemInstruction.key == key).first():
+                db.add(SystemInstruction(key=key, value=value))
+        db.commit()
+    finally:
+        db.close()
+
+    catalog = build_catalog(**(catalog_sizes or {}))
+    es = es_client or FakeElasticsearch(latency_ms=es_latency_ms)
+    await loader.ensure_shared_indices_exist(es)
+    es_customer_id = sanitize_for_es(customer_id)
+    for index_name, docs, id_field in (
+        (loader.PRODUCTS_INDEX, catalog["products"], "ma_san_pham"),
+        (loader.SERVICES_INDEX, catalog["services"], "ma_dich_vu"),
+        (loader.ACCESSORIES_INDEX, catalog["accessories"], "accessory_code"),
+    ):
+        await loader.bulk_index_documents(es, index_name, es_customer_id, [dict(d) for d in docs], id_field=id_field)
+    faq_docs = []
+    for faq in catalog["faqs"]:
+        faq_docs.append({**faq, "faq_id": hashlib.sha1(faq["question"].strip().lower().encode("utf-8")).hexdigest()})
+    await loader.bulk_index_documents(es, loader.FAQ_INDEX, es_customer_id, faq_docs, id_field="faq_id")
+    if hasattr(es, "indices"):
+        await es.indices.refresh(index=",".join([loader.PRODUCTS_INDEX, loader.SERVICES_INDEX,
+                                                 loader.ACCESSORIES_INDEX, loader.FAQ_INDEX]))
+
+    weaviate_client = weaviate_client or FakeWeaviateClient(latency_ms=weaviate_latency_ms)
+    weaviate_client.add_documents(DOCUMENT_CLASS_NAME, sanitize_for_weaviate(customer_id), catalog["documents"])
+    dependencies._weaviate_client = weaviate_client
+    retrieve_vector_service.GoogleGenerativeAIEmbeddings = FakeEmbeddings
+
+    return OfflineStack(es_client=es, weaviate_client=weaviate_client, customer_id=customer_id, catalog=catalog)
+
+
+# ---------------------------------------------------------------------------
+# Đo lường
+# ---------------------------------------------------------------------------
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Percentile theo phương pháp nearest-rank."""
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def summarize_latencies(samples_s: List[float]) -> Dict[str, float]:
+    ms = [s * 1000 for s in samples_s]
+    return {
+        "count": len(ms),
+        "mean_ms": statistics.fmean(ms) if ms else float("nan"),
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+        "max_ms": max(ms) if ms else float("nan"),
+    }
+
+async def measure_latency(fn: Callable[[int], Awaitable[Any]], iterations: int, warmup: int = 3) -> List[float]:
+    """Chạy tuần tự `fn(i)` và trả về danh sách thời gian (giây) của từng lần gọi."""
+    for i in range(warmup):
+        await fn(i)
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        await fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+async def measure_throughput(fn: Callable[[int, int], Awaitable[Any]], concurrency: int,
+                             ops_per_worker: int) -> Dict[str, float]:
+    """
+    Chạy `concurrency` worker song song (mỗi worker mô phỏng một luồng chat riêng),
+    mỗi worker gọi `fn(worker_id, i)` tuần tự `ops_per_worker` lần.
+    """
+    import asyncio
+
+    latencies: List[float] = []
+
+    async def worker(worker_id: int):
+        for i in range(ops_per_worker):
+            start = time.perf_counter()
+            await fn(worker_id, i)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stats = summarize_latencies(latencies)
+    stats.update({"concurrency": concurrency, "elapsed_s": elapsed,
+                  "throughput_ops_s": len(latencies) / elapsed if elapsed else float("nan")})
+    return stats
+
+async def measure_allocations(fn: Callable[[int], Awaitable[Any]], iterations: int) -> Dict[str, float]:
+    """
+    Đo cấp phát bộ nhớ mỗi lượt bằng tracemalloc: đỉnh bộ nhớ Python trong lượt (KiB)
+    và số block còn giữ lại sau lượt (phát hiện rò rỉ/cache phình to).
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    peaks, retained_kib, retained_blocks = [], [], []
+    try:
+        await fn(-1)
+        for i in range(iterations):
+            before = tracemalloc.take_snapshot()
+            base_current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await fn(i)
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            diff = after.compare_to(before, "filename")
+            peaks.append((peak - base_current) / 1024)
+            retained_kib.append((current - base_current) / 1024)
+            retained_blocks.append(sum(stat.count_diff for stat in diff))
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return {
+        "iterations": iterations,
+        "peak_kib_per_turn": statistics.fmean(peaks) if peaks else float("nan"),
+        "retained_kib_per_turn": statistics.fmean(retained_kib) if retained_kib else float("nan"),
+        "retained_blocks_per_turn": statistics.fmean(retained_blocks) if retained_blocks else float("nan"),
+    }
@@ -0,0 +1,211 @@
+"""
+Load generator cho endpoint `/chat/{threadId}`: phát lại các hội thoại mua sắm nhiều lượt
+(`benchmarks/scenarios.py`) trên nhiều customer_id/threadId, tăng dần mức song song để vẽ
+đường bão hòa (throughput & p95 theo concurrency) và so sánh với baseline đã lưu.
+
+Chạy offline hoàn toàn (app chạy in-process qua ASGI, ES/Weaviate giả lập, SQLite tạm,
+LLM là OpenAI stub cục bộ):
+    python -m benchmarks.loadgen --in-process --levels 1,2,4,8,16 --save-baseline benchmarks/baseline.json
+    python -m benchmarks.loadgen --in-process --baseline benchmarks/baseline.json
+
+Chạy với server thật (server phải được khởi động với OPENAI_BASE_URL trỏ tới stub):
+    python -m benchmarks.openai_stub --port 8099 &
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1 uvicorn app:app --port 8010 &
+    python -m benchmarks.loadgen --target http://127.0.0.1:8010 --customers 3
+
+Mã thoát khác 0 khi phát hiện regression so với baseline.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.harness import configure_offline_environment, percentile
+from benchmarks.scenarios import Session, build_sessions, customer_ids
+
+def _parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test hội thoại nhiều lượt cho /chat/{threadId}.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--target", help="URL gốc của server đang chạy, ví dụ http://127.0.0.1:8010")
+    target.add_argument("--in-process", action="store_true", help="Chạy app trong process với các thành phần giả lập.")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="Các mức song song (số phiên chat chạy cùng lúc).")
+    parser.add_argument("--sessions-per-worker", type=int, default=2, help="Số phiên mỗi worker chạy ở mỗi mức.")
+    parser.add_argument("--customers", type=int, default=4, help="Số customer_id (cửa hàng) phân phối tải.")
+    parser.add_argument("--llm-provider", default="openai")
+    parser.add_argument("--api-key", default="sk-loadtest")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Độ trễ giả lập của OpenAI stub (in-process).")
+    parser.add_argument("--es-latency-ms", type=float, default=0.0, help="Độ trễ giả lập ES (in-process).")
+    parser.add_argument("--catalog-size", type=int, default=300, help="Số sản phẩm/phụ kiện mỗi cửa hàng (in-process).")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--baseline", default=None, help="File JSON baseline để so sánh.")
+    parser.add_argument("--save-baseline", default=None, help="Ghi kết quả lần chạy này làm baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Ngưỡng regression tương đối cho throughput và p95 (mặc định 15%%).")
+    parser.add_argument("--json", dest="json_path", default=None, help="Ghi kết quả ra file JSON.")
+    parser.add_argument("--verbose", action="store_true", help="Không ẩn log của ứng dụng (in-process).")
+    return parser.parse_args(argv)
+
+async def _run_session(client: httpx.AsyncClient, session: Session, args: argparse.Namespace,
+                       records: List[Dict[str, Any]]):
+    for turn in session.turns:
+        payload = {"query": turn, "customer_id": session.customer_id, "llm_provider": args.llm_provider,
+                   "api_key": args.api_key, "access": 100}
+        start = time.perf_counter()
+        try:
+            response = await client.post(f"/chat/{session.thread_id}", json=payload)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        records.append({"scenario": session.scenario, "status": status,
+                        "latency_s": time.perf_counter() - start})
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """Chạy `concurrency` worker song song, mỗi worker lấy phiên chat từ hàng đợi tới khi hết."""
+    sessions = build_sessions(concurrency * args.sessions_per_worker, args.customers,
+                              seed=args.seed, prefix=f"lg{concurrency}")
+    queue: asyncio.Queue = asyncio.Queue()
+    for session in sessions:
+        queue.put_nowait(session)
+    records: List[Dict[str, Any]] = []
+
+    async def worker():
+        while not queue.empty():
+            await _run_session(client, queue.get_nowait(), args, records)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ok = [r["latency_s"] * 1000 for r in records if r["status"] == 200]
+    errors = [r for r in records if r["status"] != 200]
+    return {
+        "concurrency": concurrency,
+        "sessions": len(sessions),
+        "requests": len(records),
+        "errors": len(errors),
+        "error_rate": len(errors) / len(records) if records else 0.0,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ok, 50),
+        "p95_ms": percentile(ok, 95),
+        "p99_ms": percentile(ok, 99),
+        "status_counts": {str(s): sum(1 for r in records if r["status"] == s) for s in {r["status"] for r in records}},
+    }
+
+def find_saturation(levels: List[Dict[str, Any]], min_gain: float = 0.10) -> Optional[int]:
+    """Mức song song đầu tiên mà throughput tăng ít hơn `min_gain` so với mức trước (điểm gãy)."""
+    for previous, current in zip(levels, levels[1:]):
+        if previous["throughput_rps"] and current["throughput_rps"] < previous["throughput_rps"] * (1 + min_gain):
+            return previous["concurrency"]
+    return None
+
+def compare_with_baseline(levels: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Trả về danh sách mô tả regression (throughput giảm, p95 tăng hoặc lỗi tăng) theo từng mức."""
+    base_by_level = {row["concurrency"]: row for row in baseline.get("levels", [])}
+    problems = []
+    for row in levels:
+        base = base_by_level.get(row["concurrency"])
+        if not base:
+            continue
+        c = row["concurrency"]
+        if base["throughput_rps"] and row["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            problems.append(f"c={c}: throughput {row['throughput_rps']:.2f} rps < baseline {base['throughput_rps']:.2f} rps")
+        if base["p95_ms"] == base["p95_ms"] and row["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            problems.append(f"c={c}: p95 {row['p95_ms']:.1f} ms > baseline {base['p95_ms']:.1f} ms")
+        if row["error_rate"] > base.get("error_rate", 0.0) + 0.01:
+            problems.append(f"c={c}: tỉ lệ lỗi {row['error_rate']:.1%} > baseline {base.get('error_rate', 0.0):.1%}")
+    return problems
+
+def _print_curve(out, levels: List[Dict[str, Any]], saturation: Optional[int]):
+    out.write("\n== Đường bão hòa /chat/{threadId} ==\n")
+    out.write(f"{'conc':>5} {'req':>6} {'err':>5} {'rps':>8} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9}\n")
+    peak = max((row["throughput_rps"] for row in levels), default=0.0) or 1.0
+    for row in levels:
+        bar = "#" * int(round(30 * row["throughput_rps"] / peak))
+        marker = "  <- bão hòa" if row["concurrency"] == saturation else ""
+        out.write(f"{row['concurrency']:>5} {row['requests']:>6} {row['errors']:>5} {row['throughput_rps']:>8.2f} "
+                  f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}  {bar}{marker}\n")
+
+async def _prepare_in_process(args: argparse.Namespace):
+    """Seed dữ liệu cho các customer_id và trả về httpx client gắn trực tiếp vào ASGI app."""
+    import tracemalloc
+
+    import app as app_module
+    import dependencies
+    from benchmarks.harness import build_offline_stack
+
+    # app.py bật tracemalloc khi import; tắt đi để không làm sai lệch số đo tải.
+    tracemalloc.stop()
+    stack = None
+    for i, customer_id in enumerate(customer_ids(args.customers)):
+        stack = await build_offline_stack(
+            customer_id=customer_id,
+            catalog_sizes={"n_products": args.catalog_size, "n_services": args.catalog_size // 2,
+                           "n_accessories": args.catalog_size, "seed": i},
+            es_latency_ms=args.es_latency_ms,
+            es_client=stack.es_client if stack else None,
+            weaviate_client=stack.weaviate_client if stack else None,
+        )
+    dependencies.es_client = stack.es_client
+    transport = httpx.ASGITransport(app=app_module.app)
+    return httpx.AsyncClient(transport=transport, base_url="http://loadgen.local", timeout=args.timeout)
+
+async def run_loadgen(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    if args.in_process:
+        client = await _prepare_in_process(args)
+    else:
+        client = httpx.AsyncClient(base_url=args.target, timeout=args.timeout,
+                                   limits=httpx.Limits(max_connections=None, max_keepalive_connections=None))
+    try:
+        return [await run_level(client, int(c), args) for c in args.levels.split(",") if c.strip()]
+    finally:
+        await client.aclose()
+
+def main(argv: List[str] = None) -> int:
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+    out = sys.stdout
+
+    with contextlib.ExitStack() as stack:
+        if args.in_process:
+            from benchmarks.openai_stub import StubServer
+
+            configure_offline_environment()
+            stub = stack.enter_context(StubServer(latency_ms=args.llm_latency_ms))
+            os.environ["OPENAI_BASE_URL"] = stub.base_url
+            os.environ["OPENAI_API_BASE"] = stub.base_url
+            if not args.verbose:
+                devnull = stack.enter_context(open(os.devnull, "w"))
+                stack.enter_context(contextlib.redirect_stdout(devnull))
+        levels = asyncio.run(run_loadgen(args))
+
+    saturation = find_saturation(levels)
+    _print_curve(out, levels, saturation)
+    result = {"target": args.target or "in-process", "levels": levels, "saturation_concurrency": saturation,
+              "args": vars(args)}
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare_with_baseline(levels, json.load(f), args.tolerance)
+        result["regressions"] = problems
+        if problems:
+            out.write("\nREGRESSION so với baseline:\n" + "".join(f"  - {p}\n" for p in problems))
+            exit_code = 1
+        else:
+            out.write(f"\nKhông có regression so với baseline (ngưỡng {args.tolerance:.0%}).\n")
+
+    for path in filter(None, [args.json_path, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        out.write(f"Đã ghi kết quả vào {path}\n")
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
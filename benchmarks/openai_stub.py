@@ -0,0 +1,152 @@
+"""
+Server giả lập API OpenAI (`/v1/chat/completions`) chạy cục bộ cho load test.
+Câu trả lời và tool call được sinh tất định bởi `ScriptedChatModel`, hỗ trợ cả chế độ
+stream (SSE) mà `ChatOpenAI` dùng khi AgentExecutor gọi `.stream()`.
+
+Chạy độc lập:
+    python -m benchmarks.openai_stub --port 8099 --latency-ms 300
+rồi khởi động ứng dụng với `OPENAI_BASE_URL=http://127.0.0.1:8099/v1`.
+"""
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from benchmarks.fakes import ScriptedChatModel
+
+def _content_text(content: Any) -> str:
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+def openai_messages_to_langchain(messages: List[Dict[str, Any]]) -> List[BaseMessage]:
+    """Chuyển danh sách message theo định dạng OpenAI sang message của LangChain."""
+    converted: List[BaseMessage] = []
+    for message in messages:
+        role, content = message.get("role"), _content_text(message.get("content"))
+        if role in ("system", "developer"):
+            converted.append(SystemMessage(content=content))
+        elif role == "user":
+            converted.append(HumanMessage(content=content))
+        elif role == "assistant":
+            tool_calls = [
+                {"name": call["function"]["name"], "args": json.loads(call["function"].get("arguments") or "{}"),
+                 "id": call.get("id")}
+                for call in message.get("tool_calls") or []
+            ]
+            converted.append(AIMessage(content=content, tool_calls=tool_calls))
+        elif role == "tool":
+            converted.append(ToolMessage(content=content, tool_call_id=message.get("tool_call_id", "")))
+    return converted
+
+def _openai_tool_calls(message: AIMessage) -> List[Dict[str, Any]]:
+    return [
+        {"id": call["id"], "type": "function",
+         "function": {"name": call["name"], "arguments": json.dumps(call["args"], ensure_ascii=False)}}
+        for call in message.tool_calls
+    ]
+
+def create_stub_app(latency_ms: float = 0.0) -> FastAPI:
+    """Tạo FastAPI app giả lập OpenAI. `latency_ms` là độ trễ giả lập mỗi request."""
+    app = FastAPI(title="OpenAI stub")
+    app.state.requests = 0
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model", "owned_by": "stub"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        app.state.requests += 1
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+
+        tool_names = [t["function"]["name"] for t in payload.get("tools") or [] if t.get("type") == "function"]
+        model = ScriptedChatModel(bound_tool_names=tool_names or None)
+        reply = model._respond(openai_messages_to_langchain(payload.get("messages", [])))
+        tool_calls = _openai_tool_calls(reply)
+        finish_reason = "tool_calls" if tool_calls else "stop"
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model_name = payload.get("model", "gpt-4o-mini")
+        usage = {"prompt_tokens": sum(len(_content_text(m.get("content")).split()) for m in payload.get("messages", [])),
+                 "completion_tokens": len(str(reply.content).split()) + len(tool_calls)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if not payload.get("stream"):
+            message = {"role": "assistant", "content": reply.content or None}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            return {"id": completion_id, "object": "chat.completion", "created": created, "model": model_name,
+                    "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                    "usage": usage}
+
+        def chunk(delta: Dict[str, Any], finish: Any = None, **extra) -> str:
+            body = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model_name,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish}], **extra}
+            return f"data: {json.dumps(body, ensure_ascii=False)}\n\n"
+
+        async def stream():
+            yield chunk({"role": "assistant", "content": reply.content or ""})
+            for i, call in enumerate(tool_calls):
+                yield chunk({"tool_calls": [{"index": i, **call}]})
+            yield chunk({}, finish_reason)
+            if (payload.get("stream_options") or {}).get("include_usage"):
+                body = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                        "model": model_name, "choices": [], "usage": usage}
+                yield f"data: {json.dumps(body)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class StubServer:
+    """Chạy stub trong một thread nền; dùng như context manager, `base_url` trỏ tới `/v1`."""
+
+    def __init__(self, latency_ms: float = 0.0, port: int = 0):
+        self.port = port or _free_port()
+        self.app = create_stub_app(latency_ms)
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=self.port,
+                                                     log_level="warning", access_log=False))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        deadline = time.time() + 10
+        while not self._server.started:
+            if time.time() > deadline:
+                raise RuntimeError("OpenAI stub không khởi động được.")
+            time.sleep(0.02)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server giả lập OpenAI chat completions.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(create_stub_app(args.latency_ms), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,79 @@
+"""
+Các hội thoại mua sắm nhiều lượt (tiếng Việt) dùng cho load test. Mỗi kịch bản là một
+danh sách câu của khách; `build_sessions` phân phối kịch bản lên nhiều customer_id/threadId.
+"""
+import random
+from dataclasses import dataclass
+from typing import Dict, List
+
+SCENARIOS: Dict[str, List[str]] = {
+    "product_search": [
+        "Chào shop",
+        "Shop có iPhone 13 Pro Max không?",
+        "iPhone 13 Pro Max màu xanh 256GB giá bao nhiêu?",
+        "Máy đó pin còn bao nhiêu phần trăm?",
+    ],
+    "product_pagination": [
+        "Cho em xem các máy iPhone 14",
+        "Xem thêm các máy iPhone 14 khác",
+        "Còn gì nữa không shop, xem thêm iPhone 14 trang sau",
+    ],
+    "service_booking": [
+        "Thay pin iPhone 12 bao nhiêu tiền?",
+        "Thay màn hình iPhone 12 hết bao nhiêu?",
+        "Đặt lịch DV00001 thay pin iPhone 12 cho em. Tên Nam, sđt 0912345678, địa chỉ 5 Hai Bà Trưng, Q1",
+    ],
+    "faq_hits": [
+        "Chính sách đổi trả của shop thế nào?",
+        "Có hỗ trợ trả góp không?",
+        "Shop giao hàng tận nơi không?",
+        "Địa chỉ cửa hàng ở đâu?",
+    ],
+    "accessory_combo": [
+        "Cho em xem ốp lưng iPhone 13",
+        "iPhone 13 và sạc nhanh 20W giá sao?",
+        "Lấy PK000003 cho em. Tên Hoa, sđt 0987654321, địa chỉ 20 Nguyễn Huệ, Q1",
+    ],
+    "product_order": [
+        "Shop có iPhone 15 không?",
+        "iPhone 15 128GB màu đen còn hàng không?",
+        "Chốt đơn cho em",
+        "Chốt máy SP000002 iPhone 15 cho em. Tên Lan, sđt 0901234567, địa chỉ 12 Lê Lợi, Q1",
+    ],
+}
+
+# Trọng số gần với phân bố hội thoại thực tế: đa số hỏi giá/tìm máy, ít chốt đơn.
+SCENARIO_WEIGHTS: Dict[str, int] = {
+    "product_search": 30,
+    "product_pagination": 15,
+    "service_booking": 15,
+    "faq_hits": 20,
+    "accessory_combo": 10,
+    "product_order": 10,
+}
+
+@dataclass
+class Session:
+    customer_id: str
+    thread_id: str
+    scenario: str
+    turns: List[str]
+
+def customer_ids(n_customers: int) -> List[str]:
+    return [f"loadtest-shop-{i:03d}" for i in range(n_customers)]
+
+def build_sessions(n_sessions: int, n_customers: int, seed: int = 11, prefix: str = "lg") -> List[Session]:
+    """
+    Sinh `n_sessions` phiên chat, mỗi phiên có threadId riêng, chọn kịch bản theo trọng số
+    và gán vào một trong `n_customers` cửa hàng.
+    """
+    rng = random.Random(seed)
+    names = list(SCENARIO_WEIGHTS)
+    weights = [SCENARIO_WEIGHTS[name] for name in names]
+    shops = customer_ids(n_customers)
+    sessions = []
+    for i in range(n_sessions):
+        scenario = rng.choices(names, weights=weights)[0]
+        sessions.append(Session(customer_id=shops[i % len(shops)], thread_id=f"{prefix}-{seed}-{i:06d}",
+                                scenario=scenario, turns=SCENARIOS[scenario]))
+    return sessions
@@ -0,0 +1,87 @@
+"""
+Server giả lập Zalo API (`/api/groups/managers`, `/api/groups/send-message`) chạy cục bộ để kiểm thử
+outbox thông báo đơn hàng. Ghi lại mọi request nhận được; có thể giả lập độ trễ và lỗi cho
+`fail_first` request đầu tiên.
+
+Chạy độc lập:
+    python -m benchmarks.zalo_stub --port 8098 --latency-ms 500
+rồi khởi động ứng dụng với `ZALO_API_BASE_URL=http://127.0.0.1:8098`.
+"""
+import argparse
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from benchmarks.openai_stub import _free_port
+
+def create_zalo_stub_app(latency_ms: float = 0.0, fail_first: int = 0) -> FastAPI:
+    """Tạo FastAPI app giả lập Zalo API. `fail_first` request đầu tiên trả về lỗi 503."""
+    app = FastAPI(title="Zalo stub")
+    app.state.received: List[Dict[str, Any]] = []
+    app.state.failures_left = fail_first
+
+    async def handle(kind: str, request: Request):
+        payload = await request.json()
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if app.state.failures_left > 0:
+            app.state.failures_left -= 1
+            return JSONResponse(status_code=503, content={"error": "stub failure"})
+        app.state.received.append({"kind": kind, **payload})
+        return {"success": True, "thread_id": payload.get("thread_id")}
+
+    @app.post("/api/groups/managers")
+    async def create_group(request: Request):
+        return await handle("create_group", request)
+
+    @app.post("/api/groups/send-message")
+    async def send_message(request: Request):
+        return await handle("send_message", request)
+
+    return app
+
+class ZaloStubServer:
+    """Chạy stub trong một thread nền; dùng như context manager, `base_url` dùng cho ZALO_API_BASE_URL."""
+
+    def __init__(self, latency_ms: float = 0.0, fail_first: int = 0, port: int = 0):
+        self.port = port or _free_port()
+        self.app = create_zalo_stub_app(latency_ms, fail_first)
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=self.port,
+                                                     log_level="warning", access_log=False))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def received(self) -> List[Dict[str, Any]]:
+        return self.app.state.received
+
+    def __enter__(self) -> "ZaloStubServer":
+        self._thread.start()
+        deadline = time.time() + 10
+        while not self._server.started:
+            if time.time() > deadline:
+                raise RuntimeError("Zalo stub không khởi động được.")
+            time.sleep(0.02)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server giả lập Zalo API cho thông báo đơn hàng.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--fail-first", type=int, default=0)
+    args = parser.parse_args()
+    uvicorn.run(create_zalo_stub_app(args.latency_ms, args.fail_first), host=args.host, port=args.port,
+                log_level="warning")
@@ -11,6 +11,91 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 ELASTIC_HOST = os.getenv("ELASTIC_HOST")
 
+# Số bản ghi mỗi request bulk khi nạp dữ liệu vào Elasticsearch
+ES_BULK_CHUNK_SIZE = int(os.getenv("ES_BULK_CHUNK_SIZE", "500"))
+# Số dòng đọc mỗi lô khi xử lý file upload (Excel/CSV/Parquet)
+INGEST_BATCH_ROWS = int(os.getenv("INGEST_BATCH_ROWS", "5000"))
+
+# Thay thế catalog: "generation" (nạp vào thế hệ mới rồi chuyển đổi, không downtime) hoặc "clear" (xóa rồi nạp lại)
+CATALOG_REPLACE_MODE = os.getenv("CATALOG_REPLACE_MODE", "generation")
+# Thời gian cache thế hệ catalog đang hoạt động của mỗi khách hàng (giây)
+CATALOG_GENERATION_CACHE_TTL = float(os.getenv("CATALOG_GENERATION_CACHE_TTL", "5"))
+# Thời gian chờ trước khi xóa thế hệ catalog cũ, phải lớn hơn TTL cache (giây)
+CATALOG_GENERATION_GRACE_SECONDS = float(os.getenv("CATALOG_GENERATION_GRACE_SECONDS", "30"))
+# Tỉ lệ bản ghi lỗi tối đa để thế hệ catalog mới được đưa vào sử dụng (0 = chỉ khi không có bản ghi lỗi)
+CATALOG_MAX_FAILED_RATIO = float(os.getenv("CATALOG_MAX_FAILED_RATIO", "0"))
+
+# Khách hàng có số bản ghi trong một index chia sẻ vượt ngưỡng này sẽ được chuyển sang index riêng
+TENANT_DEDICATED_MIN_DOCS = int(os.getenv("TENANT_DEDICATED_MIN_DOCS", "100000"))
+# Thời gian cache vị trí index (chia sẻ/riêng) của mỗi khách hàng (giây)
+TENANT_PLACEMENT_CACHE_TTL = float(os.getenv("TENANT_PLACEMENT_CACHE_TTL", "5"))
+
+# Chính sách refresh mặc định sau khi ghi vào ES: "false", "wait_for" hoặc "coalesced" (gộp refresh sau một loạt ghi)
+ES_REFRESH_POLICY = os.getenv("ES_REFRESH_POLICY", "coalesced")
+# Khoảng thời gian gộp các lần ghi thành một lần refresh (giây)
+ES_REFRESH_COALESCE_SECONDS = float(os.getenv("ES_REFRESH_COALESCE_SECONDS", "1"))
+# Bộ đệm ghi từng dòng: số thao tác tối đa mỗi lô bulk và thời gian chờ gom lô (giây)
+ES_WRITE_BUFFER_MAX_DOCS = int(os.getenv("ES_WRITE_BUFFER_MAX_DOCS", "200"))
+ES_WRITE_BUFFER_FLUSH_SECONDS = float(os.getenv("ES_WRITE_BUFFER_FLUSH_SECONDS", "0.05"))
+
+# Gom các truy vấn tìm kiếm phát ra trong cùng một bước của agent thành một _msearch:
+# thời gian chờ gom (giây) và số truy vấn tối đa mỗi lô
+ES_MSEARCH_WINDOW_SECONDS = float(os.getenv("ES_MSEARCH_WINDOW_SECONDS", "0.002"))
+ES_MSEARCH_MAX_SEARCHES = int(os.getenv("ES_MSEARCH_MAX_SEARCHES", "20"))
+
+# Ngân sách token (ước lượng) cho kết quả mỗi lần gọi tool trong agent_scratchpad;
+# đặt riêng cho từng tool bằng JSON, ví dụ {"retrieve_document_tool": 1500}
+TOOL_OUTPUT_TOKEN_BUDGET = int(os.getenv("TOOL_OUTPUT_TOKEN_BUDGET", "1200"))
+TOOL_OUTPUT_TOKEN_BUDGETS = json.loads(os.getenv("TOOL_OUTPUT_TOKEN_BUDGETS", '{"retrieve_document_tool": 1500}'))
+
+# Bộ nhớ hội thoại: số lượt gần nhất giữ nguyên văn (phần cũ hơn được gộp vào bản tóm tắt)
+# và ngân sách token cho bản tóm tắt + các lượt gần nhất
+CHAT_MEMORY_RECENT_TURNS = int(os.getenv("CHAT_MEMORY_RECENT_TURNS", "3"))
+CHAT_MEMORY_TOKEN_BUDGET = int(os.getenv("CHAT_MEMORY_TOKEN_BUDGET", "1500"))
+
+# Ghi lịch sử chat ở nền: số tin nhắn tối đa chờ ghi, số tin nhắn mỗi lô INSERT và thời gian gom lô (giây)
+CHAT_WRITE_QUEUE_MAX = int(os.getenv("CHAT_WRITE_QUEUE_MAX", "10000"))
+CHAT_WRITE_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BATCH_SIZE", "200"))
+CHAT_WRITE_FLUSH_SECONDS = float(os.getenv("CHAT_WRITE_FLUSH_SECONDS", "0.05"))
+# File lưu tạm tin nhắn chat chưa ghi được khi tắt ứng dụng (ghi lại ở lần khởi động sau)
+CHAT_WRITE_FALLBACK_PATH = os.getenv("CHAT_WRITE_FALLBACK_PATH", "chat_history_fallback.jsonl")
+
+# Thời gian cache thông tin liên hệ của khách theo thread (giây)
+CONTACT_PROFILE_CACHE_TTL = float(os.getenv("CONTACT_PROFILE_CACHE_TTL", "300"))
+
+# Thời gian cache thông tin cửa hàng đã render của mỗi khách hàng (giây); cập nhật qua API sẽ xóa cache ngay
+STORE_INFO_CACHE_TTL = float(os.getenv("STORE_INFO_CACHE_TTL", "300"))
+
+# Chu kỳ kiểm tra phiên bản system instructions (giây) để các worker khác nạp lại khi admin cập nhật
+INSTRUCTION_VERSION_POLL_SECONDS = float(os.getenv("INSTRUCTION_VERSION_POLL_SECONDS", "2"))
+
+# Dùng lại LLM client giữa các request: số client tối đa giữ trong bộ nhớ và thời gian
+# không dùng (giây) trước khi bị loại bỏ
+LLM_REGISTRY_MAX_CLIENTS = int(os.getenv("LLM_REGISTRY_MAX_CLIENTS", "64"))
+LLM_REGISTRY_IDLE_SECONDS = float(os.getenv("LLM_REGISTRY_IDLE_SECONDS", "1800"))
+
+# Model theo tầng: "agent" cho agent đầy đủ (có tool), "fast" cho câu trả lời nhanh không cần tool
+# và cho bước lọc kết quả tìm kiếm. TENANT_LLM_MODELS ghi đè theo khách hàng, ví dụ
+# {"shop_a": {"google_genai": {"agent": "gemini-2.5-pro"}}}
+LLM_MODELS = json.loads(os.getenv("LLM_MODELS", json.dumps({
+    "google_genai": {"agent": "gemini-2.5-flash", "fast": "gemini-2.0-flash"},
+    "openai": {"agent": "gpt-4o-mini", "fast": "gpt-4o-mini"}
+})))
+TENANT_LLM_MODELS = json.loads(os.getenv("TENANT_LLM_MODELS", "{}"))
+# Định tuyến lượt chat bằng luật từ khóa: chào hỏi, hỏi thông tin cửa hàng, câu khớp FAQ được trả lời
+# bằng model "fast" trong một lần gọi, không chạy agent nhiều bước ("0" để tắt)
+MODEL_ROUTING_ENABLED = os.getenv("MODEL_ROUTING_ENABLED", "1") == "1"
+
+# Múi giờ của cửa hàng, dùng để gom đơn hàng theo ngày (created_at lưu theo giờ UTC)
+SHOP_TIMEZONE = os.getenv("SHOP_TIMEZONE", "Asia/Ho_Chi_Minh")
+
+# Gửi thông báo đơn hàng qua Zalo ở nền (outbox): địa chỉ API, timeout mỗi request,
+# chu kỳ quét và số lần thử tối đa (thử lại với backoff tăng dần)
+ZALO_API_BASE_URL = os.getenv("ZALO_API_BASE_URL", "https://zaloapi.doiquanai.vn")
+ZALO_API_TIMEOUT_SECONDS = float(os.getenv("ZALO_API_TIMEOUT_SECONDS", "10"))
+ZALO_OUTBOX_POLL_SECONDS = float(os.getenv("ZALO_OUTBOX_POLL_SECONDS", "5"))
+ZALO_OUTBOX_MAX_ATTEMPTS = int(os.getenv("ZALO_OUTBOX_MAX_ATTEMPTS", "6"))
+
 # FastAPI Config
 APP_CONFIG = {
     "title": "Chatbot Tư Vấn Bán Hàng - Cửa Hàng Điện Thoại Di Động",
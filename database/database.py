@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine, Column, String, Boolean, Text, Integer, LargeBinary, DateTime
+from sqlalchemy import create_engine, Column, String, Boolean, Text, Integer, LargeBinary, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 from datetime import datetime, timezone
@@ -50,6 +50,14 @@ class SystemInstruction(Base):
     key = Column(String, primary_key=True, index=True)
     value = Column(Text, nullable=False)
 
+class SystemInstructionVersion(Base):
+    """Một dòng duy nhất (id=1): phiên bản tăng dần mỗi khi system_instructions thay đổi."""
+    __tablename__ = "system_instruction_versions"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
 class ChatThread(Base):
     __tablename__ = "chat_threads"
 
@@ -64,7 +72,7 @@ class ChatHistory(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     customer_id = Column(String, index=True, nullable=False)
     thread_id = Column(String, index=True, nullable=False)
-    thread_name = Column(String, nullable=True)
+    # Tên thread lấy từ chat_threads (join theo customer_id, thread_id), không lưu lặp ở mỗi tin nhắn.
     role = Column(String, nullable=False)
     message = Column(Text, nullable=False)
 
@@ -105,6 +113,7 @@ class ProductOrder(Base):
     loai_don_hang = Column(String, default="Sản phẩm", nullable=False)
     status = Column(String, default="Chưa gọi", nullable=False)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    idempotency_key = Column(String, unique=True, nullable=True)
 
 class ServiceOrder(Base):
     __tablename__ = "service_orders"
@@ -123,6 +132,7 @@ class ServiceOrder(Base):
     loai_don_hang = Column(String, default="Dịch vụ", nullable=False)
     status = Column(String, default="Chưa gọi", nullable=False)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    idempotency_key = Column(String, unique=True, nullable=True)
 
 class AccessoryOrder(Base):
     __tablename__ = "accessory_orders"
@@ -140,6 +150,16 @@ class AccessoryOrder(Base):
     loai_don_hang = Column(String, default="Phụ kiện", nullable=False)
     status = Column(String, default="Chưa gọi", nullable=False)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    idempotency_key = Column(String, unique=True, nullable=True)
+
+# Chỉ mục phục vụ danh sách đơn hàng mới nhất của từng khách (phân trang keyset theo created_at, order_id).
+for _order_model in (ProductOrder, ServiceOrder, AccessoryOrder):
+    Index(
+        f"ix_{_order_model.__tablename__}_customer_created",
+        _order_model.customer_id,
+        _order_model.created_at.desc(),
+        _order_model.order_id.desc()
+    )
 
 class ChatCustomer(Base):
     __tablename__ = "chat_customers"
@@ -147,6 +167,65 @@ class ChatCustomer(Base):
     customer_id = Column(String, primary_key=True, index=True)
     status = Column(String, default="active", nullable=False)  # active, stopped
 
+class CatalogGeneration(Base):
+    __tablename__ = "catalog_generations"
+
+    customer_id = Column(String, primary_key=True, index=True)
+    index_name = Column(String, primary_key=True)
+    active_generation = Column(String, nullable=False)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+class TenantPlacement(Base):
+    __tablename__ = "tenant_placements"
+
+    customer_id = Column(String, primary_key=True, index=True)
+    index_name = Column(String, primary_key=True)
+    # "migrating": đang chép sang index riêng (ghi vào cả hai, đọc từ index chia sẻ); "dedicated": dùng index riêng
+    status = Column(String, nullable=False, default="migrating")
+    dedicated_index = Column(String, nullable=False)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+class ChatSummary(Base):
+    __tablename__ = "chat_summaries"
+
+    customer_id = Column(String, primary_key=True, index=True)
+    thread_id = Column(String, primary_key=True, index=True)
+    summary = Column(Text, nullable=False, default="")
+    # id lớn nhất trong chat_history đã được gộp vào bản tóm tắt
+    last_message_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+class CustomerContactProfile(Base):
+    """Thông tin liên hệ gần nhất của khách trong một thread, cập nhật mỗi khi tạo đơn hàng."""
+    __tablename__ = "customer_contact_profiles"
+
+    customer_id = Column(String, primary_key=True, index=True)
+    thread_id = Column(String, primary_key=True, index=True)
+    ten_khach_hang = Column(String, nullable=False)
+    so_dien_thoai = Column(String, nullable=False)
+    dia_chi = Column(Text, nullable=False)
+    last_order_id = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+class OrderNotification(Base):
+    """Outbox thông báo Zalo cho đơn hàng: ghi cùng transaction với đơn, gửi ở nền."""
+    __tablename__ = "order_notifications"
+    __table_args__ = (UniqueConstraint("order_id", "kind", name="uq_order_notifications_order_kind"),)
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    order_id = Column(String, nullable=False)
+    customer_id = Column(String, index=True, nullable=False)
+    thread_id = Column(String, nullable=False)
+    kind = Column(String, nullable=False)  # create_group, send_message
+    payload = Column(Text, nullable=False)
+    status = Column(String, default="pending", nullable=False)  # pending, sent, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, index=True, default=lambda: datetime.now(timezone.utc))
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+
 
 
 def init_db():
@@ -0,0 +1,140 @@
+"""
+Chuyển các khách hàng lớn từ index chia sẻ sang index riêng, không downtime.
+
+Với mỗi (index, khách hàng) có số bản ghi >= TENANT_DEDICATED_MIN_DOCS (hoặc chỉ định bằng --customer):
+1. Tạo index riêng `<index>-t-<khách hàng>` với settings/mapping của index chia sẻ.
+2. Đặt trạng thái "migrating": mọi thao tác ghi đi vào cả index chia sẻ và index riêng, đọc vẫn từ index chia sẻ.
+3. Chờ hết TTL cache vị trí để mọi worker đã chuyển sang ghi kép, rồi reindex dữ liệu của khách hàng
+   (op_type=create nên không ghi đè bản ghi mới hơn do ghi kép) và xóa các bản ghi thừa đã bị xóa trong lúc chép.
+4. Đặt trạng thái "dedicated": đọc/ghi chỉ dùng index riêng. Sau khi hết TTL cache, xóa dữ liệu của khách hàng
+   khỏi index chia sẻ.
+
+Cách dùng:
+    python migrate_tenant_indices.py --dry-run                 # chỉ liệt kê khách hàng vượt ngưỡng
+    python migrate_tenant_indices.py                           # chuyển tất cả khách hàng vượt ngưỡng
+    python migrate_tenant_indices.py --index products --customer shop123
+"""
+import argparse
+import asyncio
+import sys
+from typing import List, Tuple
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_scan
+
+from config.settings import ELASTIC_HOST, TENANT_DEDICATED_MIN_DOCS, TENANT_PLACEMENT_CACHE_TTL
+from database.database import engine, TenantPlacement
+from service.data.data_loader_elastic_search import (
+    SHARED_INDEX_TYPES,
+    get_shared_index_mapping,
+    put_shared_index_templates
+)
+from service.data.es_analysis import get_shared_index_settings
+from service.data.tenant_placement import (
+    SHARED, MIGRATING, DEDICATED,
+    dedicated_index_name, get_placement, set_placement
+)
+from service.utils.helpers import sanitize_for_es
+
+async def find_large_tenants(es_client: AsyncElasticsearch, index_name: str, min_docs: int) -> List[Tuple[str, int]]:
+    """Các khách hàng còn nằm trong index chia sẻ có ít nhất `min_docs` bản ghi, lớn nhất trước."""
+    response = await es_client.search(
+        index=index_name,
+        size=0,
+        aggs={"tenants": {"terms": {"field": "customer_id", "size": 1000, "min_doc_count": min_docs}}}
+    )
+    buckets = response["aggregations"]["tenants"]["buckets"]
+    return [(bucket["key"], bucket["doc_count"]) for bucket in buckets]
+
+async def _doc_ids(es_client: AsyncElasticsearch, index_name: str, customer_id: str, routing=None) -> set:
+    ids = set()
+    async for hit in async_scan(es_client, index=index_name, routing=routing, _source=False,
+                                query={"query": {"term": {"customer_id": customer_id}}}):
+        ids.add(hit["_id"])
+    return ids
+
+async def migrate_tenant(es_client: AsyncElasticsearch, index_name: str, customer_id: str):
+    status, _ = get_placement(index_name, customer_id, use_cache=False)
+    if status == DEDICATED:
+        print(f"⏭️ '{customer_id}' đã dùng index riêng cho '{index_name}'.")
+        return
+    dedicated_index = dedicated_index_name(index_name, customer_id)
+    data_type = SHARED_INDEX_TYPES[index_name]
+
+    if not await es_client.indices.exists(index=dedicated_index):
+        print(f"🛠 Tạo index riêng '{dedicated_index}'...")
+        await es_client.indices.create(index=dedicated_index, settings=get_shared_index_settings(data_type),
+                                       mappings=get_shared_index_mapping(data_type))
+
+    set_placement(index_name, customer_id, MIGRATING, dedicated_index)
+    print(f"🔁 Bật ghi kép cho '{customer_id}', chờ {TENANT_PLACEMENT_CACHE_TTL:.0f}s để mọi worker cập nhật...")
+    await asyncio.sleep(TENANT_PLACEMENT_CACHE_TTL + 1)
+
+    try:
+        result = await es_client.options(request_timeout=3600).reindex(
+            source={"index": index_name, "query": {"term": {"customer_id": customer_id}}},
+            dest={"index": dedicated_index, "op_type": "create", "routing": "discard"},
+            conflicts="proceed",
+            wait_for_completion=True,
+            slices="auto",
+            refresh=True
+        )
+        if result.get("failures"):
+            raise RuntimeError(f"Reindex thất bại: {result['failures'][:3]}")
+        print(f"✅ Đã chép {result.get('created', 0)} bản ghi sang '{dedicated_index}'.")
+
+        # Bản ghi bị xóa khỏi index chia sẻ trong lúc chép có thể đã được reindex sang index riêng.
+        await es_client.indices.refresh(index=index_name)
+        extra_ids = (await _doc_ids(es_client, dedicated_index, customer_id)
+                     - await _doc_ids(es_client, index_name, customer_id, routing=customer_id))
+        if extra_ids:
+            await es_client.delete_by_query(index=dedicated_index, query={"ids": {"values": list(extra_ids)}},
+                                            conflicts="proceed", refresh=True)
+            print(f"🧹 Đã xóa {len(extra_ids)} bản ghi thừa trong '{dedicated_index}'.")
+    except Exception:
+        set_placement(index_name, customer_id, SHARED)
+        raise
+
+    set_placement(index_name, customer_id, DEDICATED, dedicated_index)
+    print(f"🔀 '{customer_id}' đã chuyển sang index riêng '{dedicated_index}'. Chờ {TENANT_PLACEMENT_CACHE_TTL:.0f}s trước khi dọn index chia sẻ...")
+    await asyncio.sleep(TENANT_PLACEMENT_CACHE_TTL + 1)
+    await es_client.delete_by_query(
+        index=index_name,
+        query={"term": {"customer_id": customer_id}},
+        routing=customer_id,
+        conflicts="proceed",
+        wait_for_completion=False
+    )
+    print(f"🗑️ Đã yêu cầu xóa dữ liệu của '{customer_id}' khỏi '{index_name}'.")
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Chuyển khách hàng lớn sang index Elasticsearch riêng.")
+    parser.add_argument("--index", action="append", choices=list(SHARED_INDEX_TYPES),
+                        help="Index chia sẻ cần kiểm tra (mặc định: tất cả).")
+    parser.add_argument("--customer", action="append", help="Chỉ chuyển các customer_id này (bỏ qua ngưỡng).")
+    parser.add_argument("--min-docs", type=int, default=TENANT_DEDICATED_MIN_DOCS, help="Ngưỡng số bản ghi.")
+    parser.add_argument("--dry-run", action="store_true", help="Chỉ liệt kê, không chuyển.")
+    args = parser.parse_args(argv)
+
+    TenantPlacement.__table__.create(bind=engine, checkfirst=True)
+    es_client = AsyncElasticsearch(hosts=[ELASTIC_HOST])
+    try:
+        await put_shared_index_templates(es_client)
+        for index_name in args.index or list(SHARED_INDEX_TYPES):
+            if args.customer:
+                tenants = [(sanitize_for_es(customer_id), None) for customer_id in args.customer]
+            else:
+                tenants = await find_large_tenants(es_client, index_name, args.min_docs)
+            for customer_id, doc_count in tenants:
+                print(f"📦 {index_name}: '{customer_id}'" + (f" ({doc_count} bản ghi)" if doc_count else ""))
+                if not args.dry_run:
+                    await migrate_tenant(es_client, index_name, customer_id)
+        return 0
+    except Exception as e:
+        print(f"❌ Lỗi khi chuyển index: {e}")
+        return 1
+    finally:
+        await es_client.close()
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,17 @@
+from database.database import engine, CatalogGeneration
+
+def run_migration():
+    """
+    Tạo bảng 'catalog_generations' lưu thế hệ catalog đang hoạt động của mỗi khách hàng
+    trên từng index Elasticsearch (dùng cho thay thế catalog không downtime).
+    """
+    print("🚀 Đang tạo bảng 'catalog_generations'...")
+    try:
+        CatalogGeneration.__table__.create(bind=engine, checkfirst=True)
+        print("✅ Đã tạo bảng 'catalog_generations' (hoặc bảng đã tồn tại).")
+    except Exception as e:
+        print(f"❌ Migration thất bại: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,16 @@
+from database.database import engine, ChatSummary
+
+def run_migration():
+    """
+    Tạo bảng 'chat_summaries' lưu bản tóm tắt hội thoại của từng thread.
+    """
+    print("🚀 Đang tạo bảng 'chat_summaries'...")
+    try:
+        ChatSummary.__table__.create(bind=engine, checkfirst=True)
+        print("✅ Đã tạo bảng 'chat_summaries' (hoặc bảng đã tồn tại).")
+    except Exception as e:
+        print(f"❌ Migration thất bại: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,37 @@
+from sqlalchemy import text
+from database.database import engine, CustomerContactProfile
+
+def run_migration():
+    """
+    Tạo bảng 'customer_contact_profiles' (thông tin liên hệ gần nhất của khách theo thread) và
+    điền dữ liệu từ đơn hàng mới nhất của mỗi thread trong ba bảng đơn hàng.
+    """
+    print("🚀 Đang tạo bảng 'customer_contact_profiles'...")
+    try:
+        CustomerContactProfile.__table__.create(bind=engine, checkfirst=True)
+        print("✅ Đã tạo bảng 'customer_contact_profiles' (hoặc bảng đã tồn tại).")
+
+        print("🚀 Đang điền thông tin liên hệ từ các đơn hàng hiện có...")
+        with engine.begin() as connection:
+            result = connection.execute(text("""
+                INSERT INTO customer_contact_profiles
+                    (customer_id, thread_id, ten_khach_hang, so_dien_thoai, dia_chi, last_order_id, updated_at)
+                SELECT DISTINCT ON (customer_id, thread_id)
+                    customer_id, thread_id, ten_khach_hang, so_dien_thoai, dia_chi, order_id, created_at
+                FROM (
+                    SELECT customer_id, thread_id, ten_khach_hang, so_dien_thoai, dia_chi, order_id, created_at FROM product_orders
+                    UNION ALL
+                    SELECT customer_id, thread_id, ten_khach_hang, so_dien_thoai, dia_chi, order_id, created_at FROM service_orders
+                    UNION ALL
+                    SELECT customer_id, thread_id, ten_khach_hang, so_dien_thoai, dia_chi, order_id, created_at FROM accessory_orders
+                ) AS orders
+                ORDER BY customer_id, thread_id, created_at DESC
+                ON CONFLICT (customer_id, thread_id) DO NOTHING
+            """))
+        print(f"✅ Đã điền {result.rowcount} thread.")
+    except Exception as e:
+        print(f"❌ Migration thất bại: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,20 @@
+from database.database import engine, ProductOrder, ServiceOrder, AccessoryOrder
+
+def run_migration():
+    """
+    Tạo chỉ mục (customer_id, created_at DESC, order_id DESC) trên ba bảng đơn hàng
+    cho danh sách đơn hàng gộp và phân trang keyset.
+    """
+    try:
+        for model in (ProductOrder, ServiceOrder, AccessoryOrder):
+            for index in model.__table__.indexes:
+                if index.name.endswith("_customer_created"):
+                    print(f"🚀 Đang tạo chỉ mục '{index.name}'...")
+                    index.create(bind=engine, checkfirst=True)
+        print("✅ Đã tạo các chỉ mục đơn hàng (hoặc chỉ mục đã tồn tại).")
+    except Exception as e:
+        print(f"❌ Migration thất bại: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,30 @@
+from sqlalchemy import text
+from database.database import engine
+
+ORDER_TABLES = ["product_orders", "service_orders", "accessory_orders"]
+
+def run_migration():
+    """
+    Thêm cột 'idempotency_key' (unique) vào các bảng đơn hàng để lần gọi lại tool tạo đơn
+    trong cùng lượt chat trả về đơn đã có thay vì tạo đơn trùng.
+    """
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            for table in ORDER_TABLES:
+                print(f"🚀 Đang thêm cột 'idempotency_key' vào bảng '{table}'...")
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR"))
+                connection.execute(text(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_idempotency_key_key ON {table} (idempotency_key)"
+                ))
+                print(f"   ✅ Đã cập nhật bảng '{table}'.")
+            transaction.commit()
+            print("🎉 Migration hoàn tất!")
+        except Exception as e:
+            print(f"❌ Migration thất bại: {e}")
+            print("   - Đang rollback...")
+            transaction.rollback()
+            raise
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,16 @@
+from database.database import engine, OrderNotification
+
+def run_migration():
+    """
+    Tạo bảng 'order_notifications' (outbox thông báo Zalo của đơn hàng).
+    """
+    print("🚀 Đang tạo bảng 'order_notifications'...")
+    try:
+        OrderNotification.__table__.create(bind=engine, checkfirst=True)
+        print("✅ Đã tạo bảng 'order_notifications' (hoặc bảng đã tồn tại).")
+    except Exception as e:
+        print(f"❌ Migration thất bại: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,23 @@
+from sqlalchemy.dialects.postgresql import insert
+
+from database.database import engine, SystemInstructionVersion
+
+def run_migration():
+    """
+    Tạo bảng 'system_instruction_versions' lưu phiên bản của system instructions
+    (các worker so phiên bản để biết khi nào cần nạp lại instructions).
+    """
+    print("🚀 Đang tạo bảng 'system_instruction_versions'...")
+    try:
+        SystemInstructionVersion.__table__.create(bind=engine, checkfirst=True)
+        print("✅ Đã tạo bảng 'system_instruction_versions' (hoặc bảng đã tồn tại).")
+        # Tạo sẵn dòng phiên bản duy nhất (id=1) để các lần cập nhật chỉ cần tăng phiên bản.
+        with engine.begin() as connection:
+            connection.execute(insert(SystemInstructionVersion).values(id=1, version=0).on_conflict_do_nothing())
+        print("✅ Đã tạo dòng phiên bản system instructions (hoặc dòng đã tồn tại).")
+    except Exception as e:
+        print(f"❌ Migration thất bại: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
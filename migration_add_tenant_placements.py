@@ -0,0 +1,16 @@
+from database.database import engine, TenantPlacement
+
+def run_migration():
+    """
+    Tạo bảng 'tenant_placements' lưu khách hàng nào đã được chuyển sang index Elasticsearch riêng.
+    """
+    print("🚀 Đang tạo bảng 'tenant_placements'...")
+    try:
+        TenantPlacement.__table__.create(bind=engine, checkfirst=True)
+        print("✅ Đã tạo bảng 'tenant_placements' (hoặc bảng đã tồn tại).")
+    except Exception as e:
+        print(f"❌ Migration thất bại: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
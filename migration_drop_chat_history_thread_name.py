@@ -0,0 +1,44 @@
+import os
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+engine = create_engine(DATABASE_URL)
+
+def run_migration():
+    """
+    Bỏ cột 'thread_name' lặp lại ở mỗi dòng chat_history. Tên thread được lưu duy nhất ở chat_threads:
+    trước khi xóa cột, tên gần nhất của mỗi thread được chép sang chat_threads (tạo dòng mới nếu chưa có,
+    không ghi đè tên đã đặt).
+    """
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            print("🚀 Đang chép thread_name từ chat_history sang chat_threads...")
+            result = connection.execute(text("""
+                INSERT INTO chat_threads (customer_id, thread_id, thread_name, status)
+                SELECT DISTINCT ON (customer_id, thread_id) customer_id, thread_id, thread_name, 'active'
+                FROM chat_history
+                WHERE thread_name IS NOT NULL
+                ORDER BY customer_id, thread_id, id DESC
+                ON CONFLICT (customer_id, thread_id) DO UPDATE
+                SET thread_name = COALESCE(chat_threads.thread_name, EXCLUDED.thread_name)
+            """))
+            print(f"   ✅ Đã cập nhật {result.rowcount} thread.")
+
+            print("   - Xóa cột 'thread_name' khỏi chat_history...")
+            connection.execute(text("ALTER TABLE chat_history DROP COLUMN IF EXISTS thread_name"))
+            print("   ✅ Đã xóa cột 'thread_name'.")
+
+            transaction.commit()
+            print("🎉 Migration hoàn tất!")
+        except Exception as e:
+            print(f"❌ Migration thất bại: {e}")
+            print("   - Đang rollback...")
+            transaction.rollback()
+            raise
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,120 @@
+"""
+Chuyển các index chia sẻ sang mapping/analyzer mới mà không mất dữ liệu và không downtime.
+
+Với mỗi index (products, services, accessories, faqs):
+1. Cài lại index template.
+2. Tạo index phiên bản mới `<index>_v<N>` với settings/mapping hiện tại.
+3. Reindex toàn bộ dữ liệu từ index đang dùng sang index mới và kiểm tra số lượng document.
+4. Chuyển alias `<index>` sang index mới trong MỘT lệnh update_aliases (nguyên tử).
+   Nếu `<index>` đang là index thật (chưa dùng alias), index cũ bị thay bằng alias trong cùng lệnh đó.
+
+Cách dùng:
+    python reindex_es.py                      # tất cả index chia sẻ
+    python reindex_es.py faqs products        # chỉ các index chỉ định
+    python reindex_es.py --delete-old         # xóa index phiên bản cũ sau khi chuyển alias
+
+Lưu ý: các thay đổi ghi vào index trong lúc reindex có thể không được chép sang; nên chạy khi
+không có thao tác nạp dữ liệu.
+"""
+import argparse
+import asyncio
+import re
+import sys
+
+from elasticsearch import AsyncElasticsearch
+
+from config.settings import ELASTIC_HOST
+from service.data.data_loader_elastic_search import (
+    SHARED_INDEX_TYPES,
+    get_shared_index_mapping,
+    put_shared_index_templates
+)
+from service.data.es_analysis import get_shared_index_settings
+
+async def _current_target(es_client: AsyncElasticsearch, name: str):
+    """Trả về (index thật đang phục vụ `name`, `name` có phải là alias hay không)."""
+    if await es_client.indices.exists_alias(name=name):
+        aliases = await es_client.indices.get_alias(name=name)
+        return next(iter(aliases.body)), True
+    if await es_client.indices.exists(index=name):
+        return name, False
+    return None, False
+
+def _next_version_name(name: str, current: str) -> str:
+    match = re.fullmatch(rf"{re.escape(name)}_v(\d+)", current or "")
+    version = int(match.group(1)) + 1 if match else 1
+    return f"{name}_v{version}"
+
+async def reindex_shared_index(es_client: AsyncElasticsearch, name: str, delete_old: bool = False):
+    data_type = SHARED_INDEX_TYPES[name]
+    current, is_alias = await _current_target(es_client, name)
+    new_index = _next_version_name(name, current)
+    while await es_client.indices.exists(index=new_index):
+        new_index = _next_version_name(name, new_index)
+
+    settings = get_shared_index_settings(data_type)
+    # Tắt refresh và replica trong lúc chép để reindex nhanh hơn, bật lại trước khi chuyển alias.
+    settings["index"] = {"refresh_interval": "-1", "number_of_replicas": 0}
+    print(f"🛠 Tạo index '{new_index}' cho '{name}'...")
+    await es_client.indices.create(index=new_index, settings=settings, mappings=get_shared_index_mapping(data_type))
+
+    if current:
+        print(f"🔁 Reindex '{current}' -> '{new_index}'...")
+        result = await es_client.options(request_timeout=3600).reindex(
+            source={"index": current},
+            dest={"index": new_index},
+            wait_for_completion=True,
+            slices="auto",
+            refresh=True
+        )
+        if result.get("failures"):
+            raise RuntimeError(f"Reindex '{current}' thất bại: {result['failures'][:3]}")
+        print(f"✅ Đã chép {result.get('total', 0)} document.")
+
+    await es_client.indices.put_settings(index=new_index, settings={"index": {"refresh_interval": None, "number_of_replicas": None}})
+    await es_client.indices.refresh(index=new_index)
+
+    if current:
+        old_count = (await es_client.count(index=current))["count"]
+        new_count = (await es_client.count(index=new_index))["count"]
+        if new_count < old_count:
+            raise RuntimeError(f"Số document không khớp: '{current}' có {old_count}, '{new_index}' có {new_count}. Giữ nguyên alias.")
+
+    actions = [{"add": {"index": new_index, "alias": name}}]
+    if current and is_alias:
+        actions.insert(0, {"remove": {"index": current, "alias": name}})
+    elif current:
+        actions.append({"remove_index": {"index": current}})
+    await es_client.indices.update_aliases(actions=actions)
+    print(f"🔀 Alias '{name}' -> '{new_index}'.")
+
+    if current and is_alias and delete_old:
+        await es_client.indices.delete(index=current)
+        print(f"🗑️ Đã xóa index cũ '{current}'.")
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Reindex các index chia sẻ sang mapping mới và chuyển alias.")
+    parser.add_argument("indices", nargs="*", default=list(SHARED_INDEX_TYPES), help="Tên index chia sẻ.")
+    parser.add_argument("--delete-old", action="store_true", help="Xóa index phiên bản cũ sau khi chuyển alias.")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.indices if name not in SHARED_INDEX_TYPES]
+    if unknown:
+        print(f"❌ Index không hợp lệ: {', '.join(unknown)}")
+        return 1
+
+    es_client = AsyncElasticsearch(hosts=[ELASTIC_HOST])
+    try:
+        await put_shared_index_templates(es_client)
+        for name in args.indices:
+            await reindex_shared_index(es_client, name, args.delete_old)
+        print("✅ Hoàn tất reindex.")
+        return 0
+    except Exception as e:
+        print(f"❌ Lỗi khi reindex: {e}")
+        return 1
+    finally:
+        await es_client.close()
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
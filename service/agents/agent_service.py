@@ -2,16 +2,39 @@ from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.agents import create_tool_calling_agent, AgentExecutor
 from langchain_core.messages import AIMessage, HumanMessage, BaseMessage
-from langchain.chat_models import init_chat_model
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.language_models.chat_models import BaseChatModel
 from sqlalchemy.orm import Session
 from elasticsearch import AsyncElasticsearch
-from typing import List
+from typing import List, Optional
 
 load_dotenv()
 
 from service.utils.tools import create_customer_tools
-from database.database import Customer, SystemInstruction, ChatHistory, ChatThread
+from database.database import Customer, ChatHistory, ChatSummary
 from service.retrieve.search_service import search_faqs
+from service.retrieve.search_batcher import search_batch_scope
+from service.agents.tool_output_budget import tool_output_scope, stats_summary
+from service.utils.order_ids import order_turn_scope
+from service.utils.store_info_cache import get_store_info_result
+from service.agents.instruction_store import get_instruction_snapshot
+from service.agents.prompt_builder import build_system_prompt, build_fast_reply_prompt, order_tools, PromptCacheUsageHandler
+from service.agents.llm_registry import get_pooled_chat_model
+from service.agents.model_router import AGENT, ROUTE_AGENT, resolve_model_name, route_turn
+from config.settings import MODEL_ROUTING_ENABLED
+from service.agents.chat_memory import load_conversation_memory, summary_messages, schedule_summary_update
+from service.agents.chat_history_writer import get_chat_history_writer
+
+def get_chat_model(llm_provider: str = "google_genai", api_key: str = None, tier: str = AGENT,
+                   customer_id: Optional[str] = None) -> BaseChatModel:
+    """
+    Chat model theo provider và API key của khách hàng (dùng lại client giữa các request).
+    `tier` là "agent" (agent đầy đủ) hoặc "fast" (trả lời nhanh); tên model lấy từ LLM_MODELS/TENANT_LLM_MODELS.
+    """
+    if not api_key:
+        raise ValueError("Bạn chưa thêm API key bên trang cấu hình.")
+
+    return get_pooled_chat_model(llm_provider, resolve_model_name(llm_provider, tier, customer_id), api_key)
 
 def create_agent_executor(
     es_client: AsyncElasticsearch,
@@ -20,28 +43,21 @@ def create_agent_executor(
     customer_config: Customer,
     thread_id: str = None,
     llm_provider: str = "google_genai",
-    api_key: str = None
+    api_key: str = None,
+    llm: Optional[BaseChatModel] = None
 ):
     """
     Tạo và trả về một Agent Executor, được cấu hình cho một khách hàng cụ thể.
+    Nếu truyền sẵn `llm` (ví dụ model giả lập trong benchmark) thì bỏ qua bước khởi tạo model.
     """
-    if not api_key:
-        raise ValueError("Bạn chưa thêm API key bên trang cấu hình.")
-
-    if llm_provider == "google_genai":
-        llm = init_chat_model(model="gemini-2.5-flash", model_provider="google_genai", api_key=api_key)
-    elif llm_provider == "openai":
-        llm = init_chat_model(model="gpt-4o-mini", model_provider="openai", api_key=api_key)
-    else:
-        raise ValueError(f"Không tìm thấy LLM provider: {llm_provider}")
+    if llm is None:
+        llm = get_chat_model(llm_provider, api_key)
 
-    persona = {"ai_name": customer_config.ai_name, "ai_role": customer_config.ai_role}
-    custom_prompt_text = customer_config.custom_prompt or ""
     product_feature_enabled = customer_config.product_feature_enabled
     service_feature_enabled = customer_config.service_feature_enabled
     accessory_feature_enabled = customer_config.accessory_feature_enabled
 
-    customer_tools = create_customer_tools(
+    customer_tools = order_tools(create_customer_tools(
         es_client, 
         customer_id, 
         thread_id,
@@ -49,100 +65,18 @@ def create_agent_executor(
         service_feature_enabled, 
         accessory_feature_enabled,
         llm=llm
-    )
-
-    identity = ""
-    if persona['ai_role']:
-        identity = f"đóng vai là một {persona['ai_role']} am hiểu và thân thiện"
-    if persona['ai_name']:
-        identity += f" tên là {persona['ai_name']}"
-        
-    db_instructions = db.query(SystemInstruction).all()
-    instructions_dict = {instr.key: instr.value for instr in db_instructions}
-
-    indentity_instructions = f"""
-        Bạn là một chuyên gia tư vấn của một cửa hàng sản phẩm và cung cấp một số các dịch vụ, {identity}.
-        Luôn xưng hô là "em" và gọi khách hàng là "anh/chị". Khi nói về cửa hàng, hãy dùng "bên em".
-        Hãy mô tả một cách khách quan, ví dụ: "sản phẩm có...", "máy được trang bị...".
-    """
-    base_instructions = instructions_dict.get("base_instructions", "")
+    ))
 
-    product_workflow = instructions_dict.get("product_workflow", "")
-    service_workflow = instructions_dict.get("service_workflow", "")
-    accessory_workflow = instructions_dict.get("accessory_workflow", "")
-
-    workflow_steps = []
-    if product_feature_enabled:
-        workflow_steps.append(product_workflow)
-    if service_feature_enabled:
-        workflow_steps.append(service_workflow)
-    if accessory_feature_enabled:
-        workflow_steps.append(accessory_workflow)
-    
-    workflow_instructions = f"""
-    **Quy trình làm việc:**
-    1. Xác định nhu cầu của khách: **sản phẩm**, **dịch vụ**, hay **linh kiện/phụ kiện**.
-    2. Sử dụng công cụ tìm kiếm tương ứng:
-       {'\n   '.join(workflow_steps)}
-    3. Mọi câu hỏi không liên quan đến sản phẩm, dịch vụ, hay linh kiện/phụ kiện thì **HÃY DÙNG CÔNG CỤ TÌM TÀI LIỆU `retrieve_document_tool`**.
-    """
-
-    pagination_instruction = """
-    **Phân trang kết quả (Pagination):**
-    - Mỗi lần tìm kiếm, công cụ chỉ trả về tối đa 10 kết quả.
-    - Nếu người dùng muốn xem thêm (ví dụ: "còn gì nữa không?", "xem thêm các sản phẩm khác"), bạn BẮT BUỘC phải gọi lại đúng công cụ tìm kiếm đó với các tham số y hệt lần trước, nhưng TĂNG giá trị của tham số `offset` lên 10.
-    - Nếu công cụ trả về một danh sách rỗng, điều đó có nghĩa là đã hết kết quả để hiển thị. Hãy thông báo cho khách hàng biết điều này.
-    """
-
-    offerings = []
-    if product_feature_enabled:
-        offerings.append("bán điện thoại")
-    if service_feature_enabled:
-        offerings.append("sửa chữa điện thoại")
-    if accessory_feature_enabled:
-        offerings.append("bán phụ kiện")
-
-    if len(offerings) > 2:
-        offerings_str = ", ".join(offerings[:-1]) + f" và {offerings[-1]}"
-    elif len(offerings) == 2:
-        offerings_str = " và ".join(offerings)
-    else:
-        offerings_str = offerings[0] if offerings else ""
-
-    faq_instruction = """
-    **Quy trình ưu tiên FAQ:**
-    - Hệ thống có thể đã tìm kiếm trước trong kho Câu hỏi thường gặp (FAQ) và cung cấp một gợi ý trong context.
-    - **Ưu tiên tuyệt đối:** Hãy xem xét kỹ gợi ý này trước tiên (nếu có).
-    - Nếu gợi ý phù hợp với câu hỏi của người dùng, hãy dùng nó để trả lời.
-    - **QUAN TRỌNG:** Nếu không có gợi ý nào từ FAQ, hoặc gợi ý không phù hợp, bạn BẮT BUỘC phải bỏ qua nó và tiếp tục quy trình làm việc bình thường bằng cách sử dụng các công cụ khác để tìm thông tin và trả lời câu hỏi. TUYỆT ĐỐI không được trả về câu trả lời rỗng chỉ vì không có FAQ.
-    """
-    
-    workflow_instructions_add = instructions_dict.get("workflow_instructions", "")
-    
-    other_instructions = instructions_dict.get("other_instructions", "")
-
-    custom_prompt_section = ""
-    if custom_prompt_text:
-        custom_prompt_section = f'''
-**Lưu ý đặc biệt cần ưu tiên tuân thủ (Strictly follow this):**
-{custom_prompt_text}
-'''
-
-    final_system_prompt = "\n".join(filter(None, [
-        indentity_instructions,
-        base_instructions,
-        workflow_instructions,
-        custom_prompt_section,
-        pagination_instruction,
-        workflow_instructions_add,
-        faq_instruction,
-        other_instructions
-    ]))
+    # Thông tin cửa hàng (đã cache) được đưa thẳng vào prompt để trả lời câu hỏi địa chỉ/liên hệ không cần gọi tool.
+    store_info_result = get_store_info_result(customer_id)
+    store_info_block = store_info_result["message"] if store_info_result["status"] == "success" else None
+    final_system_prompt = build_system_prompt(get_instruction_snapshot(), customer_config, store_info_block)
 
     prompt = ChatPromptTemplate.from_messages([
         ("system", final_system_prompt),
-        MessagesPlaceholder(variable_name="faq_context", optional=True),
+        # Gợi ý FAQ thay đổi theo từng câu hỏi nên đặt sau lịch sử chat để không làm lệch phần đầu prompt.
         MessagesPlaceholder(variable_name="chat_history", optional=True),
+        MessagesPlaceholder(variable_name="faq_context", optional=True),
         ("human", "{input}"),
         MessagesPlaceholder(variable_name="agent_scratchpad", optional=True),
     ])
@@ -159,28 +93,27 @@ def create_agent_executor(
     
     return agent_executor
 
-def get_session_history(customer_id: str, session_id: str, db: Session, limit: int = 8) -> List[BaseMessage]:
-    """Lấy các tin nhắn gần nhất trong lịch sử chat từ database."""
-    history_records = db.query(ChatHistory).filter(
-        ChatHistory.customer_id == customer_id,
-        ChatHistory.thread_id == session_id
-    ).order_by(ChatHistory.id.desc()).limit(limit).all()
-
-    # Đảo ngược lại để có thứ tự từ cũ đến mới
-    history_records.reverse()
-
-    messages: List[BaseMessage] = []
-    for record in history_records:
-        if record.role == 'human':
-            messages.append(HumanMessage(content=record.message))
-        elif record.role == 'bot':
-            messages.append(AIMessage(content=record.message))
-    return messages
+async def _answer_without_tools(fast_llm: BaseChatModel, customer_config: Customer, store_info_block: Optional[str],
+                                prompt_input: dict) -> str:
+    # Prompt ngắn (vai trò, thông tin cửa hàng, gợi ý FAQ) và một lần gọi model "fast" không kèm tool.
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", build_fast_reply_prompt(customer_config, store_info_block)),
+        MessagesPlaceholder(variable_name="chat_history", optional=True),
+        MessagesPlaceholder(variable_name="faq_context", optional=True),
+        ("human", "{input}"),
+    ])
+    chain = prompt | fast_llm | StrOutputParser()
+    return await chain.ainvoke(prompt_input)
 
-async def invoke_agent_with_memory(agent_executor, customer_id: str, session_id: str, user_input: str, db: Session, es_client: AsyncElasticsearch):
+async def invoke_agent_with_memory(agent_executor, customer_id: str, session_id: str, user_input: str, db: Session,
+                                   es_client: AsyncElasticsearch, llm: Optional[BaseChatModel] = None,
+                                   fast_llm: Optional[BaseChatModel] = None, customer_config: Optional[Customer] = None):
     """
     Gọi agent với input của người dùng và quản lý lịch sử trò chuyện trong database.
-    Luôn kiểm tra FAQ trước tiên.
+    Luôn kiểm tra FAQ trước tiên. Lịch sử đưa vào agent gồm bản tóm tắt hội thoại và các lượt gần nhất;
+    nếu truyền `llm`, bản tóm tắt được cập nhật ở nền sau lượt chat. Nếu truyền `fast_llm`, các lượt đơn giản
+    (chào hỏi, hỏi thông tin cửa hàng, câu khớp FAQ) được trả lời bằng model này với prompt ngắn theo
+    `customer_config` (không truyền thì đọc từ database) mà không chạy agent.
     """
     faq_context = []
     faq_results = await search_faqs(es_client=es_client, customer_id=customer_id, query=user_input)
@@ -198,16 +131,17 @@ Câu trả lời có sẵn (chỉ trả lời theo câu này nếu bạn thấy
 --- HẾT GỢI Ý ---"""
         faq_context.append(HumanMessage(content=faq_prompt))
 
-    chat_history = get_session_history(customer_id, session_id, db)
+    summary, recent_history = load_conversation_memory(customer_id, session_id, db)
+    chat_history = summary_messages(summary) + recent_history
     
     def format_history_for_llm(history: List[BaseMessage]) -> List[str]:
-        formatted = []
+        formatted = [f"Tóm tắt trước đó: {summary}"] if summary else []
         for msg in history:
             role = "Người dùng" if isinstance(msg, HumanMessage) else "Trợ lý"
             formatted.append(f"{role}: {msg.content}")
         return formatted
 
-    formatted_history = format_history_for_llm(chat_history)
+    formatted_history = format_history_for_llm(recent_history)
 
     search_tool_names = ["search_products_tool", "search_services_tool", "search_accessories_tool"]
     for tool in agent_executor.tools:
@@ -215,12 +149,47 @@ Câu trả lời có sẵn (chỉ trả lời theo câu này nếu bạn thấy
             tool.coroutine.keywords['original_query'] = user_input
             tool.coroutine.keywords['chat_history'] = formatted_history
 
-    response = await agent_executor.ainvoke({
+    # Các tool tìm kiếm chạy song song trong cùng một bước dùng chung một _msearch;
+    # kết quả tool được rút gọn theo ngân sách token và khử trùng trong cả lượt;
+    # các lần gọi lại tool tạo đơn trong lượt dùng chung khóa idempotency.
+    prompt_input = {
         "input": user_input,
         "chat_history": chat_history,
         "faq_context": faq_context,
         "thread_id": session_id,
-    })
+    }
+
+    response = None
+    if MODEL_ROUTING_ENABLED and fast_llm is not None:
+        last_bot_message = next((msg.content for msg in reversed(recent_history) if isinstance(msg, AIMessage)), None)
+        store_info_result = get_store_info_result(customer_id)
+        store_info_block = store_info_result["message"] if store_info_result["status"] == "success" else None
+        route = route_turn(
+            user_input,
+            faq_question=faq_results[0].get('question') if faq_results else None,
+            has_store_info=store_info_block is not None,
+            last_bot_message=last_bot_message
+        )
+        if route != ROUTE_AGENT:
+            print(f"🚦 Định tuyến lượt chat: {route} (model fast, không dùng tool)")
+            try:
+                if customer_config is None:
+                    customer_config = db.query(Customer).filter(Customer.customer_id == customer_id).first() or Customer()
+                answer = await _answer_without_tools(fast_llm, customer_config, store_info_block, prompt_input)
+                # Câu trả lời rỗng thì để agent xử lý như bình thường.
+                if answer.strip():
+                    response = {**prompt_input, "output": answer, "route": route}
+            except Exception as e:
+                print(f"⚠️ Trả lời nhanh thất bại, chuyển sang agent: {e}")
+
+    if response is None:
+        prompt_cache_usage = PromptCacheUsageHandler()
+        with search_batch_scope(es_client), tool_output_scope() as tool_stats, order_turn_scope():
+            response = await agent_executor.ainvoke(prompt_input, config={"callbacks": [prompt_cache_usage]})
+        if tool_stats.calls:
+            print(f"📏 Kết quả tool trong lượt: {stats_summary(tool_stats)}")
+        if prompt_cache_usage.llm_calls:
+            print(f"💾 Prompt cache trong lượt: {prompt_cache_usage.summary()}")
 
     print("--- AGENT RESPONSE ---")
     print(response)
@@ -233,31 +202,11 @@ Câu trả lời có sẵn (chỉ trả lời theo câu này nếu bạn thấy
     else:
         output_message = response['output']
     
-    chat_thread = db.query(ChatThread).filter(
-        ChatThread.customer_id == customer_id,
-        ChatThread.thread_id == session_id
-    ).first()
-    thread_name = chat_thread.thread_name if chat_thread else None
-
-    human_message = ChatHistory(
-        customer_id=customer_id,
-        thread_id=session_id,
-        thread_name=thread_name,
-        role="human",
-        message=user_input
-    )
-    db.add(human_message)
-
-    ai_message = ChatHistory(
-        customer_id=customer_id,
-        thread_id=session_id,
-        thread_name=thread_name,
-        role="bot",
-        message=output_message
-    )
-    db.add(ai_message)
-    
-    db.commit()
+    # Lưu lượt chat ở nền, không chờ database trước khi trả lời.
+    writer = get_chat_history_writer()
+    await writer.enqueue(customer_id, session_id, "human", user_input)
+    await writer.enqueue(customer_id, session_id, "bot", output_message)
+    schedule_summary_update(llm, customer_id, session_id)
     
     # Đảm bảo response trả về luôn có 'output'
     response['output'] = output_message
@@ -267,6 +216,7 @@ def clear_chat_history_for_customer(customer_id: str, db: Session):
     """Xóa toàn bộ lịch sử chat cho một customer_id cụ thể từ DB."""
     try:
         num_deleted = db.query(ChatHistory).filter(ChatHistory.customer_id == customer_id).delete(synchronize_session=False)
+        db.query(ChatSummary).filter(ChatSummary.customer_id == customer_id).delete(synchronize_session=False)
         db.commit()
         print(f"Cleared {num_deleted} chat message(s) for customer {customer_id}")
         return {"status": "success", "message": f"Cleared {num_deleted} chat message(s) for customer {customer_id}"}
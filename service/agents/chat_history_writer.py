@@ -0,0 +1,183 @@
+import asyncio
+import json
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert
+
+from config.settings import (
+    CHAT_WRITE_QUEUE_MAX, CHAT_WRITE_BATCH_SIZE, CHAT_WRITE_FLUSH_SECONDS, CHAT_WRITE_FALLBACK_PATH
+)
+from database.database import SessionLocal, ChatHistory
+
+_ROW_FIELDS = ("customer_id", "thread_id", "role", "message")
+# Thời gian chờ tối đa giữa các lần ghi lại khi database lỗi (giây)
+_MAX_RETRY_SECONDS = 30
+
+class ChatHistoryWriter:
+    """
+    Ghi lịch sử chat ở nền (write-behind): tin nhắn được đưa vào hàng đợi có giới hạn và một task nền
+    gom thành lô, ghi bằng một câu INSERT nhiều dòng. Tin nhắn chưa ghi được giữ trong bộ đệm theo
+    thread để các lượt đọc lịch sử vẫn thấy (read-your-writes).
+    """
+
+    def __init__(self, max_pending: int = CHAT_WRITE_QUEUE_MAX, batch_size: int = CHAT_WRITE_BATCH_SIZE,
+                 flush_interval: float = CHAT_WRITE_FLUSH_SECONDS):
+        self.loop = asyncio.get_running_loop()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._pending: Dict[Tuple[str, str], List[dict]] = {}
+        self._batch: List[dict] = []
+        self._worker: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+        restored = _load_fallback()
+        if restored:
+            for row in restored:
+                self._pending.setdefault((row["customer_id"], row["thread_id"]), []).append(row)
+            self._batch = restored
+            self._worker = asyncio.create_task(self._run())
+            print(f"♻️ Ghi lại {len(restored)} tin nhắn chat đã lưu tạm từ lần tắt trước.")
+
+    async def enqueue(self, customer_id: str, thread_id: str, role: str, message: str):
+        """Đưa một tin nhắn vào hàng đợi ghi; chỉ chờ khi hàng đợi đầy."""
+        row = {"customer_id": customer_id, "thread_id": thread_id, "role": role, "message": message}
+        self._pending.setdefault((customer_id, thread_id), []).append(row)
+        await self._queue.put(row)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def pending(self, customer_id: str, thread_id: str,
+                newest_saved: Sequence[Tuple[str, str]] = ()) -> List[Tuple[str, str]]:
+        """
+        Các tin nhắn (role, message) của thread chưa được ghi xuống database, cũ trước. `newest_saved` là các
+        tin mới nhất vừa đọc từ database (mới trước): lô đang ghi nếu đã commit thì nằm ở đó và được bỏ ra
+        để không bị lặp.
+        """
+        rows = self._pending.get((customer_id, thread_id), [])
+        in_flight = [(row["role"], row["message"]) for row in rows if row.get("in_flight")]
+        if in_flight and [tuple(r) for r in newest_saved[:len(in_flight)]][::-1] == in_flight:
+            rows = [row for row in rows if not row.get("in_flight")]
+        return [(row["role"], row["message"]) for row in rows]
+
+    async def _run(self):
+        attempt = 0
+        while True:
+            if not self._batch:
+                self._batch.append(await self._queue.get())
+            deadline = self.loop.time() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                timeout = deadline - self.loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                async with self._write_lock:
+                    await self._write_async(self._batch)
+                self._batch = []
+                attempt = 0
+            except Exception as e:
+                # Lô lỗi vẫn nằm trong bộ đệm (vẫn đọc được) và được ghi lại cùng tin mới ở vòng sau.
+                attempt += 1
+                print(f"⚠️ Ghi {len(self._batch)} tin nhắn chat thất bại (lần {attempt}): {e}")
+                await asyncio.sleep(min(2 ** attempt, _MAX_RETRY_SECONDS))
+
+    async def _write_async(self, rows: List[dict]):
+        # INSERT chạy trong thread riêng để không chặn event loop. Trong lúc ghi, các dòng được đánh dấu
+        # in_flight để `pending` không trả về lặp nếu lượt đọc thấy chúng đã có trong database.
+        for row in rows:
+            row["in_flight"] = True
+        try:
+            await asyncio.to_thread(self._write, rows)
+        finally:
+            for row in rows:
+                row.pop("in_flight", None)
+        self._release(rows)
+
+    def _write(self, rows: List[dict]):
+        if not rows:
+            return
+        db = SessionLocal()
+        try:
+            db.execute(insert(ChatHistory), [
+                {"customer_id": row["customer_id"], "thread_id": row["thread_id"],
+                 "role": row["role"], "message": row["message"]}
+                for row in rows
+            ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _release(self, rows: List[dict]):
+        for row in rows:
+            key = (row["customer_id"], row["thread_id"])
+            pending = self._pending.get(key)
+            if pending:
+                for i, item in enumerate(pending):
+                    if item is row:
+                        del pending[i]
+                        break
+                if not pending:
+                    del self._pending[key]
+
+    async def flush(self):
+        """
+        Dừng task nền và ghi ngay toàn bộ tin nhắn còn chờ (gọi khi tắt ứng dụng). Nếu database không ghi
+        được, tin nhắn được lưu vào CHAT_WRITE_FALLBACK_PATH và ghi lại ở lần khởi động sau.
+        """
+        # Chờ lô đang ghi xong rồi mới dừng task nền, để không ghi một lô hai lần.
+        async with self._write_lock:
+            if self._worker is not None and not self._worker.done():
+                self._worker.cancel()
+                try:
+                    await self._worker
+                except asyncio.CancelledError:
+                    pass
+            rows, self._batch = self._batch, []
+            while not self._queue.empty():
+                rows.append(self._queue.get_nowait())
+            try:
+                await self._write_async(rows)
+            except Exception as e:
+                _save_fallback(rows)
+                print(f"⚠️ Không ghi được {len(rows)} tin nhắn chat ({e}), đã lưu tạm vào '{CHAT_WRITE_FALLBACK_PATH}'.")
+                self._release(rows)
+
+def _save_fallback(rows: List[dict]):
+    with open(CHAT_WRITE_FALLBACK_PATH, "a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps({key: row[key] for key in _ROW_FIELDS}, ensure_ascii=False) + "\n")
+
+def _load_fallback() -> List[dict]:
+    """Đọc và xóa file tin nhắn lưu tạm từ lần tắt ứng dụng trước (nếu có)."""
+    if not os.path.exists(CHAT_WRITE_FALLBACK_PATH):
+        return []
+    with open(CHAT_WRITE_FALLBACK_PATH, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    os.remove(CHAT_WRITE_FALLBACK_PATH)
+    return rows
+
+_writer: Optional[ChatHistoryWriter] = None
+
+def get_chat_history_writer() -> ChatHistoryWriter:
+    """Bộ ghi lịch sử chat dùng chung cho event loop hiện tại."""
+    global _writer
+    if _writer is None or _writer.loop is not asyncio.get_running_loop():
+        _writer = ChatHistoryWriter()
+    return _writer
+
+def pending_chat_messages(customer_id: str, thread_id: str,
+                          newest_saved: Sequence[Tuple[str, str]] = ()) -> List[Tuple[str, str]]:
+    """Tin nhắn của thread đang chờ ghi (rỗng nếu chưa có bộ ghi nào)."""
+    return _writer.pending(customer_id, thread_id, newest_saved) if _writer else []
+
+async def flush_chat_history():
+    if _writer is not None:
+        await _writer.flush()
+        print("✅ Đã ghi nốt lịch sử chat đang chờ.")
@@ -0,0 +1,150 @@
+import asyncio
+from typing import List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, HumanMessage, BaseMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from sqlalchemy.orm import Session
+
+from config.settings import CHAT_MEMORY_RECENT_TURNS, CHAT_MEMORY_TOKEN_BUDGET
+from database.database import SessionLocal, ChatHistory, ChatSummary
+from service.agents.tool_output_budget import estimate_tokens
+from service.agents.chat_history_writer import pending_chat_messages
+
+_background_tasks = set()
+_updating_threads = set()
+
+# Độ dài tối đa của mỗi tin nhắn khi đưa vào prompt tóm tắt (ký tự)
+_SUMMARY_MESSAGE_CHARS = 1500
+# Số token tối thiểu giữ lại của mỗi tin trong cửa sổ khi đã hết ngân sách
+_MIN_MESSAGE_TOKENS = 60
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_template("""
+Bạn cập nhật bản tóm tắt một cuộc trò chuyện giữa khách hàng và trợ lý bán hàng của cửa hàng điện thoại.
+
+Bản tóm tắt hiện tại:
+{summary}
+
+Các tin nhắn mới cần gộp vào:
+{messages}
+
+Viết lại bản tóm tắt (tối đa 150 từ, tiếng Việt) giữ lại các thông tin quan trọng: nhu cầu của khách,
+sản phẩm/dịch vụ/phụ kiện đã được nhắc tới hoặc khách đã chọn (kèm mã và giá nếu có), thông tin liên hệ
+khách đã cung cấp, đơn hàng đã tạo và các câu hỏi còn đang chờ trả lời. Chỉ trả về bản tóm tắt.
+""")
+
+def _to_message(role: str, content: str) -> BaseMessage:
+    return HumanMessage(content=content) if role == 'human' else AIMessage(content=content)
+
+def load_conversation_memory(customer_id: str, thread_id: str, db: Session) -> Tuple[Optional[str], List[BaseMessage]]:
+    """
+    Trả về (bản tóm tắt, các tin nhắn gần nhất) của thread. Giữ CHAT_MEMORY_RECENT_TURNS lượt gần nhất,
+    cắt ngắn các tin cũ hơn khi tổng token (kể cả bản tóm tắt) vượt CHAT_MEMORY_TOKEN_BUDGET.
+    """
+    row = db.query(ChatSummary).filter(
+        ChatSummary.customer_id == customer_id,
+        ChatSummary.thread_id == thread_id
+    ).first()
+    summary = row.summary if row and row.summary else None
+
+    window = CHAT_MEMORY_RECENT_TURNS * 2
+    records = db.query(ChatHistory.role, ChatHistory.message).filter(
+        ChatHistory.customer_id == customer_id,
+        ChatHistory.thread_id == thread_id
+    ).order_by(ChatHistory.id.desc()).limit(window).all()
+    # Tin nhắn còn trong bộ đệm ghi luôn mới hơn các tin đã lưu.
+    records = (pending_chat_messages(customer_id, thread_id, records)[::-1] + list(records))[:window]
+
+    budget = CHAT_MEMORY_TOKEN_BUDGET - (estimate_tokens(summary) if summary else 0)
+    messages: List[BaseMessage] = []
+    for role, message in records:
+        # Mọi tin trong cửa sổ đều được giữ (chúng chưa có trong bản tóm tắt); khi hết ngân sách,
+        # tin cũ hơn bị cắt bớt phần cuối thay vì bỏ hẳn.
+        allowance = max(budget, _MIN_MESSAGE_TOKENS)
+        if estimate_tokens(message) > allowance:
+            message = message[:allowance * 3] + "…"
+        budget -= min(estimate_tokens(message), allowance)
+        messages.append(_to_message(role, message))
+    messages.reverse()
+    return summary, messages
+
+def summary_messages(summary: Optional[str]) -> List[BaseMessage]:
+    """Bản tóm tắt dưới dạng tin nhắn, đặt trước các lượt gần nhất trong chat_history."""
+    if not summary:
+        return []
+    return [HumanMessage(content=f"--- TÓM TẮT CUỘC TRÒ CHUYỆN TRƯỚC ĐÓ ---\n{summary}\n--- HẾT TÓM TẮT ---")]
+
+async def _update_summary(llm, customer_id: str, thread_id: str):
+    db = SessionLocal()
+    try:
+        row = db.query(ChatSummary).filter(
+            ChatSummary.customer_id == customer_id,
+            ChatSummary.thread_id == thread_id
+        ).first()
+        last_message_id = row.last_message_id if row else 0
+
+        window = CHAT_MEMORY_RECENT_TURNS * 2
+        saved = db.query(ChatHistory.id, ChatHistory.role, ChatHistory.message).filter(
+            ChatHistory.customer_id == customer_id,
+            ChatHistory.thread_id == thread_id
+        ).order_by(ChatHistory.id.desc()).limit(window + 1).all()
+        # Tin nhắn còn chờ ghi (thường là lượt vừa xong) chiếm chỗ đầu cửa sổ, như trong load_conversation_memory.
+        kept_saved = window - len(pending_chat_messages(customer_id, thread_id, [(r.role, r.message) for r in saved]))
+        if len(saved) <= max(kept_saved, 0):
+            return
+        # Tin đã lưu mới nhất nằm ngoài cửa sổ giữ nguyên văn.
+        boundary_id = saved[max(kept_saved, 0)].id
+
+        # Chỉ gộp các tin nhắn đã rời khỏi cửa sổ giữ nguyên văn và chưa có trong bản tóm tắt.
+        new_records = db.query(ChatHistory).filter(
+            ChatHistory.customer_id == customer_id,
+            ChatHistory.thread_id == thread_id,
+            ChatHistory.id > last_message_id,
+            ChatHistory.id <= boundary_id
+        ).order_by(ChatHistory.id.asc()).all()
+        if not new_records:
+            return
+
+        messages_text = "\n".join(
+            f"{'Người dùng' if record.role == 'human' else 'Trợ lý'}: {record.message[:_SUMMARY_MESSAGE_CHARS]}"
+            for record in new_records
+        )
+        chain = SUMMARY_PROMPT | llm | StrOutputParser()
+        summary = (await chain.ainvoke({
+            "summary": (row.summary if row and row.summary else "(chưa có)"),
+            "messages": messages_text
+        })).strip()
+        if not summary:
+            return
+
+        if row is None:
+            row = ChatSummary(customer_id=customer_id, thread_id=thread_id)
+            db.add(row)
+        row.summary = summary
+        row.last_message_id = new_records[-1].id
+        db.commit()
+        print(f"🧠 Đã gộp {len(new_records)} tin nhắn vào bản tóm tắt của thread '{thread_id}'.")
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Không thể cập nhật bản tóm tắt hội thoại cho thread '{thread_id}': {e}")
+    finally:
+        db.close()
+
+def schedule_summary_update(llm, customer_id: str, thread_id: str) -> Optional[asyncio.Task]:
+    """
+    Cập nhật bản tóm tắt ở nền sau mỗi lượt chat (không làm chậm phản hồi). Nếu thread đang được
+    tóm tắt thì bỏ qua; các tin nhắn còn lại sẽ được gộp ở lượt sau.
+    """
+    key = (customer_id, thread_id)
+    if llm is None or key in _updating_threads:
+        return None
+    _updating_threads.add(key)
+    task = asyncio.create_task(_update_summary(llm, customer_id, thread_id))
+    _background_tasks.add(task)
+
+    def _done(finished: asyncio.Task):
+        _background_tasks.discard(finished)
+        _updating_threads.discard(key)
+
+    task.add_done_callback(_done)
+    return task
@@ -0,0 +1,84 @@
+import threading
+import time
+from datetime import datetime, timezone
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from config.settings import INSTRUCTION_VERSION_POLL_SECONDS
+from database.database import SessionLocal, SystemInstruction, SystemInstructionVersion
+
+_VERSION_ROW_ID = 1
+
+@dataclass(frozen=True)
+class InstructionSnapshot:
+    """Ảnh chụp system instructions tại một phiên bản; dùng `version` làm khóa cho các cache prompt."""
+    version: int
+    values: Dict[str, str] = field(default_factory=dict)
+
+    def get(self, key: str, default: str = "") -> str:
+        return self.values.get(key, default)
+
+_snapshot: Optional[InstructionSnapshot] = None
+_next_check = 0.0
+_lock = threading.Lock()
+
+def _read_version(db: Session) -> int:
+    row = db.get(SystemInstructionVersion, _VERSION_ROW_ID)
+    return row.version if row else 0
+
+def _load(db: Session) -> InstructionSnapshot:
+    version = _read_version(db)
+    values = {instr.key: instr.value for instr in db.query(SystemInstruction).all()}
+    return InstructionSnapshot(version=version, values=values)
+
+def get_instruction_snapshot() -> InstructionSnapshot:
+    """
+    System instructions hiện hành, giữ trong bộ nhớ. Cứ mỗi INSTRUCTION_VERSION_POLL_SECONDS chỉ đọc
+    dòng phiên bản; toàn bộ instructions chỉ được nạp lại khi phiên bản thay đổi (do worker khác cập nhật).
+    """
+    global _snapshot, _next_check
+    now = time.monotonic()
+    if _snapshot is not None and now < _next_check:
+        return _snapshot
+
+    with _lock:
+        if _snapshot is not None and now < _next_check:
+            return _snapshot
+        db = SessionLocal()
+        try:
+            if _snapshot is None or _read_version(db) != _snapshot.version:
+                _snapshot = _load(db)
+                print(f"📘 Đã nạp system instructions phiên bản {_snapshot.version}.")
+        finally:
+            db.close()
+        _next_check = now + INSTRUCTION_VERSION_POLL_SECONDS
+        return _snapshot
+
+def bump_instruction_version(db: Session):
+    """
+    Tăng phiên bản trong cùng transaction với thay đổi instructions (gọi trước commit). Dùng
+    INSERT ... ON CONFLICT DO UPDATE để hai lần cập nhật đồng thời khi chưa có dòng phiên bản không lỗi.
+    """
+    dialect_insert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else postgresql_insert
+    statement = dialect_insert(SystemInstructionVersion).values(
+        id=_VERSION_ROW_ID, version=1, updated_at=datetime.now(timezone.utc)
+    )
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[SystemInstructionVersion.id],
+        set_={"version": SystemInstructionVersion.version + 1, "updated_at": statement.excluded.updated_at}
+    ))
+
+def refresh_instruction_snapshot():
+    """Nạp lại ảnh chụp ngay sau khi ghi (worker hiện tại thấy thay đổi không cần chờ chu kỳ kiểm tra)."""
+    global _snapshot, _next_check
+    with _lock:
+        db = SessionLocal()
+        try:
+            _snapshot = _load(db)
+        finally:
+            db.close()
+        _next_check = time.monotonic() + INSTRUCTION_VERSION_POLL_SECONDS
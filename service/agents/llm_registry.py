@@ -0,0 +1,55 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from langchain.chat_models import init_chat_model
+from langchain_core.language_models.chat_models import BaseChatModel
+
+from config.settings import LLM_REGISTRY_MAX_CLIENTS, LLM_REGISTRY_IDLE_SECONDS
+
+# (provider, model, hash API key, tham số thêm) -> (lần dùng cuối, chat model)
+_clients: "OrderedDict[Tuple[str, str, str, Tuple], Tuple[float, BaseChatModel]]" = OrderedDict()
+_lock = threading.Lock()
+
+def _key_hash(api_key: str) -> str:
+    # Không giữ API key dạng rõ trong khóa của registry.
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+def _evict(now: float):
+    for key in [key for key, (last_used, _) in _clients.items() if now - last_used > LLM_REGISTRY_IDLE_SECONDS]:
+        del _clients[key]
+    while len(_clients) > LLM_REGISTRY_MAX_CLIENTS:
+        _clients.popitem(last=False)
+
+def get_pooled_chat_model(provider: str, model: str, api_key: str, **kwargs: Any) -> BaseChatModel:
+    """
+    Chat model dùng chung cho mọi request có cùng (provider, model, API key): client và kết nối HTTP/gRPC
+    bên dưới được giữ lại (keep-alive), không phải khởi tạo và bắt tay TLS lại ở mỗi lượt chat.
+    Registry có giới hạn LLM_REGISTRY_MAX_CLIENTS (loại client ít dùng nhất) và loại client không dùng
+    quá LLM_REGISTRY_IDLE_SECONDS.
+    """
+    key = (provider, model, _key_hash(api_key), tuple(sorted((k, repr(v)) for k, v in kwargs.items())))
+    now = time.monotonic()
+    with _lock:
+        entry = _clients.get(key)
+        if entry is not None:
+            _clients[key] = (now, entry[1])
+            _clients.move_to_end(key)
+            return entry[1]
+
+    llm = init_chat_model(model=model, model_provider=provider, api_key=api_key, **kwargs)
+    with _lock:
+        # Request khác có thể vừa tạo xong client cho cùng khóa: dùng bản đã có.
+        entry = _clients.get(key)
+        if entry is not None:
+            llm = entry[1]
+        _clients[key] = (now, llm)
+        _clients.move_to_end(key)
+        _evict(now)
+    return llm
+
+def registry_stats() -> Dict[str, int]:
+    with _lock:
+        return {"clients": len(_clients)}
@@ -0,0 +1,66 @@
+import re
+import unicodedata
+from typing import Optional
+
+from config.settings import LLM_MODELS, TENANT_LLM_MODELS
+
+AGENT, FAST = "agent", "fast"
+
+# Các hướng xử lý một lượt chat
+ROUTE_AGENT = "agent"          # agent đầy đủ với tool
+ROUTE_SMALL_TALK = "small_talk"  # chào hỏi, cảm ơn, xác nhận ngắn
+ROUTE_STORE_INFO = "store_info"  # hỏi địa chỉ/liên hệ cửa hàng (đã có sẵn trong system prompt)
+ROUTE_FAQ = "faq"              # câu hỏi gần như trùng một câu FAQ
+
+# Không gồm các từ xác nhận ("ok", "vâng", "dạ", "được"...): đó thường là câu trả lời cho câu hỏi
+# xác nhận đặt đơn và cần agent gọi tool tạo đơn.
+_SMALL_TALK_WORDS = {
+    "xin chao", "chao", "chao shop", "chao ban", "chao em", "hello", "hi", "alo", "hey",
+    "cam on", "cam on shop", "cam on em", "cam on nhe", "thanks", "thank you", "tam biet", "bye",
+}
+_STORE_INFO_PATTERNS = [
+    r"\b(cua hang|shop|ben em|ben minh|tiem)\b.*\b(o dau|dia chi|so dien thoai|sdt|hotline|lien he|ban do|gio mo cua)\b",
+    r"\b(dia chi|so dien thoai|sdt|hotline|ban do|gio mo cua)\b.*\b(cua hang|shop|ben em|ben minh|tiem)\b",
+    r"^(shop |cua hang |ben em )?o dau\b",
+    r"\bgio mo cua\b",
+]
+_FAQ_MATCH_THRESHOLD = 0.8
+
+def resolve_model_name(provider: str, tier: str = AGENT, customer_id: Optional[str] = None) -> str:
+    """Tên model cho provider và tầng (agent/fast); cấu hình riêng của khách hàng được ưu tiên."""
+    provider_models = LLM_MODELS.get(provider)
+    if not provider_models:
+        raise ValueError(f"Không tìm thấy LLM provider: {provider}")
+    tenant_models = (TENANT_LLM_MODELS.get(customer_id) or {}).get(provider) or {}
+    return tenant_models.get(tier) or provider_models.get(tier) or provider_models[AGENT]
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFD", text.lower().replace("đ", "d"))
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", text)).strip()
+
+def _overlap(a: str, b: str) -> float:
+    words_a, words_b = set(a.split()), set(b.split())
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+def route_turn(user_input: str, faq_question: Optional[str] = None, has_store_info: bool = False,
+               last_bot_message: Optional[str] = None) -> str:
+    """
+    Chọn hướng xử lý lượt chat bằng luật từ khóa (không tốn lời gọi LLM). Chỉ các câu rất ngắn, không
+    chứa số (không phải thông tin đặt hàng) mới đi đường nhanh; còn lại luôn dùng agent đầy đủ.
+    Lượt trả lời ngay sau một câu hỏi của trợ lý (ví dụ xác nhận đặt đơn) luôn dùng agent.
+    """
+    if last_bot_message and last_bot_message.rstrip().endswith("?"):
+        return ROUTE_AGENT
+    text = _normalize(user_input)
+    if not text or re.search(r"\d", text):
+        return ROUTE_AGENT
+    if len(text.split()) <= 4 and (text in _SMALL_TALK_WORDS or " ".join(text.split()[:2]) in _SMALL_TALK_WORDS):
+        return ROUTE_SMALL_TALK
+    if has_store_info and len(text.split()) <= 12 and any(re.search(p, text) for p in _STORE_INFO_PATTERNS):
+        return ROUTE_STORE_INFO
+    if faq_question and _overlap(text, _normalize(faq_question)) >= _FAQ_MATCH_THRESHOLD:
+        return ROUTE_FAQ
+    return ROUTE_AGENT
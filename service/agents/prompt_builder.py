@@ -0,0 +1,178 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from service.agents.instruction_store import InstructionSnapshot
+
+# Thứ tự cố định của tool khi gửi cho model (schema tool nằm trong phần đầu prompt của provider).
+CANONICAL_TOOL_ORDER = [
+    "retrieve_document_tool",
+    "check_customer_info_tool",
+    "get_store_info_tool",
+    "search_products_tool",
+    "create_order_product_tool",
+    "search_services_tool",
+    "create_order_service_tool",
+    "search_accessories_tool",
+    "create_order_accessory_tool",
+]
+
+PAGINATION_INSTRUCTION = """
+    **Phân trang kết quả (Pagination):**
+    - Mỗi lần tìm kiếm, công cụ chỉ trả về tối đa 10 kết quả.
+    - Nếu người dùng muốn xem thêm (ví dụ: "còn gì nữa không?", "xem thêm các sản phẩm khác"), bạn BẮT BUỘC phải gọi lại đúng công cụ tìm kiếm đó với các tham số y hệt lần trước, nhưng TĂNG giá trị của tham số `offset` lên 10.
+    - Nếu công cụ trả về một danh sách rỗng, điều đó có nghĩa là đã hết kết quả để hiển thị. Hãy thông báo cho khách hàng biết điều này.
+    """
+
+FAQ_INSTRUCTION = """
+    **Quy trình ưu tiên FAQ:**
+    - Hệ thống có thể đã tìm kiếm trước trong kho Câu hỏi thường gặp (FAQ) và cung cấp một gợi ý trong context.
+    - **Ưu tiên tuyệt đối:** Hãy xem xét kỹ gợi ý này trước tiên (nếu có).
+    - Nếu gợi ý phù hợp với câu hỏi của người dùng, hãy dùng nó để trả lời.
+    - **QUAN TRỌNG:** Nếu không có gợi ý nào từ FAQ, hoặc gợi ý không phù hợp, bạn BẮT BUỘC phải bỏ qua nó và tiếp tục quy trình làm việc bình thường bằng cách sử dụng các công cụ khác để tìm thông tin và trả lời câu hỏi. TUYỆT ĐỐI không được trả về câu trả lời rỗng chỉ vì không có FAQ.
+    """
+
+# (phiên bản instructions, cờ tính năng) -> phần prompt dùng chung cho mọi khách hàng có cùng cờ
+_shared_prefix_cache: Dict[Tuple[int, Tuple[bool, bool, bool]], str] = {}
+
+def _escape(text: str) -> str:
+    # Nội dung do khách hàng nhập không được hiểu là biến của ChatPromptTemplate.
+    return text.replace("{", "{{").replace("}", "}}")
+
+def _shared_prefix(snapshot: InstructionSnapshot, features: Tuple[bool, bool, bool]) -> str:
+    key = (snapshot.version, features)
+    cached = _shared_prefix_cache.get(key)
+    if cached is not None:
+        return cached
+
+    product_enabled, service_enabled, accessory_enabled = features
+    workflow_steps = []
+    if product_enabled:
+        workflow_steps.append(snapshot.get("product_workflow"))
+    if service_enabled:
+        workflow_steps.append(snapshot.get("service_workflow"))
+    if accessory_enabled:
+        workflow_steps.append(snapshot.get("accessory_workflow"))
+
+    workflow_instructions = f"""
+    **Quy trình làm việc:**
+    1. Xác định nhu cầu của khách: **sản phẩm**, **dịch vụ**, hay **linh kiện/phụ kiện**.
+    2. Sử dụng công cụ tìm kiếm tương ứng:
+       {'\n   '.join(workflow_steps)}
+    3. Mọi câu hỏi không liên quan đến sản phẩm, dịch vụ, hay linh kiện/phụ kiện thì **HÃY DÙNG CÔNG CỤ TÌM TÀI LIỆU `retrieve_document_tool`**.
+    """
+
+    # Phần giống nhau cho mọi khách hàng đứng trước, phần phụ thuộc cờ tính năng đứng sau.
+    prefix = "\n".join(filter(None, [
+        snapshot.get("base_instructions"),
+        PAGINATION_INSTRUCTION,
+        FAQ_INSTRUCTION,
+        snapshot.get("workflow_instructions"),
+        snapshot.get("other_instructions"),
+        workflow_instructions
+    ]))
+    if len(_shared_prefix_cache) > 64:
+        _shared_prefix_cache.clear()
+    _shared_prefix_cache[key] = prefix
+    return prefix
+
+FAST_REPLY_INSTRUCTION = """
+    Bạn đang trả lời một tin nhắn đơn giản của khách hàng (chào hỏi, cảm ơn, hỏi thông tin cửa hàng hoặc câu hỏi thường gặp).
+    - Trả lời ngắn gọn, tự nhiên, đúng vai trò bên dưới.
+    - Nếu có gợi ý từ FAQ trong context và gợi ý phù hợp với câu hỏi, hãy trả lời theo gợi ý đó.
+    - Chỉ dùng thông tin có trong prompt này và lịch sử trò chuyện, TUYỆT ĐỐI không bịa thông tin về sản phẩm, giá hay tồn kho.
+    """
+
+def _identity_instructions(customer_config) -> str:
+    identity = ""
+    if customer_config.ai_role:
+        identity = f"đóng vai là một {customer_config.ai_role} am hiểu và thân thiện"
+    if customer_config.ai_name:
+        identity += f" tên là {customer_config.ai_name}"
+
+    return f"""
+        Bạn là một chuyên gia tư vấn của một cửa hàng sản phẩm và cung cấp một số các dịch vụ, {_escape(identity)}.
+        Luôn xưng hô là "em" và gọi khách hàng là "anh/chị". Khi nói về cửa hàng, hãy dùng "bên em".
+        Hãy mô tả một cách khách quan, ví dụ: "sản phẩm có...", "máy được trang bị...".
+    """
+
+def _custom_prompt_section(customer_config) -> str:
+    if not customer_config.custom_prompt:
+        return ""
+    return f'''
+**Lưu ý đặc biệt cần ưu tiên tuân thủ (Strictly follow this):**
+{_escape(customer_config.custom_prompt)}
+'''
+
+def build_system_prompt(snapshot: InstructionSnapshot, customer_config, store_info_block: Optional[str] = None) -> str:
+    """
+    Ghép system prompt theo thứ tự từ tĩnh nhất đến động nhất để phần đầu prompt giống nhau giữa các
+    lượt và giữa các khách hàng (tận dụng prompt caching của OpenAI/Gemini):
+    instructions chung -> quy trình theo cờ tính năng -> vai trò, lưu ý riêng và thông tin cửa hàng của khách hàng.
+    """
+    features = (
+        bool(customer_config.product_feature_enabled),
+        bool(customer_config.service_feature_enabled),
+        bool(customer_config.accessory_feature_enabled),
+    )
+
+    store_info_section = ""
+    if store_info_block:
+        store_info_section = f"""
+    **Thông tin cửa hàng** (dùng trực tiếp khi khách hỏi địa chỉ, số điện thoại, liên hệ, bản đồ... không cần gọi `get_store_info_tool`):
+{_escape(store_info_block)}
+    """
+
+    return "\n".join(filter(None, [
+        _shared_prefix(snapshot, features),
+        _identity_instructions(customer_config),
+        _custom_prompt_section(customer_config),
+        store_info_section
+    ]))
+
+def build_fast_reply_prompt(customer_config, store_info_block: Optional[str] = None) -> str:
+    """
+    System prompt ngắn cho các lượt được định tuyến sang model "fast": chỉ gồm vai trò, lưu ý riêng,
+    thông tin cửa hàng và cách dùng gợi ý FAQ, không có hướng dẫn tool hay quy trình của agent.
+    """
+    store_info_section = ""
+    if store_info_block:
+        store_info_section = f"""
+    **Thông tin cửa hàng:**
+{_escape(store_info_block)}
+    """
+
+    return "\n".join(filter(None, [
+        FAST_REPLY_INSTRUCTION,
+        _identity_instructions(customer_config),
+        _custom_prompt_section(customer_config),
+        store_info_section
+    ]))
+
+def order_tools(tools: List[Any]) -> List[Any]:
+    """Sắp xếp tool theo CANONICAL_TOOL_ORDER (tool lạ xếp cuối, theo tên)."""
+    rank = {name: i for i, name in enumerate(CANONICAL_TOOL_ORDER)}
+    return sorted(tools, key=lambda tool: (rank.get(tool.name, len(rank)), tool.name))
+
+class PromptCacheUsageHandler(BaseCallbackHandler):
+    """Cộng dồn số token đầu vào và số token được provider lấy từ prompt cache trong một lượt chat."""
+    run_inline = True
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if not usage:
+                    continue
+                self.llm_calls += 1
+                self.input_tokens += usage.get("input_tokens", 0)
+                self.cached_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+
+    def summary(self) -> Dict[str, int]:
+        return {"llm_calls": self.llm_calls, "input_tokens": self.input_tokens, "cached_tokens": self.cached_tokens}
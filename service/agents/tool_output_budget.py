@@ -0,0 +1,101 @@
+import contextlib
+import hashlib
+import json
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from config.settings import TOOL_OUTPUT_TOKEN_BUDGET, TOOL_OUTPUT_TOKEN_BUDGETS
+
+@dataclass
+class TurnToolStats:
+    """Thống kê kết quả tool trong một lượt chat: token trước/sau khi rút gọn và các mục đã thấy."""
+    tokens_in: int = 0
+    tokens_out: int = 0
+    calls: int = 0
+    duplicates: int = 0
+    dropped: int = 0
+    seen: Set[str] = field(default_factory=set)
+
+_current_stats: ContextVar[Optional[TurnToolStats]] = ContextVar("tool_output_stats", default=None)
+
+def estimate_tokens(text: str) -> int:
+    """Ước lượng số token (~3 ký tự/token với tiếng Việt có dấu), đủ để so với ngân sách mà không cần tokenizer."""
+    return len(text) // 3 + 1
+
+def _item_text(item: Any) -> str:
+    return item if isinstance(item, str) else json.dumps(item, ensure_ascii=False, default=str)
+
+def _truncate(item: Any, max_tokens: int) -> Any:
+    max_chars = max_tokens * 3
+    if isinstance(item, str):
+        return item[:max_chars].rstrip() + "…"
+    if isinstance(item, dict) and isinstance(item.get("content"), str):
+        return {**item, "content": item["content"][:max_chars].rstrip() + "…"}
+    return item
+
+def compact_tool_output(tool_name: str, results: Any) -> Any:
+    """
+    Rút gọn kết quả của tool trước khi đưa vào agent_scratchpad:
+    - bỏ các mục đã trả về ở lần gọi tool trước trong cùng lượt chat,
+    - giữ các mục theo thứ tự liên quan cho tới khi hết ngân sách token của tool
+      (mục đầu tiên quá dài thì bị cắt bớt), phần còn lại được thay bằng một dòng ghi chú.
+    """
+    if not isinstance(results, list) or not results:
+        return results
+    stats = _current_stats.get()
+    budget = TOOL_OUTPUT_TOKEN_BUDGETS.get(tool_name, TOOL_OUTPUT_TOKEN_BUDGET)
+
+    kept: List[Any] = []
+    tokens_in = tokens_out = duplicates = dropped = 0
+    for item in results:
+        text = _item_text(item)
+        cost = estimate_tokens(text)
+        tokens_in += cost
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        if stats and key in stats.seen:
+            duplicates += 1
+            continue
+        if tokens_out + cost > budget:
+            if kept:
+                dropped += 1
+                continue
+            item = _truncate(item, budget)
+            cost = estimate_tokens(_item_text(item))
+        kept.append(item)
+        tokens_out += cost
+        if stats:
+            stats.seen.add(key)
+
+    if duplicates:
+        kept.append(f"({duplicates} kết quả trùng với lần tìm trước trong lượt này, đã lược bỏ.)")
+    if dropped:
+        kept.append(f"(Đã lược bớt {dropped} kết quả ít liên quan hơn; hãy tìm cụ thể hơn hoặc dùng offset để xem thêm.)")
+
+    if stats:
+        stats.calls += 1
+        stats.tokens_in += tokens_in
+        stats.tokens_out += tokens_out
+        stats.duplicates += duplicates
+        stats.dropped += dropped
+    print(f"📏 {tool_name}: {tokens_in} → {tokens_out} token ước lượng (trùng {duplicates}, lược {dropped}).")
+    return kept
+
+@contextlib.contextmanager
+def tool_output_scope():
+    """Phạm vi một lượt chat: khử trùng kết quả giữa các lần gọi tool và cộng dồn số token."""
+    stats = TurnToolStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+def stats_summary(stats: TurnToolStats) -> Dict[str, int]:
+    return {
+        "tool_calls": stats.calls,
+        "tool_tokens_in": stats.tokens_in,
+        "tool_tokens_out": stats.tokens_out,
+        "duplicates": stats.duplicates,
+        "dropped": stats.dropped
+    }
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from elasticsearch import AsyncElasticsearch
+
+from config.settings import CATALOG_GENERATION_CACHE_TTL, CATALOG_GENERATION_GRACE_SECONDS
+from database.database import SessionLocal, CatalogGeneration
+from service.data.tenant_placement import resolve_write_targets
+
+# (index_name, customer_id) -> (thời điểm hết hạn, thế hệ đang hoạt động)
+_generation_cache: Dict[Tuple[str, str], Tuple[float, Optional[str]]] = {}
+_background_tasks = set()
+# Tuần tự hóa việc chuyển thế hệ trong một process (giữa các process: khóa dòng bằng SELECT ... FOR UPDATE).
+_switch_lock = threading.Lock()
+
+def new_generation_id() -> str:
+    """Sinh mã thế hệ catalog mới, tăng dần theo thời gian."""
+    return f"{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}{uuid.uuid4().hex[:6]}"
+
+def get_active_generation(index_name: str, customer_id: str, use_cache: bool = True) -> Optional[str]:
+    """
+    Trả về thế hệ catalog đang được tìm kiếm của khách hàng trong index (None nếu dữ liệu
+    chưa từng được nạp theo thế hệ). Kết quả được cache trong CATALOG_GENERATION_CACHE_TTL giây.
+    """
+    key = (index_name, customer_id)
+    now = time.monotonic()
+    if use_cache:
+        cached = _generation_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+    db = SessionLocal()
+    try:
+        row = db.query(CatalogGeneration).filter(
+            CatalogGeneration.index_name == index_name,
+            CatalogGeneration.customer_id == customer_id
+        ).first()
+        generation = row.active_generation if row else None
+    finally:
+        db.close()
+
+    _generation_cache[key] = (now + CATALOG_GENERATION_CACHE_TTL, generation)
+    return generation
+
+async def get_active_generation_async(index_name: str, customer_id: str, use_cache: bool = True) -> Optional[str]:
+    """
+    Như `get_active_generation` nhưng truy vấn database chạy ngoài event loop. Các luồng ghi
+    dùng `use_cache=False` để không ghi vào thế hệ vừa bị thay thế (sẽ bị xóa sau thời gian chờ).
+    """
+    if use_cache:
+        cached = _generation_cache.get((index_name, customer_id))
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+    return await asyncio.to_thread(get_active_generation, index_name, customer_id, False)
+
+def set_active_generation(index_name: str, customer_id: str, generation: str) -> Optional[str]:
+    """
+    Chuyển thế hệ đang hoạt động sang `generation` (một transaction, khóa dòng thế hệ) và trả về thế hệ
+    vừa bị thay thế. Hai lần nạp đồng thời vì thế mỗi lần xóa đúng thế hệ mà chính nó thay thế.
+    """
+    with _switch_lock:
+        return _switch_generation(index_name, customer_id, generation)
+
+def _switch_generation(index_name: str, customer_id: str, generation: str) -> Optional[str]:
+    db = SessionLocal()
+    try:
+        row = db.query(CatalogGeneration).filter(
+            CatalogGeneration.index_name == index_name,
+            CatalogGeneration.customer_id == customer_id
+        ).with_for_update().first()
+        replaced = row.active_generation if row else None
+        if row:
+            row.active_generation = generation
+        else:
+            db.add(CatalogGeneration(index_name=index_name, customer_id=customer_id, active_generation=generation))
+        db.commit()
+    finally:
+        db.close()
+    _generation_cache[(index_name, customer_id)] = (time.monotonic() + CATALOG_GENERATION_CACHE_TTL, generation)
+    return replaced
+
+async def catalog_filter(index_name: str, customer_id: str) -> List[dict]:
+    """
+    Các mệnh đề filter giới hạn truy vấn trong dữ liệu của khách hàng và thế hệ catalog
+    đang hoạt động, để tìm kiếm không bao giờ thấy catalog đang nạp dở.
+    """
+    clauses = [{"term": {"customer_id": customer_id}}]
+    generation = await get_active_generation_async(index_name, customer_id)
+    if generation:
+        clauses.append({"term": {"generation": generation}})
+    return clauses
+
+def composite_doc_id(customer_id: str, doc_id: str, generation: Optional[str] = None) -> str:
+    if generation:
+        return f"{customer_id}_{generation}_{doc_id}"
+    return f"{customer_id}_{doc_id}"
+
+async def _delete_generation(es_client: AsyncElasticsearch, index_name: str, customer_id: str,
+                             generation: Optional[str], delay: float):
+    await asyncio.sleep(delay)
+    if generation:
+        generation_clause = {"term": {"generation": generation}}
+    else:
+        generation_clause = {"bool": {"must_not": {"exists": {"field": "generation"}}}}
+    try:
+        for target_index, routing in await resolve_write_targets(index_name, customer_id):
+            await es_client.delete_by_query(
+                index=target_index,
+                query={"bool": {"filter": [{"term": {"customer_id": customer_id}}, generation_clause]}},
+                routing=routing,
+                conflicts="proceed",
+                wait_for_completion=False
+            )
+        print(f"🧹 Đã yêu cầu xóa thế hệ catalog '{generation or 'cũ'}' của khách hàng '{customer_id}' trong index '{index_name}'.")
+    except Exception as e:
+        print(f"⚠️ Không thể xóa thế hệ catalog '{generation}' của khách hàng '{customer_id}': {e}")
+
+def schedule_generation_cleanup(es_client: AsyncElasticsearch, index_name: str, customer_id: str,
+                                generation: Optional[str], delay: float = CATALOG_GENERATION_GRACE_SECONDS):
+    """
+    Xóa một thế hệ catalog (hoặc dữ liệu cũ chưa gắn thế hệ nếu `generation` là None) ở nền
+    sau `delay` giây, ngoài luồng xử lý request.
+    """
+    task = asyncio.create_task(_delete_generation(es_client, index_name, customer_id, generation, delay))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
@@ -1,14 +1,27 @@
 import pandas as pd
 from elasticsearch import Elasticsearch
-from elasticsearch.helpers import async_bulk
+from elasticsearch.helpers import async_streaming_bulk
 import numpy as np
 import warnings
-import io
 from service.utils.helpers import sanitize_for_es
-from typing import List, Dict, Any
+from typing import List, Dict, Any, BinaryIO, Callable, Optional, Tuple, Union
+from functools import partial
+import asyncio
 from elasticsearch import AsyncElasticsearch
 from datetime import datetime, timezone
 import hashlib
+from config.settings import ES_BULK_CHUNK_SIZE
+from config.settings import CATALOG_REPLACE_MODE, CATALOG_MAX_FAILED_RATIO
+from service.data.file_reader import iter_dataframes
+from service.data.es_analysis import get_shared_index_settings, folded_subfields, vi_text_field, vi_keyword_field
+from service.data.catalog_generation import (
+    get_active_generation_async, set_active_generation, new_generation_id,
+    composite_doc_id, schedule_generation_cleanup
+)
+from service.data.es_write_policy import (
+    normalize_refresh_policy, refresh_param, apply_refresh_policy, get_write_buffer
+)
+from service.data.tenant_placement import resolve_write_targets
 
 warnings.filterwarnings("ignore", category=UserWarning)
 
@@ -17,39 +30,124 @@ SERVICES_INDEX = "services"
 ACCESSORIES_INDEX = "accessories"
 FAQ_INDEX = "faqs"
 
+SHARED_INDEX_TYPES = {
+    PRODUCTS_INDEX: "product",
+    SERVICES_INDEX: "service",
+    ACCESSORIES_INDEX: "accessory",
+    FAQ_INDEX: "faq"
+}
+
+# Đoạn mô tả dựng sẵn cho agent: bản giá lẻ và bản cho khách buôn (thêm giá bán buôn).
+AGENT_TEXT_FIELD = "agent_text"
+AGENT_TEXT_WHOLESALE_FIELD = "agent_text_wholesale"
+
+def agent_text_field(is_sale_customer: bool) -> str:
+    return AGENT_TEXT_WHOLESALE_FIELD if is_sale_customer else AGENT_TEXT_FIELD
+
+def _price_text(value: Any) -> str:
+    try:
+        value = float(value or 0)
+    except (TypeError, ValueError):
+        value = 0
+    return f"{value:,.0f}đ" if value > 0 else "Liên hệ"
+
+def _inventory_text(value: Any) -> str:
+    try:
+        inventory = int(float(value or 0))
+    except (TypeError, ValueError):
+        inventory = 0
+    return f"Còn hàng (còn {inventory})" if inventory > 0 else "Hết hàng"
+
+def render_agent_text(data_type: Optional[str], doc: dict, is_sale_customer: bool = False) -> Optional[str]:
+    """
+    Dựng đoạn mô tả bản ghi cho agent (dùng chung cho nạp file, nạp hàng loạt và nạp từng bản ghi).
+    Trả về None với loại dữ liệu không dùng cho agent (FAQ).
+    """
+    def value(field: str) -> str:
+        v = doc.get(field)
+        return "" if v is None else str(v).strip()
+
+    def optional(*pairs) -> List[str]:
+        return [f"  {label}: {value(field)}" for label, field in pairs if value(field)]
+
+    wholesale = lambda field: [f"  Giá bán buôn: {_price_text(doc.get(field))}"] if is_sale_customer else []
+    if data_type == "product":
+        lines = [f"Mã sản phẩm: {value('ma_san_pham')}",
+                 "Sản phẩm: " + " ".join(v for v in (value('model'), value('dung_luong'), value('mau_sac')) if v)]
+        lines += optional(("Loại thiết bị", "loai_thiet_bi"), ("Tình trạng máy", "tinh_trang_may"))
+        lines += wholesale('gia_buon')
+        if doc.get('ton_kho') is not None:
+            lines.append(f"  Tình trạng: {_inventory_text(doc.get('ton_kho'))}")
+        lines += optional(("Bảo hành", "bao_hanh"), ("Tình trạng pin", "tinh_trang_pin"), ("Ghi chú", "ghi_chu"),
+                          ("Chip RAM", "chip_ram"), ("Camera", "camera"))
+        price = doc.get('gia')
+    elif data_type == "service":
+        lines = [f"Mã dịch vụ: {value('ma_dich_vu')}", f"Dịch vụ: {value('ten_dich_vu')}"]
+        lines += optional(("Áp dụng cho sản phẩm", "ten_san_pham"), ("Loại dịch vụ", "loai_dich_vu"))
+        lines += wholesale('gia_buon')
+        lines += optional(("Bảo hành", "bao_hanh"), ("Ghi chú", "ghi_chu"))
+        price = doc.get('gia')
+    elif data_type == "accessory":
+        lines = [f"Mã phụ kiện: {value('accessory_code')}", f"Phụ kiện: {value('accessory_name')}"]
+        if value('properties') not in ("", "0"):
+            lines.append(f"  Thuộc tính: {value('properties')}")
+        lines += wholesale('sale_price')
+        if doc.get('inventory') is not None:
+            lines.append(f"  Tình trạng: {_inventory_text(doc.get('inventory'))}")
+        lines += optional(("Bảo hành", "guarantee"), ("Link sản phẩm", "link_product"), ("Link ảnh", "avatar_images"))
+        price = doc.get('lifecare_price')
+    else:
+        return None
+
+    lines.append(f"  {'Giá bán lẻ' if is_sale_customer else 'Giá'}: {_price_text(price)}")
+    return "\n".join(lines)
+
+def add_agent_text(data_type: Optional[str], doc: dict) -> dict:
+    """Gắn cả hai bản mô tả (giá lẻ / khách buôn) vào bản ghi trước khi nạp."""
+    if data_type in ("product", "service", "accessory"):
+        doc[AGENT_TEXT_FIELD] = render_agent_text(data_type, doc)
+        doc[AGENT_TEXT_WHOLESALE_FIELD] = render_agent_text(data_type, doc, is_sale_customer=True)
+    return doc
+
 def get_shared_index_mapping(data_type: str):
     """
     Trả về mapping cho một loại dữ liệu cụ thể, đã bao gồm trường 'customer_id'.
+    Các trường văn bản có thêm subfield `folded` (bỏ dấu, đồng nghĩa) và `ngram` (tiền tố mã/model),
+    dùng analyzer trong `get_shared_index_settings`.
     """
     common_properties = {
-        "customer_id": {"type": "keyword"}
+        "customer_id": {"type": "keyword"},
+        "generation": {"type": "keyword"},
+        AGENT_TEXT_FIELD: {"type": "text", "index": False},
+        AGENT_TEXT_WHOLESALE_FIELD: {"type": "text", "index": False}
     }
     if data_type == "product":
         specific_properties = {
             "ma_san_pham": {"type": "keyword"},
-            "model": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
-            "mau_sac": {"type": "keyword"},
-            "dung_luong": {"type": "keyword"},
-            "tinh_trang_may": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
-            "loai_thiet_bi": {"type": "keyword"},
+            "model": vi_text_field(data_type, ngram=True),
+            "mau_sac": vi_keyword_field(data_type),
+            "dung_luong": {"type": "keyword", "normalizer": "vi_keyword"},
+            "tinh_trang_may": vi_text_field(data_type),
+            "loai_thiet_bi": vi_keyword_field(data_type),
             "gia": {"type": "double"}, "gia_buon": {"type": "double"}, "ton_kho": {"type": "integer"}   
         }
     elif data_type == "service":
         specific_properties = {
             "ma_dich_vu": {"type": "keyword"},
-            "ten_dich_vu": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
-            "ten_san_pham": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+            "ten_dich_vu": vi_text_field(data_type),
+            "ten_san_pham": vi_text_field(data_type, ngram=True),
+            "loai_dich_vu": vi_text_field(data_type),
             "gia": {"type": "double"}, "gia_buon": {"type": "double"}
         }
     elif data_type == "accessory":
         specific_properties = {
             "accessory_code": {"type": "keyword"},
-            "accessory_name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
-            "category": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
-            "properties": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+            "accessory_name": vi_text_field(data_type, ngram=True),
+            "category": vi_text_field(data_type),
+            "properties": vi_text_field(data_type),
             "lifecare_price": {"type": "double"},
             "sale_price": {"type": "double"},
-            "trademark": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+            "trademark": vi_text_field(data_type),
             "guarantee": {"type": "text"},
             "inventory": {"type": "integer"},
             "specifications": {"type": "text"},
@@ -59,9 +157,9 @@ def get_shared_index_mapping(data_type: str):
     elif data_type == "faq":
         specific_properties = {
             "faq_id": {"type": "keyword"},
-            "question": {"type": "text", "analyzer": "standard"},
-            "answer": {"type": "text", "analyzer": "standard"},
-            "classification": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+            "question": {"type": "text", "analyzer": "standard", "fields": folded_subfields(data_type)},
+            "answer": {"type": "text", "analyzer": "standard", "fields": folded_subfields(data_type)},
+            "classification": vi_text_field(data_type),
             "created_at": {"type": "date"}
         }
     else:
@@ -70,22 +168,47 @@ def get_shared_index_mapping(data_type: str):
     common_properties.update(specific_properties)
     return {"properties": common_properties}
 
+async def put_shared_index_templates(es_client: Elasticsearch):
+    """
+    Cài index template cho các index chia sẻ, các phiên bản `<index>_v<N>` do công cụ reindex tạo và
+    index riêng `<index>-t-<khách hàng>`, để mọi index mới (kể cả index tự tạo khi ghi) đều có analyzer
+    và mapping đúng.
+    """
+    for index_name, data_type in SHARED_INDEX_TYPES.items():
+        await es_client.indices.put_index_template(
+            name=f"{index_name}-template",
+            index_patterns=[index_name, f"{index_name}_v*", f"{index_name}-t-*"],
+            priority=100,
+            template={
+                "settings": get_shared_index_settings(data_type),
+                "mappings": get_shared_index_mapping(data_type)
+            }
+        )
+
 async def ensure_shared_indices_exist(es_client: Elasticsearch):
     """
     Kiểm tra và tạo các index chia sẻ nếu chúng chưa tồn tại.
+    Index cũ chưa có analyzer tiếng Việt cần chạy `reindex_es.py` để chuyển sang mapping mới.
     """
-    indices_to_create = {
-        PRODUCTS_INDEX: "product",
-        SERVICES_INDEX: "service",
-        ACCESSORIES_INDEX: "accessory",
-        FAQ_INDEX: "faq"
-    }
-    for index_name, data_type in indices_to_create.items():
+    try:
+        await put_shared_index_templates(es_client)
+    except Exception as e:
+        print(f"⚠️ Không thể cài index template: {e}")
+    for index_name, data_type in SHARED_INDEX_TYPES.items():
         if not await es_client.indices.exists(index=index_name):
             print(f"🛠 Đang tạo index chia sẻ '{index_name}'...")
             mapping = get_shared_index_mapping(data_type)
-            await es_client.indices.create(index=index_name, mappings=mapping)
+            await es_client.indices.create(index=index_name, mappings=mapping, settings=get_shared_index_settings(data_type))
             print(f"✅ Tạo thành công index '{index_name}'.")
+        else:
+            try:
+                await es_client.indices.put_mapping(index=index_name, properties={
+                    "generation": {"type": "keyword"},
+                    AGENT_TEXT_FIELD: {"type": "text", "index": False},
+                    AGENT_TEXT_WHOLESALE_FIELD: {"type": "text", "index": False}
+                })
+            except Exception as e:
+                print(f"⚠️ Không thể cập nhật mapping cho index '{index_name}': {e}")
 
 async def clear_customer_data(es_client: Elasticsearch, index_name: str, customer_id: str):
     """
@@ -94,86 +217,220 @@ async def clear_customer_data(es_client: Elasticsearch, index_name: str, custome
     print(f"🗑️ Đang xóa dữ liệu cũ của khách hàng '{customer_id}' trong index '{index_name}'...")
     sanitized_customer_id = sanitize_for_es(customer_id)
     try:
-        await es_client.delete_by_query(
-            index=index_name,
-            query={"term": {"customer_id": sanitized_customer_id}},
-            refresh=True,
-            wait_for_completion=True
-        )
+        for target_index, routing in await resolve_write_targets(index_name, sanitized_customer_id):
+            await es_client.delete_by_query(
+                index=target_index,
+                query={"term": {"customer_id": sanitized_customer_id}},
+                routing=routing,
+                wait_for_completion=True
+            )
         print(f"✅ Xóa dữ liệu cũ thành công.")
     except Exception as e:
         print(f"⚠️ Không thể xóa dữ liệu cũ (có thể do chưa có): {e}")
 
+def _clean_frame(df: pd.DataFrame, columns_config: dict) -> pd.DataFrame:
+    """
+    Làm sạch DataFrame theo cấu hình cột bằng các phép toán theo cột (không duyệt từng dòng).
+    """
+    config_cols = columns_config.get('names', [])
+    rename_map = columns_config.get('rename_map', {})
+    required = columns_config.get('required', [])
+
+    missing_cols = [col for col in config_cols if col not in df.columns]
+    if missing_cols:
+        raise ValueError(f"Các cột sau không tìm thấy trong file: {', '.join(missing_cols)}")
+
+    df = df[config_cols]
+
+    for col in required:
+        series = df[col]
+        if pd.api.types.is_string_dtype(series):
+            series = series.str.strip()
+            df[col] = series.mask(series == '')
+        elif series.dtype == object:
+            df[col] = series.replace(r'^\s*$', np.nan, regex=True)
+
+    df = df.dropna(subset=required)
+
+    for col, dtype in columns_config.get('numerics', {}).items():
+        series = df[col]
+        if not pd.api.types.is_numeric_dtype(series):
+            series = series.astype(str).str.replace(',', '', regex=False)
+        df[col] = pd.to_numeric(series, errors='coerce').fillna(0).astype(dtype)
+
+    if rename_map:
+        df = df.rename(columns=rename_map)
+    return df
+
+def _document_ids(df: pd.DataFrame, id_field: str, sanitized_customer_id: str,
+                  generation: Optional[str] = None) -> pd.Series:
+    """
+    Tạo ID composite `{customer}_{id}` (hoặc `{customer}_{generation}_{id}`) cho từng dòng;
+    bỏ qua các dòng không có ID.
+    """
+    ids = df[id_field]
+    ids = ids[ids.notna()].astype(str).str.replace("-", "", regex=False)
+    ids = ids[ids != '']
+    return composite_doc_id(sanitized_customer_id, "", generation) + ids
+
+def _iter_bulk_actions(df: pd.DataFrame, doc_ids: pd.Series, chunk_size: int = ES_BULK_CHUNK_SIZE,
+                      data_type: Optional[str] = None):
+    """
+    Sinh các action bulk (chưa gắn index/routing) theo từng lô `chunk_size` dòng, chỉ chuyển lô
+    hiện tại sang dict để bộ nhớ không tăng theo số dòng của file. Mỗi bản ghi được dựng sẵn đoạn mô tả cho agent.
+    """
+    df = df.loc[doc_ids.index]
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        records = chunk.astype(object).where(chunk.notna(), None).to_dict('records')
+        for doc_id, doc in zip(doc_ids.iloc[start:start + chunk_size], records):
+            yield {"_id": doc_id, "_source": add_agent_text(data_type, doc)}
+
+def _bulk_meta(target_index: str, doc_id: str, routing: Optional[str]) -> dict:
+    meta = {"_index": target_index, "_id": doc_id}
+    if routing:
+        meta["routing"] = routing
+    return meta
+
+async def _actions_for_targets(actions, targets: List[Tuple[str, Optional[str]]]):
+    """Nhân mỗi action cho từng (index, routing) đích, theo đúng thứ tự của `targets`."""
+    if not hasattr(actions, "__aiter__"):
+        actions = _as_async_iter(actions)
+    async for action in actions:
+        for target_index, routing in targets:
+            yield {**action, **_bulk_meta(target_index, action["_id"], routing)}
+
+async def _as_async_iter(items):
+    for item in items:
+        yield item
+
+async def _streaming_bulk_index(es_client: AsyncElasticsearch, targets: List[Tuple[str, Optional[str]]], actions,
+                                refresh: str = "coalesced", chunk_size: int = ES_BULK_CHUNK_SIZE):
+    """
+    Đẩy các action vào các index đích theo từng lô qua `async_streaming_bulk`, sau đó áp dụng chính sách
+    refresh một lần cho cả lần nạp. Kết quả chỉ tính theo index đích chính (phần tử đầu của `targets`);
+    lỗi ở index bản sao (khi đang chuyển khách hàng sang index riêng) chỉ được ghi log.
+    Trả về (số bản ghi thành công, danh sách lỗi).
+    """
+    success, failed, mirror_failed = 0, [], 0
+    position = 0
+    async for ok, info in async_streaming_bulk(es_client, _actions_for_targets(actions, targets),
+                                               chunk_size=chunk_size, raise_on_error=False):
+        is_primary = position % len(targets) == 0
+        position += 1
+        if ok:
+            success += is_primary
+        elif is_primary:
+            failed.append(info)
+        else:
+            mirror_failed += 1
+    if mirror_failed:
+        print(f"⚠️ {mirror_failed} bản ghi không ghi được vào index bản sao {[t[0] for t in targets[1:]]}.")
+    if success:
+        for target_index, _ in targets:
+            await apply_refresh_policy(es_client, target_index, refresh)
+    return success, failed
+
+async def _write_to_targets(targets: List[Tuple[str, Optional[str]]], write: Callable):
+    """
+    Chạy `write(index, routing)` cho mọi index đích. Kết quả và lỗi lấy từ index chính;
+    lỗi ở index bản sao chỉ được ghi log.
+    """
+    results = await asyncio.gather(*(write(target_index, routing) for target_index, routing in targets),
+                                   return_exceptions=True)
+    for (target_index, _), result in zip(targets[1:], results[1:]):
+        if isinstance(result, Exception):
+            print(f"⚠️ Ghi vào index bản sao '{target_index}' thất bại: {result}")
+    if isinstance(results[0], BaseException):
+        raise results[0]
+    return results[0]
+
+async def _aiter_file_actions(
+    first_batch: pd.DataFrame,
+    batches,
+    columns_config: dict,
+    sanitized_customer_id: str,
+    id_field: str,
+    prepare: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+    generation: Optional[str] = None,
+    data_type: Optional[str] = None
+):
+    """
+    Làm sạch từng lô DataFrame đọc từ file và sinh action bulk. Việc parse lô kế tiếp chạy
+    trong thread riêng để không chặn event loop khi file lớn.
+    """
+    batch = first_batch
+    while batch is not None:
+        try:
+            df = _clean_frame(batch, columns_config)
+            if prepare:
+                df = prepare(df)
+            df['customer_id'] = sanitized_customer_id
+            if generation:
+                df['generation'] = generation
+            doc_ids = _document_ids(df, id_field, sanitized_customer_id, generation)
+        except Exception as e:
+            raise ValueError(f"Lỗi đọc hoặc xử lý file: {e}")
+        for action in _iter_bulk_actions(df, doc_ids, data_type=data_type):
+            yield action
+        try:
+            batch = await asyncio.to_thread(next, batches, None)
+        except Exception as e:
+            raise ValueError(f"Lỗi đọc hoặc xử lý file: {e}")
+
+async def _open_file_batches(file_content: Union[bytes, BinaryIO], filename: str, columns_config: dict):
+    """Mở file và đọc lô đầu tiên (kiểm tra định dạng và các cột bắt buộc)."""
+    try:
+        batches = iter_dataframes(file_content, filename, columns_config)
+        first_batch = await asyncio.to_thread(next, batches, None)
+    except Exception as e:
+        raise ValueError(f"Lỗi đọc hoặc xử lý file: {e}")
+    return first_batch, batches
+
 async def process_and_index_data(
     es_client: Elasticsearch, 
     customer_id: str,
     index_name: str, 
-    file_content: bytes, 
-    columns_config: dict
+    file_content: Union[bytes, BinaryIO], 
+    columns_config: dict,
+    filename: str = "data.xlsx",
+    replace_mode: str = CATALOG_REPLACE_MODE,
+    refresh: Optional[str] = None
 ):
     """
-    Hàm tổng quát để đọc, xử lý và nạp dữ liệu vào một index chia sẻ.
+    Hàm tổng quát để đọc, xử lý và nạp dữ liệu vào một index chia sẻ, thay thế dữ liệu cũ.
+    File (xlsx, xls, csv, parquet) được đọc và nạp theo từng lô, không tải toàn bộ vào bộ nhớ.
+
+    replace_mode="generation": nạp vào một thế hệ catalog mới trong khi tìm kiếm vẫn dùng thế hệ cũ,
+    nạp xong mới chuyển thế hệ đang hoạt động và xóa thế hệ cũ ở nền. Nếu tỉ lệ bản ghi lỗi vượt
+    CATALOG_MAX_FAILED_RATIO, thế hệ mới bị hủy, catalog cũ được giữ và hàm báo lỗi (ValueError).
+    replace_mode="clear": xóa dữ liệu cũ rồi nạp lại (catalog trống trong lúc nạp).
+    Ở chế độ "generation", thế hệ mới luôn được refresh trước khi chuyển đổi nên `refresh` chỉ
+    áp dụng cho chế độ "clear".
     """
-    await clear_customer_data(es_client, index_name, customer_id)
+    refresh = normalize_refresh_policy(refresh)
+    first_batch, batches = await _open_file_batches(file_content, filename, columns_config)
     sanitized_customer_id = sanitize_for_es(customer_id)
-    try:
-        df = pd.read_excel(io.BytesIO(file_content))
-        
-        config_cols = columns_config.get('names', [])
-        rename_map = columns_config.get('rename_map', {})
-
-        missing_cols = [col for col in config_cols if col not in df.columns]
-        if missing_cols:
-            raise ValueError(f"Các cột sau không tìm thấy trong file Excel: {', '.join(missing_cols)}")
-
-        df = df[config_cols]
-
-        for col in columns_config.get('required', []):
-            if pd.api.types.is_string_dtype(df[col]):
-                df[col] = df[col].str.strip()
-            df[col] = df[col].replace(r'^\s*$', np.nan, regex=True)
-
-        df = df.dropna(subset=columns_config['required'])
-        
-        for col, dtype in columns_config.get('numerics', {}).items():
-            if dtype == float:
-                df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', ''), errors='coerce').fillna(0).astype(float)
-            elif dtype == int:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
-        
-        if rename_map:
-            df.rename(columns=rename_map, inplace=True)
-            
-        df['customer_id'] = sanitized_customer_id
-        df = df.where(pd.notnull(df), None).replace({np.nan: None})
-    except Exception as e:
-        raise ValueError(f"Lỗi đọc hoặc xử lý file Excel: {e}")
+    use_generation = replace_mode == "generation"
+    generation = new_generation_id() if use_generation else None
+    if not use_generation:
+        await clear_customer_data(es_client, index_name, customer_id)
+    if first_batch is None:
+        return 0, 0
 
-    actions = []
+    rename_map = columns_config.get('rename_map', {})
     original_id_field = columns_config.get('id_field')
     renamed_id_field = rename_map.get(original_id_field, original_id_field)
 
-    for _, row in df.iterrows():
-        doc = row.to_dict()
-        product_id = doc.get(renamed_id_field)
-        if product_id is None:
-            continue
-        sanitized_product_id = sanitize_for_es(str(product_id))
-
-        action = {
-            "_index": index_name,
-            "_id": f"{sanitized_customer_id}_{sanitized_product_id}",
-            "_source": doc,
-            "routing": sanitized_customer_id
-        }
-        actions.append(action)
-
-    if not actions:
-        return 0, 0
-
-    print(f"🚀 Đang nạp {len(actions)} bản ghi vào index '{index_name}' cho khách hàng '{customer_id}'...")
+    print(f"🚀 Đang nạp dữ liệu vào index '{index_name}' cho khách hàng '{customer_id}'...")
     try:
-        success, failed = await async_bulk(es_client, actions, raise_on_error=False, refresh=True)
+        actions = _aiter_file_actions(first_batch, batches, columns_config,
+                                      sanitized_customer_id, renamed_id_field, generation=generation,
+                                      data_type=SHARED_INDEX_TYPES.get(index_name))
+        success, failed = await _streaming_bulk_index(
+            es_client, await resolve_write_targets(index_name, sanitized_customer_id), actions,
+            refresh="wait_for" if use_generation else refresh
+        )
         print(f"✅ Thành công: {success} bản ghi.")
         if failed:
             print(f"❌ Thất bại: {len(failed)} bản ghi.")
@@ -183,161 +440,184 @@ async def process_and_index_data(
                 doc_id = fail_info.get('index', {}).get('_id', 'N/A')
                 print(f"  Lỗi {i+1} (ID: {doc_id}): {error_details}")
             print("---------------------------------")
+        if use_generation:
+            # Catalog nạp thiếu không được thay thế catalog đang dùng; thế hệ mới bị xóa ở nhánh except.
+            if len(failed) > CATALOG_MAX_FAILED_RATIO * (success + len(failed)):
+                raise ValueError(
+                    f"Nạp thất bại {len(failed)}/{success + len(failed)} bản ghi, catalog hiện tại được giữ nguyên."
+                )
+            if success:
+                replaced_generation = await asyncio.to_thread(set_active_generation, index_name, sanitized_customer_id, generation)
+                schedule_generation_cleanup(es_client, index_name, sanitized_customer_id, replaced_generation)
+                print(f"🔀 Đã chuyển catalog của khách hàng '{customer_id}' sang thế hệ '{generation}'.")
+            else:
+                schedule_generation_cleanup(es_client, index_name, sanitized_customer_id, generation, delay=0)
         return success, len(failed)
     except Exception as e:
+        if use_generation:
+            schedule_generation_cleanup(es_client, index_name, sanitized_customer_id, generation, delay=0)
+        if isinstance(e, ValueError):
+            raise
         raise IOError(f"Lỗi trong quá trình bulk indexing: {e}")
 
-async def index_single_document(es_client: Elasticsearch, index_name: str, customer_id: str, doc_id: str, doc_body: dict):
+async def index_single_document(es_client: Elasticsearch, index_name: str, customer_id: str, doc_id: str, doc_body: dict,
+                                refresh: Optional[str] = None):
     """
     Nạp (hoặc ghi đè) một bản ghi duy nhất vào index chia sẻ với routing.
+    Với refresh="wait_for", bản ghi được ghi trực tiếp và chờ tới khi tìm kiếm được; các chính sách
+    khác đi qua bộ đệm ghi để gộp với các thao tác đồng thời thành một request bulk.
     """
+    refresh = normalize_refresh_policy(refresh)
     sanitized_customer_id = sanitize_for_es(customer_id)
     doc_body['customer_id'] = sanitized_customer_id
-    sanitized_doc_id = sanitize_for_es(doc_id)
-    composite_id = f"{sanitized_customer_id}_{sanitized_doc_id}"
+    add_agent_text(SHARED_INDEX_TYPES.get(index_name), doc_body)
+    generation = await get_active_generation_async(index_name, sanitized_customer_id, use_cache=False)
+    if generation:
+        doc_body['generation'] = generation
+    composite_id = composite_doc_id(sanitized_customer_id, sanitize_for_es(doc_id), generation)
     
-    try:
-        response = await es_client.index(
-            index=index_name,
-            id=composite_id,
-            document=doc_body,
-            routing=sanitized_customer_id,
-            refresh=True
+    async def write(target_index: str, routing: Optional[str]):
+        if refresh == "wait_for":
+            return await es_client.index(
+                index=target_index,
+                id=composite_id,
+                document=doc_body,
+                routing=routing,
+                refresh=refresh_param(refresh)
+            )
+        response = await get_write_buffer(es_client).submit(
+            {"index": _bulk_meta(target_index, composite_id, routing)},
+            doc_body
         )
+        await apply_refresh_policy(es_client, target_index, refresh)
         return response
+
+    try:
+        return await _write_to_targets(await resolve_write_targets(index_name, sanitized_customer_id), write)
     except Exception as e:
         raise IOError(f"Lỗi khi nạp bản ghi đơn: {e}")
 
-async def delete_single_document(es_client: Elasticsearch, index_name: str, customer_id: str, doc_id: str):
+async def delete_single_document(es_client: Elasticsearch, index_name: str, customer_id: str, doc_id: str,
+                                 refresh: Optional[str] = None):
     """
-    Xóa một bản ghi duy nhất khỏi index chia sẻ.
+    Xóa một bản ghi duy nhất khỏi index chia sẻ (qua bộ đệm ghi, trừ khi refresh="wait_for").
     """
+    refresh = normalize_refresh_policy(refresh)
     sanitized_customer_id = sanitize_for_es(customer_id)
-    sanitized_doc_id = sanitize_for_es(doc_id)
-    composite_id = f"{sanitized_customer_id}_{sanitized_doc_id}"
-    try:
-        response = await es_client.delete(
-            index=index_name,
-            id=composite_id,
-            routing=sanitized_customer_id,
-            refresh=True
+    generation = await get_active_generation_async(index_name, sanitized_customer_id, use_cache=False)
+    composite_id = composite_doc_id(sanitized_customer_id, sanitize_for_es(doc_id), generation)
+    async def delete(target_index: str, routing: Optional[str]):
+        if refresh == "wait_for":
+            return await es_client.delete(
+                index=target_index,
+                id=composite_id,
+                routing=routing,
+                refresh=refresh_param(refresh)
+            )
+        response = await get_write_buffer(es_client).submit(
+            {"delete": _bulk_meta(target_index, composite_id, routing)}
         )
+        await apply_refresh_policy(es_client, target_index, refresh)
         return response
+
+    try:
+        return await _write_to_targets(await resolve_write_targets(index_name, sanitized_customer_id), delete)
     except Exception as e:
         raise IOError(f"Lỗi khi xóa bản ghi: {e}")
 
-async def bulk_index_documents(es_client: Elasticsearch, index_name: str, customer_id: str, documents: list[dict], id_field: str):
+async def bulk_index_documents(es_client: Elasticsearch, index_name: str, customer_id: str, documents: list[dict], id_field: str,
+                               refresh: Optional[str] = None):
     """
     Nạp hàng loạt một danh sách các bản ghi vào index chia sẻ.
     Hàm này không xóa dữ liệu cũ.
     """
-    actions = []
+    refresh = normalize_refresh_policy(refresh)
     sanitized_customer_id = sanitize_for_es(customer_id)
-    
-    for doc in documents:
-        doc_id = doc.get(id_field)
-        if not doc_id:
-            continue 
-
-        sanitized_doc_id = sanitize_for_es(doc_id)
-        composite_id = f"{sanitized_customer_id}_{sanitized_doc_id}"
-        doc['customer_id'] = sanitized_customer_id
-        
-        action = {
-            "_index": index_name,
-            "_id": composite_id,
-            "_source": doc,
-            "routing": sanitized_customer_id
-        }
-        actions.append(action)
-
-    if not actions:
-        return 0, 0
+    generation = await get_active_generation_async(index_name, sanitized_customer_id, use_cache=False)
+
+    def generate_actions():
+        for doc in documents:
+            doc_id = doc.get(id_field)
+            if doc_id is None or doc_id == '':
+                continue
+            doc['customer_id'] = sanitized_customer_id
+            if generation:
+                doc['generation'] = generation
+            add_agent_text(SHARED_INDEX_TYPES.get(index_name), doc)
+            yield {
+                "_id": composite_doc_id(sanitized_customer_id, sanitize_for_es(str(doc_id)), generation),
+                "_source": doc
+            }
 
     try:
-        success, failed = await async_bulk(es_client, actions, raise_on_error=False, refresh=True)
-        return success, failed
+        return await _streaming_bulk_index(es_client, await resolve_write_targets(index_name, sanitized_customer_id),
+                                           generate_actions(), refresh=refresh)
     except Exception as e:
         raise IOError(f"Lỗi trong quá trình bulk indexing hàng loạt: {e}")
 
+def _add_faq_fields(df: pd.DataFrame, question_field: str) -> pd.DataFrame:
+    """Sinh faq_id từ câu hỏi (sha1 của câu hỏi đã chuẩn hóa) và thời điểm tạo."""
+    df['faq_id'] = [
+        hashlib.sha1(question.strip().lower().encode('utf-8')).hexdigest()
+        if question and isinstance(question, str) else None
+        for question in df[question_field]
+    ]
+    df['created_at'] = datetime.now(timezone.utc)
+    return df
+
 async def process_and_upsert_file_data(
     es_client: Elasticsearch,
     customer_id: str,
     index_name: str,
-    file_content: bytes,
-    columns_config: dict
+    file_content: Union[bytes, BinaryIO],
+    columns_config: dict,
+    filename: str = "data.xlsx",
+    refresh: Optional[str] = None
 ):
     """
-    Đọc file Excel, xử lý và NẠP THÊM (upsert) dữ liệu vào index chia sẻ.
+    Đọc file (xlsx, xls, csv, parquet), xử lý và NẠP THÊM (upsert) dữ liệu vào index chia sẻ theo từng lô.
     Hàm này KHÔNG xóa dữ liệu cũ của khách hàng.
     """
-    try:
-        df = pd.read_excel(io.BytesIO(file_content))
-        
-        config_cols = columns_config.get('names', [])
-        rename_map = columns_config.get('rename_map', {})
-
-        missing_cols = [col for col in config_cols if col not in df.columns]
-        if missing_cols:
-            raise ValueError(f"Các cột sau không tìm thấy trong file Excel: {', '.join(missing_cols)}")
-
-        df = df[config_cols]
-        
-        df = df.dropna(subset=columns_config['required'])
-
-        for col, dtype in columns_config.get('numerics', {}).items():
-            df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', ''), errors='coerce').fillna(0).astype(dtype)
-        
-        if rename_map:
-            df.rename(columns=rename_map, inplace=True)
-
-        df = df.where(pd.notnull(df), None).replace({np.nan: None})
-    except Exception as e:
-        raise ValueError(f"Lỗi đọc hoặc xử lý file Excel: {e}")
-
-    documents = df.to_dict('records')
-    if not documents:
+    refresh = normalize_refresh_policy(refresh)
+    first_batch, batches = await _open_file_batches(file_content, filename, columns_config)
+    if first_batch is None:
         return 0, 0
-    
+
+    sanitized_customer_id = sanitize_for_es(customer_id)
+    rename_map = columns_config.get('rename_map', {})
     id_generation_field = columns_config.get('id_generation_field')
     renamed_id_gen_field = rename_map.get(id_generation_field, id_generation_field)
-    renamed_id_field = None
-
-    if id_generation_field and renamed_id_gen_field in documents[0]:
-        if index_name == FAQ_INDEX:
-            for doc in documents:
-                question = doc.get(renamed_id_gen_field, '')
-                if question and isinstance(question, str):
-                    doc['faq_id'] = hashlib.sha1(question.strip().lower().encode('utf-8')).hexdigest()
-                else:
-                    doc['faq_id'] = None
-            renamed_id_field = 'faq_id'
-
-    if not renamed_id_field:
+
+    prepare = None
+    if index_name == FAQ_INDEX and id_generation_field:
+        renamed_id_field = 'faq_id'
+        prepare = partial(_add_faq_fields, question_field=renamed_id_gen_field)
+    else:
         original_id_field = columns_config.get('id_field')
         renamed_id_field = rename_map.get(original_id_field, original_id_field)
 
-    if index_name == FAQ_INDEX:
-        for document in documents:
-            document['created_at'] = datetime.now(timezone.utc)
-
-    success, failed = await bulk_index_documents(
-        es_client,
-        index_name,
-        customer_id,
-        documents,
-        id_field=renamed_id_field
-    )
-    return success, failed
+    try:
+        generation = await get_active_generation_async(index_name, sanitized_customer_id, use_cache=False)
+        actions = _aiter_file_actions(first_batch, batches, columns_config,
+                                      sanitized_customer_id, renamed_id_field, prepare, generation,
+                                      SHARED_INDEX_TYPES.get(index_name))
+        return await _streaming_bulk_index(es_client, await resolve_write_targets(index_name, sanitized_customer_id),
+                                           actions, refresh=refresh)
+    except ValueError:
+        raise
+    except Exception as e:
+        raise IOError(f"Lỗi trong quá trình bulk indexing hàng loạt: {e}")
 
 async def delete_documents_by_customer(
     es_client: Elasticsearch, 
     index_name: str, 
-    customer_id: str
+    customer_id: str,
+    refresh: Optional[str] = None
 ) -> dict:
     """
     Xóa tất cả các document của một customer_id cụ thể khỏi một index.
     """
+    refresh = normalize_refresh_policy(refresh)
     query = {
         "query": {
             "term": {
@@ -345,14 +625,17 @@ async def delete_documents_by_customer(
             }
         }
     }
-    try:
+    async def delete(target_index: str, routing: Optional[str]):
         response = await es_client.delete_by_query(
-            index=index_name,
+            index=target_index,
             body=query,
-            refresh=True,
-            routing=customer_id
+            routing=routing
         )
+        await apply_refresh_policy(es_client, target_index, refresh)
         return response.body
+
+    try:
+        return await _write_to_targets(await resolve_write_targets(index_name, customer_id), delete)
     except Exception as e:
         print(f"Lỗi khi xóa document cho customer_id '{customer_id}' trong index '{index_name}': {e}")
         raise
@@ -362,11 +645,13 @@ async def bulk_delete_documents(
     index_name: str,
     customer_id: str,
     doc_ids: List[str],
-    id_field: str
+    id_field: str,
+    refresh: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Xóa hàng loạt các document từ một index dựa trên danh sách ID và một trường cụ thể.
     """
+    refresh = normalize_refresh_policy(refresh)
     if not doc_ids:
         return {"deleted": 0, "failures": []}
 
@@ -380,14 +665,17 @@ async def bulk_delete_documents(
             }
         }
     }
-    try:
+    async def delete(target_index: str, routing: Optional[str]):
         response = await es_client.delete_by_query(
-            index=index_name,
+            index=target_index,
             body=query,
-            refresh=True,
-            routing=customer_id
+            routing=routing
         )
+        await apply_refresh_policy(es_client, target_index, refresh)
         return response.body
+
+    try:
+        return await _write_to_targets(await resolve_write_targets(index_name, customer_id), delete)
     except Exception as e:
         print(f"Lỗi khi xóa hàng loạt document cho customer_id '{customer_id}' trong index '{index_name}': {e}")
         raise
\ No newline at end of file
@@ -0,0 +1,99 @@
+from typing import Dict, List
+
+# Từ đồng nghĩa theo từng loại dữ liệu, viết ở dạng đã bỏ dấu và chữ thường. Chỉ dùng lúc tìm kiếm;
+# sau khi sửa, chạy `reindex_es.py` để cập nhật settings của index.
+SYNONYMS: Dict[str, List[str]] = {
+    "product": [
+        "ip, iphone",
+        "ss, samsung",
+        "pm, pro max, promax",
+        "dt, dien thoai, phone",
+        "mtb, may tinh bang, tablet, ipad",
+        "cu, da qua su dung, like new",
+    ],
+    "service": [
+        "pin, battery",
+        "man hinh, lcd, screen",
+        "mat kinh, kinh, glass",
+        "ep kinh, thay mat kinh",
+        "cam, camera",
+        "ip, iphone",
+        "ss, samsung",
+    ],
+    "accessory": [
+        "op, op lung, case",
+        "sac, cu sac, charger, adapter",
+        "cap, day sac, cable",
+        "tai nghe, headphone, earphone, airpods",
+        "cuong luc, kinh cuong luc, dan man hinh",
+        "ip, iphone",
+    ],
+    "faq": [
+        "tra gop, installment",
+        "bao hanh, warranty",
+        "ship, giao hang, van chuyen",
+        "dia chi, o dau, cho nao",
+        "gio mo cua, may gio, mo cua",
+    ],
+}
+
+def get_shared_index_settings(data_type: str) -> dict:
+    """
+    Cấu hình analysis cho index chia sẻ:
+    - `vi_folded`: tách từ, chữ thường, bỏ dấu tiếng Việt ("màn hình" ~ "man hinh").
+    - `vi_search_<loại>`: như trên kèm từ đồng nghĩa của loại dữ liệu, dùng lúc tìm kiếm.
+    - `vi_edge_ngram`: tiền tố 2-15 ký tự cho mã/model ("ip 15" khớp "iPhone 15").
+    - normalizer `vi_keyword` cho so khớp chính xác không phân biệt hoa thường và dấu.
+    """
+    return {
+        "analysis": {
+            "filter": {
+                "vi_ascii": {"type": "asciifolding", "preserve_original": False},
+                f"vi_synonyms_{data_type}": {
+                    "type": "synonym_graph",
+                    "synonyms": SYNONYMS.get(data_type, []),
+                    "lenient": True
+                },
+                "vi_edge_ngram": {"type": "edge_ngram", "min_gram": 2, "max_gram": 15}
+            },
+            "analyzer": {
+                "vi_folded": {
+                    "type": "custom",
+                    "tokenizer": "standard",
+                    "filter": ["lowercase", "vi_ascii"]
+                },
+                f"vi_search_{data_type}": {
+                    "type": "custom",
+                    "tokenizer": "standard",
+                    "filter": ["lowercase", "vi_ascii", f"vi_synonyms_{data_type}"]
+                },
+                "vi_edge_ngram": {
+                    "type": "custom",
+                    "tokenizer": "standard",
+                    "filter": ["lowercase", "vi_ascii", "vi_edge_ngram"]
+                }
+            },
+            "normalizer": {
+                "vi_keyword": {"type": "custom", "filter": ["lowercase", "vi_ascii"]}
+            }
+        }
+    }
+
+def folded_subfields(data_type: str, ngram: bool = False) -> dict:
+    """Các subfield `folded` (bỏ dấu + đồng nghĩa) và tùy chọn `ngram` (tiền tố) cho một trường văn bản."""
+    fields = {
+        "folded": {"type": "text", "analyzer": "vi_folded", "search_analyzer": f"vi_search_{data_type}"}
+    }
+    if ngram:
+        fields["ngram"] = {"type": "text", "analyzer": "vi_edge_ngram", "search_analyzer": "vi_folded"}
+    return fields
+
+def vi_text_field(data_type: str, ngram: bool = False, keyword: bool = True) -> dict:
+    """Trường text giữ nguyên dấu, kèm subfield `keyword` và các subfield tìm kiếm tiếng Việt."""
+    fields = {"keyword": {"type": "keyword"}} if keyword else {}
+    fields.update(folded_subfields(data_type, ngram))
+    return {"type": "text", "fields": fields}
+
+def vi_keyword_field(data_type: str) -> dict:
+    """Trường keyword (lọc/so khớp chính xác như cũ) kèm subfield `folded` để tìm không dấu."""
+    return {"type": "keyword", "fields": folded_subfields(data_type)}
@@ -0,0 +1,158 @@
+import asyncio
+from typing import Dict, List, Literal, Optional, Tuple, Union
+
+from elasticsearch import AsyncElasticsearch
+from fastapi import Query
+
+from config.settings import (
+    ES_REFRESH_POLICY,
+    ES_REFRESH_COALESCE_SECONDS,
+    ES_WRITE_BUFFER_MAX_DOCS,
+    ES_WRITE_BUFFER_FLUSH_SECONDS
+)
+
+# "false": không refresh, dữ liệu hiển thị theo chu kỳ refresh của index.
+# "wait_for": chờ tới khi dữ liệu tìm kiếm được (read-your-writes) rồi mới trả về.
+# "coalesced": không chờ; gộp mọi lần ghi trong một khoảng ngắn thành một lần refresh duy nhất.
+REFRESH_POLICIES = ("false", "wait_for", "coalesced")
+RefreshPolicy = Literal["false", "wait_for", "coalesced"]
+# Tham số query `refresh` dùng chung cho các endpoint ghi dữ liệu
+RefreshQuery = Query(None, description="Chính sách refresh: false, wait_for (tìm kiếm được ngay khi trả về) hoặc coalesced. Mặc định theo cấu hình.")
+
+# index -> future của lần refresh gộp đang chờ chạy
+_pending_refreshes: Dict[str, asyncio.Future] = {}
+_background_tasks = set()
+_write_buffers: Dict[int, "BulkWriteBuffer"] = {}
+
+def normalize_refresh_policy(policy: Optional[str]) -> str:
+    """Trả về chính sách refresh hợp lệ (mặc định ES_REFRESH_POLICY); báo ValueError nếu không hỗ trợ."""
+    policy = (policy or ES_REFRESH_POLICY).strip().lower()
+    if policy not in REFRESH_POLICIES:
+        raise ValueError(f"Chính sách refresh '{policy}' không hợp lệ. Hỗ trợ: {', '.join(REFRESH_POLICIES)}.")
+    return policy
+
+def refresh_param(policy: str) -> Union[bool, str]:
+    """Giá trị tham số `refresh` truyền cho các API index/delete/bulk của Elasticsearch."""
+    return "wait_for" if policy == "wait_for" else False
+
+async def _run_refresh(es_client: AsyncElasticsearch, index_name: str, future: asyncio.Future, delay: float):
+    await asyncio.sleep(delay)
+    # Gỡ khỏi danh sách chờ trước khi refresh: các lần ghi đến sau sẽ hẹn một lần refresh mới.
+    if _pending_refreshes.get(index_name) is future:
+        del _pending_refreshes[index_name]
+    try:
+        await es_client.indices.refresh(index=index_name)
+        future.set_result(True)
+    except Exception as e:
+        print(f"⚠️ Không thể refresh index '{index_name}': {e}")
+        future.set_result(False)
+
+def request_coalesced_refresh(es_client: AsyncElasticsearch, index_name: str,
+                              delay: float = ES_REFRESH_COALESCE_SECONDS) -> asyncio.Future:
+    """
+    Hẹn một lần refresh cho index sau `delay` giây. Các lần ghi trong khoảng chờ dùng chung
+    lần refresh này, nên một loạt thao tác chỉ tạo ra một segment refresh.
+    """
+    future = _pending_refreshes.get(index_name)
+    if future is not None and not future.done():
+        return future
+    future = asyncio.get_running_loop().create_future()
+    _pending_refreshes[index_name] = future
+    task = asyncio.create_task(_run_refresh(es_client, index_name, future, delay))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return future
+
+async def apply_refresh_policy(es_client: AsyncElasticsearch, index_name: str, policy: str,
+                               handled_by_request: bool = False):
+    """
+    Thực hiện chính sách refresh sau một thao tác ghi. `handled_by_request=True` khi request ghi
+    đã tự mang tham số refresh="wait_for" (index/delete/bulk).
+    """
+    if policy == "coalesced":
+        request_coalesced_refresh(es_client, index_name)
+    elif policy == "wait_for" and not handled_by_request:
+        # delete_by_query và streaming bulk không hỗ trợ wait_for: chờ lần refresh gộp kế tiếp.
+        await request_coalesced_refresh(es_client, index_name, delay=0)
+
+class BufferedWriteResponse:
+    """Kết quả của một bản ghi được ghi qua bộ đệm, có `.body` giống response của client ES."""
+
+    def __init__(self, body: dict):
+        self.body = body
+
+class BulkWriteBuffer:
+    """
+    Gộp các thao tác ghi từng bản ghi (thêm/sửa/xóa một dòng) đến gần nhau thành một request
+    bulk. Mỗi lời gọi vẫn nhận về kết quả của riêng bản ghi của mình.
+    """
+
+    def __init__(self, es_client: AsyncElasticsearch, max_docs: int = ES_WRITE_BUFFER_MAX_DOCS,
+                 flush_interval: float = ES_WRITE_BUFFER_FLUSH_SECONDS):
+        self.es_client = es_client
+        self.max_docs = max_docs
+        self.flush_interval = flush_interval
+        self._items: List[Tuple[dict, Optional[dict], asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def submit(self, action: dict, source: Optional[dict] = None) -> BufferedWriteResponse:
+        """
+        Thêm một thao tác bulk (`{"index": {...}}` kèm `source`, hoặc `{"delete": {...}}`) vào bộ đệm
+        và chờ tới khi lô chứa nó được ghi. Trả về kết quả của bản ghi trong response bulk.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._items.append((action, source, future))
+        if len(self._items) >= self.max_docs:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Ghi toàn bộ thao tác đang chờ trong một request bulk."""
+        items, self._items = self._items, []
+        if not items:
+            return
+        operations = []
+        for action, source, _ in items:
+            operations.append(action)
+            if source is not None:
+                operations.append(source)
+        try:
+            response = await self.es_client.bulk(operations=operations)
+        except Exception as e:
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(IOError(f"Lỗi khi ghi bulk: {e}"))
+            return
+        for (_, _, future), item in zip(items, response["items"]):
+            (op_type, result), = item.items()
+            if future.done():
+                continue
+            if "error" in result:
+                future.set_exception(IOError(f"Lỗi khi ghi bản ghi '{result.get('_id')}': {result['error']}"))
+            elif op_type == "delete" and result.get("result") == "not_found":
+                future.set_exception(IOError(f"Không tìm thấy bản ghi '{result.get('_id')}'."))
+            else:
+                future.set_result(BufferedWriteResponse(result))
+
+def get_write_buffer(es_client: AsyncElasticsearch) -> BulkWriteBuffer:
+    """Bộ đệm ghi dùng chung cho một Elasticsearch client."""
+    buffer = _write_buffers.get(id(es_client))
+    if buffer is None or buffer.es_client is not es_client:
+        buffer = BulkWriteBuffer(es_client)
+        _write_buffers[id(es_client)] = buffer
+    return buffer
+
+async def flush_write_buffers():
+    """Ghi nốt các thao tác còn trong bộ đệm và chờ các lần refresh đang hẹn (gọi khi tắt ứng dụng)."""
+    for buffer in list(_write_buffers.values()):
+        await buffer.flush()
+    pending = [future for future in _pending_refreshes.values() if not future.done()]
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
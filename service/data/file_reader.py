@@ -0,0 +1,96 @@
+import io
+import os
+from typing import BinaryIO, Iterator, List, Union
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from config.settings import INGEST_BATCH_ROWS
+
+SUPPORTED_EXTENSIONS = (".xlsx", ".xlsm", ".xls", ".csv", ".parquet")
+
+def _as_file(file_content: Union[bytes, BinaryIO]) -> BinaryIO:
+    if isinstance(file_content, (bytes, bytearray)):
+        return io.BytesIO(file_content)
+    file_content.seek(0)
+    return file_content
+
+def _check_columns(header: List[str], columns_config: dict):
+    missing_cols = [col for col in columns_config.get('names', []) if col not in header]
+    if missing_cols:
+        raise ValueError(f"Các cột sau không tìm thấy trong file: {', '.join(missing_cols)}")
+
+def _iter_xlsx(file: BinaryIO, columns_config: dict, batch_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Đọc sheet đầu tiên bằng openpyxl ở chế độ read-only: từng dòng được parse khi cần,
+    không giữ cả workbook trong bộ nhớ.
+    """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header_row = next(rows, None)
+        if header_row is None:
+            raise ValueError("File Excel không có dữ liệu.")
+        header = [str(col).strip() if col is not None else f"__col_{i}" for i, col in enumerate(header_row)]
+        _check_columns(header, columns_config)
+        wanted = [header.index(col) for col in columns_config.get('names', [])]
+
+        batch = []
+        for row in rows:
+            if not any(value is not None for value in row):
+                continue
+            batch.append([row[i] if i < len(row) else None for i in wanted])
+            if len(batch) >= batch_rows:
+                yield pd.DataFrame(batch, columns=columns_config['names'], dtype=object)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns_config['names'], dtype=object)
+    finally:
+        workbook.close()
+
+def _iter_csv(file: BinaryIO, columns_config: dict, batch_rows: int) -> Iterator[pd.DataFrame]:
+    header = pd.read_csv(file, nrows=0, encoding="utf-8-sig").columns.str.strip().tolist()
+    _check_columns(header, columns_config)
+    file.seek(0)
+    reader = pd.read_csv(file, chunksize=batch_rows, dtype=str, encoding="utf-8-sig", skipinitialspace=True)
+    for chunk in reader:
+        chunk.columns = chunk.columns.str.strip()
+        yield chunk[columns_config['names']]
+
+def _iter_parquet(file: BinaryIO, columns_config: dict, batch_rows: int) -> Iterator[pd.DataFrame]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Cần cài đặt thư viện 'pyarrow' để đọc file Parquet.")
+    parquet_file = pq.ParquetFile(file)
+    _check_columns(parquet_file.schema_arrow.names, columns_config)
+    for record_batch in parquet_file.iter_batches(batch_size=batch_rows, columns=columns_config['names']):
+        yield record_batch.to_pandas()
+
+def iter_dataframes(
+    file_content: Union[bytes, BinaryIO],
+    filename: str,
+    columns_config: dict,
+    batch_rows: int = INGEST_BATCH_ROWS
+) -> Iterator[pd.DataFrame]:
+    """
+    Đọc file dữ liệu (xlsx, xls, csv, parquet) thành các DataFrame tối đa `batch_rows` dòng,
+    chỉ giữ các cột trong `columns_config['names']`. Thiếu cột sẽ báo lỗi ngay ở lô đầu tiên.
+    """
+    extension = os.path.splitext(filename or "")[1].lower() or ".xlsx"
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"Định dạng file '{extension}' không được hỗ trợ. Hỗ trợ: {', '.join(SUPPORTED_EXTENSIONS)}.")
+
+    file = _as_file(file_content)
+    if extension in (".xlsx", ".xlsm"):
+        return _iter_xlsx(file, columns_config, batch_rows)
+    if extension == ".csv":
+        return _iter_csv(file, columns_config, batch_rows)
+    if extension == ".parquet":
+        return _iter_parquet(file, columns_config, batch_rows)
+
+    # .xls (định dạng cũ) không hỗ trợ đọc từng dòng, đọc cả file rồi chia lô.
+    df = pd.read_excel(file)
+    _check_columns(df.columns.tolist(), columns_config)
+    df = df[columns_config['names']]
+    return (df.iloc[start:start + batch_rows] for start in range(0, len(df), batch_rows))
@@ -0,0 +1,104 @@
+import asyncio
+import hashlib
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import TENANT_PLACEMENT_CACHE_TTL
+from database.database import SessionLocal, TenantPlacement
+
+SHARED, MIGRATING, DEDICATED = "shared", "migrating", "dedicated"
+
+# (index_name, customer_id) -> (thời điểm hết hạn, trạng thái, index riêng)
+_placement_cache: Dict[Tuple[str, str], Tuple[float, str, Optional[str]]] = {}
+
+def dedicated_index_name(index_name: str, customer_id: str) -> str:
+    """Tên index riêng của khách hàng: chữ thường, hợp lệ với ES và không trùng giữa các customer_id."""
+    slug = re.sub(r"[^a-z0-9_]", "", customer_id.lower())[:40]
+    digest = hashlib.sha1(customer_id.encode("utf-8")).hexdigest()[:8]
+    return f"{index_name}-t-{slug}-{digest}"
+
+def get_placement(index_name: str, customer_id: str, use_cache: bool = True) -> Tuple[str, Optional[str]]:
+    """Trả về (trạng thái, index riêng) của khách hàng trong index logic; mặc định là index chia sẻ."""
+    key = (index_name, customer_id)
+    now = time.monotonic()
+    if use_cache:
+        cached = _placement_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1], cached[2]
+
+    db = SessionLocal()
+    try:
+        row = db.query(TenantPlacement).filter(
+            TenantPlacement.index_name == index_name,
+            TenantPlacement.customer_id == customer_id
+        ).first()
+        placement = (row.status, row.dedicated_index) if row else (SHARED, None)
+    finally:
+        db.close()
+
+    _placement_cache[key] = (now + TENANT_PLACEMENT_CACHE_TTL, placement[0], placement[1])
+    return placement
+
+async def get_placement_async(index_name: str, customer_id: str, use_cache: bool = True) -> Tuple[str, Optional[str]]:
+    """Như `get_placement` nhưng truy vấn database chạy ngoài event loop."""
+    if use_cache:
+        cached = _placement_cache.get((index_name, customer_id))
+        if cached and cached[0] > time.monotonic():
+            return cached[1], cached[2]
+    return await asyncio.to_thread(get_placement, index_name, customer_id, False)
+
+def set_placement(index_name: str, customer_id: str, status: str, dedicated_index: Optional[str] = None):
+    """Cập nhật vị trí index của khách hàng; status=SHARED xóa bản ghi (quay về index chia sẻ)."""
+    db = SessionLocal()
+    try:
+        row = db.query(TenantPlacement).filter(
+            TenantPlacement.index_name == index_name,
+            TenantPlacement.customer_id == customer_id
+        ).first()
+        if status == SHARED:
+            if row:
+                db.delete(row)
+        elif row:
+            row.status = status
+            row.dedicated_index = dedicated_index or row.dedicated_index
+        else:
+            db.add(TenantPlacement(index_name=index_name, customer_id=customer_id,
+                                   status=status, dedicated_index=dedicated_index))
+        db.commit()
+    finally:
+        db.close()
+    _placement_cache.pop((index_name, customer_id), None)
+
+def list_placements(index_name: Optional[str] = None) -> List[TenantPlacement]:
+    db = SessionLocal()
+    try:
+        query = db.query(TenantPlacement)
+        if index_name:
+            query = query.filter(TenantPlacement.index_name == index_name)
+        return query.all()
+    finally:
+        db.close()
+
+async def resolve_search_target(index_name: str, customer_id: str) -> Tuple[str, Optional[str]]:
+    """
+    Index và routing dùng để đọc dữ liệu của khách hàng: index riêng (không routing) nếu đã chuyển xong,
+    ngược lại là index chia sẻ với routing=customer_id.
+    """
+    status, dedicated_index = await get_placement_async(index_name, customer_id)
+    if status == DEDICATED:
+        return dedicated_index, None
+    return index_name, customer_id
+
+async def resolve_write_targets(index_name: str, customer_id: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    Các (index, routing) cần ghi. Trong lúc chuyển sang index riêng, dữ liệu được ghi vào cả hai;
+    phần tử đầu tiên luôn là nơi đang phục vụ đọc. Luôn đọc trạng thái mới nhất (không dùng cache)
+    để không bỏ sót index riêng vừa bắt đầu chuyển.
+    """
+    status, dedicated_index = await get_placement_async(index_name, customer_id, use_cache=False)
+    if status == DEDICATED:
+        return [(dedicated_index, None)]
+    if status == MIGRATING:
+        return [(index_name, customer_id), (dedicated_index, None)]
+    return [(index_name, customer_id)]
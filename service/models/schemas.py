@@ -194,6 +194,21 @@ class ChatHistoryResponse(BaseModel):
     role: str
     message: str
 
+class ChatMessageItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    role: str
+    message: str
+
+class CompactChatHistoryResponse(BaseModel):
+    """Lịch sử chat của một thread: thông tin thread trả về một lần, kèm danh sách tin nhắn."""
+    customer_id: str
+    thread_id: str
+    thread_name: Optional[str] = None
+    status: Optional[str] = None
+    messages: List[ChatMessageItem]
+
 class ChatbotSettingsBase(BaseModel):
     chatbot_icon_url: Optional[str] = None
     chatbot_message_default: Optional[str] = None
@@ -0,0 +1,102 @@
+import asyncio
+import contextlib
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from elasticsearch import AsyncElasticsearch
+
+from config.settings import ES_MSEARCH_WINDOW_SECONDS, ES_MSEARCH_MAX_SEARCHES
+
+_MSEARCH_BODY_KEYS = {"from_": "from", "source": "_source"}
+
+_current_batcher: ContextVar[Optional["SearchBatcher"]] = ContextVar("search_batcher", default=None)
+
+class SearchBatcher:
+    """
+    Gom các truy vấn ES phát ra gần như cùng lúc trong một request (ví dụ nhiều tool tìm kiếm được
+    agent gọi song song trong một bước) thành một request `_msearch`, rồi trả kết quả về cho từng lời gọi.
+    Đồng thời giữ bộ nhớ tạm theo request cho các giá trị tra cứu lặp lại (ví dụ trạng thái khách buôn).
+    """
+
+    def __init__(self, es_client: AsyncElasticsearch, window: float = ES_MSEARCH_WINDOW_SECONDS,
+                 max_searches: int = ES_MSEARCH_MAX_SEARCHES):
+        self.es_client = es_client
+        self.window = window
+        self.max_searches = max_searches
+        self.memo: Dict[Any, Any] = {}
+        self._pending: List[Tuple[dict, dict, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def search(self, index: str, routing: Optional[str] = None, **body) -> dict:
+        header = {"index": index}
+        if routing:
+            header["routing"] = routing
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((header, body, future))
+        if len(self._pending) >= self.max_searches:
+            await self._flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self._flush_task = None
+        await self._flush()
+
+    async def _flush(self):
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        if len(pending) == 1:
+            header, body, future = pending[0]
+            try:
+                future.set_result(await self.es_client.search(index=header["index"], routing=header.get("routing"), **body))
+            except Exception as e:
+                future.set_exception(e)
+            return
+
+        searches = []
+        for header, body, _ in pending:
+            # Tham số của client (`from_`, `source`) đổi sang tên trường trong body của _msearch.
+            searches.extend([header, {_MSEARCH_BODY_KEYS.get(k, k): v for k, v in body.items()}])
+        try:
+            response = await self.es_client.msearch(searches=searches)
+        except Exception as e:
+            for _, _, future in pending:
+                future.set_exception(e)
+            return
+        print(f"🔗 Gộp {len(pending)} truy vấn Elasticsearch vào một _msearch.")
+        for (_, _, future), result in zip(pending, response["responses"]):
+            if "error" in result:
+                future.set_exception(RuntimeError(f"Lỗi truy vấn Elasticsearch: {result['error']}"))
+            else:
+                future.set_result(result)
+
+    def memoize(self, key: Any, compute: Callable[[], Any]) -> Any:
+        if key not in self.memo:
+            self.memo[key] = compute()
+        return self.memo[key]
+
+@contextlib.contextmanager
+def search_batch_scope(es_client: AsyncElasticsearch):
+    """Mở phạm vi gom truy vấn cho một request; các tool chạy song song bên trong dùng chung batcher."""
+    token = _current_batcher.set(SearchBatcher(es_client) if es_client else None)
+    try:
+        yield
+    finally:
+        _current_batcher.reset(token)
+
+async def batched_search(es_client: AsyncElasticsearch, index: str, routing: Optional[str] = None, **body) -> dict:
+    """`es_client.search` đi qua batcher của request hiện tại (nếu có), ngược lại gọi trực tiếp."""
+    batcher = _current_batcher.get()
+    if batcher is None or batcher.es_client is not es_client:
+        return await es_client.search(index=index, routing=routing, **body)
+    return await batcher.search(index, routing, **body)
+
+def request_memo(key: Any, compute: Callable[[], Any]) -> Any:
+    """Tính `compute()` một lần cho mỗi `key` trong request hiện tại (không có phạm vi thì luôn tính lại)."""
+    batcher = _current_batcher.get()
+    if batcher is None:
+        return compute()
+    return batcher.memoize(key, compute)
@@ -2,18 +2,35 @@ from elasticsearch import AsyncElasticsearch
 from typing import Optional, List, Dict, Any
 from sqlalchemy.orm import Session
 from database.database import CustomerIsSale, SessionLocal
-from service.data.data_loader_elastic_search import PRODUCTS_INDEX, SERVICES_INDEX, ACCESSORIES_INDEX, FAQ_INDEX
+from service.data.data_loader_elastic_search import (
+    PRODUCTS_INDEX, SERVICES_INDEX, ACCESSORIES_INDEX, FAQ_INDEX, SHARED_INDEX_TYPES,
+    agent_text_field, render_agent_text
+)
+from service.data.catalog_generation import catalog_filter
+from service.data.tenant_placement import resolve_search_target
+from service.retrieve.search_batcher import batched_search, request_memo
 from service.utils.helpers import sanitize_for_es
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_google_genai.chat_models import ChatGoogleGenerativeAI
-import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from langchain_google_genai import HarmCategory, HarmBlockThreshold
+from service.agents.llm_registry import get_pooled_chat_model
+from service.agents.model_router import FAST, resolve_model_name
+
+_FILTER_SAFETY_SETTINGS = {
+    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+}
 
 def _get_customer_is_sale(customer_id: str, thread_id: str) -> bool:
-    """Kiểm tra xem thread có phải là của khách hàng mua buôn hay không."""
+    """Kiểm tra xem thread có phải là của khách hàng mua buôn hay không (tra một lần mỗi request)."""
     if not thread_id:
         return False
+    return request_memo(("is_sale", customer_id, thread_id), lambda: _load_customer_is_sale(customer_id, thread_id))
+
+def _load_customer_is_sale(customer_id: str, thread_id: str) -> bool:
     db: Session = SessionLocal()
     try:
         sale_status = db.query(CustomerIsSale).filter(
@@ -30,9 +47,10 @@ async def filter_results_with_ai(
     query: str, 
     results: List[str],
     llm,
-    chat_history: Optional[List[str]] = None
+    chat_history: Optional[List[str]] = None,
+    customer_id: Optional[str] = None
 ) -> List[str]:
-    """Lọc kết quả tìm kiếm bằng AI để chọn ra những kết quả phù hợp nhất."""
+    """Lọc kết quả tìm kiếm bằng AI để chọn ra những kết quả phù hợp nhất (model "fast" theo cấu hình của customer_id)."""
     if not results:
         return []
 
@@ -71,33 +89,24 @@ async def filter_results_with_ai(
         filtered_results_str = ""
         use_langchain_fallback = False
         
+        prompt = ChatPromptTemplate.from_template(prompt_template_str)
+        prompt_input = {"query": query, "results": results_str, "history": history_str}
+
         if isinstance(llm, ChatGoogleGenerativeAI) and llm.google_api_key:
-            print("Sử dụng Google AI SDK gốc để lọc kết quả.")
+            filter_model = resolve_model_name("google_genai", FAST, customer_id)
+            print(f"Sử dụng Gemini ({filter_model}) để lọc kết quả.")
             try:
-                genai.configure(api_key=llm.google_api_key.get_secret_value())
-                model = genai.GenerativeModel(model_name="gemini-2.0-flash")
-                full_prompt = prompt_template_str.format(history=history_str, query=query, results=results_str)
-                
-                safety_settings = {
-                    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-                }
-
-                response = await model.generate_content_async(full_prompt, safety_settings=safety_settings)
-                
-                if response.parts and response.text.strip():
-                    filtered_results_str = response.text
-                else:
-                    finish_reason = 'N/A'
-                    if response.candidates and len(response.candidates) > 0:
-                        finish_reason = response.candidates[0].finish_reason.name
-                    print(f"AI response was empty or blocked. Finish reason: {finish_reason}. Fallback to LangChain.")
+                # Model lọc dùng chung theo API key (không gọi genai.configure toàn cục cho từng request).
+                filter_llm = get_pooled_chat_model(
+                    "google_genai", filter_model, llm.google_api_key.get_secret_value(),
+                    safety_settings=_FILTER_SAFETY_SETTINGS
+                )
+                filtered_results_str = await (prompt | filter_llm | StrOutputParser()).ainvoke(prompt_input)
+                if not filtered_results_str.strip():
+                    print("AI response was empty or blocked. Fallback to LangChain.")
                     use_langchain_fallback = True
-                    
             except Exception as genai_error:
-                print(f"Google AI SDK error: {genai_error}. Fallback to LangChain.")
+                print(f"Google AI error: {genai_error}. Fallback to LangChain.")
                 use_langchain_fallback = True
         else:
             use_langchain_fallback = True
@@ -105,9 +114,8 @@ async def filter_results_with_ai(
         # Use LangChain if Google AI failed or not available
         if use_langchain_fallback:
             print("Sử dụng LangChain chain để lọc kết quả.")
-            prompt = ChatPromptTemplate.from_template(prompt_template_str)
             chain = prompt | llm | StrOutputParser()
-            filtered_results_str = await chain.ainvoke({"query": query, "results": results_str, "history": history_str})
+            filtered_results_str = await chain.ainvoke(prompt_input)
 
         if not filtered_results_str.strip():
             return []
@@ -117,90 +125,46 @@ async def filter_results_with_ai(
         print(f"Lỗi khi lọc kết quả bằng AI: {e}")
         return results
 
-def _format_results_for_agent(hits: List[Dict[str, Any]], is_sale_customer: bool = False) -> List[str]:
-    """Định dạng danh sách kết quả tìm kiếm thành chuỗi văn bản dễ đọc cho agent."""
-    formatted_results = []
-    for item in hits:
-        context = []
-        if 'model' in item: # Product
-            context.append(f"Mã sản phẩm: {item.get('ma_san_pham', '')}")
-            context.append(f"Sản phẩm: {item.get('model', '')} {item.get('dung_luong', '')} {item.get('mau_sac', '')}".strip())
-            if item.get('loai_thiet_bi'):
-                context.append(f"  Loại thiết bị: {item.get('loai_thiet_bi')}")
-            if item.get('tinh_trang_may'):
-                context.append(f"  Tình trạng máy: {item.get('tinh_trang_may')}")
-            price = item.get('gia', 0)
-            if is_sale_customer:
-                price_buon = item.get('gia_buon')
-                price_buon_str = (f"{price_buon:,.0f}đ" if price_buon and price_buon > 0 else "Liên hệ")
-                context.append(f"  Giá bán buôn: {price_buon_str}")
-            inventory = item.get('ton_kho', 0)
-            if inventory is not None:
-                context.append(f"  Tình trạng: {f'Còn hàng (còn {inventory})' if inventory > 0 else 'Hết hàng'}")
-            guarantee = item.get('bao_hanh', '')
-            if guarantee:
-                context.append(f"  Bảo hành: {guarantee}")
-            pin_status = item.get('tinh_trang_pin', '')
-            if pin_status:
-                context.append(f"  Tình trạng pin: {pin_status}")
-            note = item.get('ghi_chu', '')
-            if note:
-                context.append(f"  Ghi chú: {note}")
-            chip_ram = item.get('chip_ram', '')
-            if chip_ram:
-                context.append(f"  Chip RAM: {chip_ram}")
-            camera = item.get('camera', '')
-            if camera:
-                context.append(f"  Camera: {camera}")
-            
-        elif 'ten_dich_vu' in item: # Service
-            context.append(f"Mã dịch vụ: {item.get('ma_dich_vu', '')}")
-            context.append(f"Dịch vụ: {item.get('ten_dich_vu', '')}")
-            if item.get('ten_san_pham'):
-                context.append(f"  Áp dụng cho sản phẩm: {item.get('ten_san_pham')}")
-            if item.get('loai_dich_vu'):
-                context.append(f"  Loại dịch vụ: {item.get('loai_dich_vu')}")
-            price = item.get('gia', 0)
-            if is_sale_customer:
-                price_sale = item.get('gia_buon')
-                price_sale_str = (f"{price_sale:,.0f}đ" if price_sale and price_sale > 0 else "Liên hệ")
-                context.append(f"  Giá bán buôn: {price_sale_str}")
-            guarantee = item.get('bao_hanh', '')
-            if guarantee:
-                context.append(f"  Bảo hành: {guarantee}")
-            note = item.get('ghi_chu', '')
-            if note:
-                context.append(f"  Ghi chú: {note}")
-
-        elif 'accessory_name' in item: # Accessory
-            context.append(f"Mã phụ kiện: {item.get('accessory_code', '')}")
-            context.append(f"Phụ kiện: {item.get('accessory_name', '')}")
-            prop = item.get('properties')
-            if prop and str(prop).strip() and str(prop).strip() != '0':
-                context.append(f"  Thuộc tính: {prop}")
-            price = item.get('lifecare_price', 0)
-            if is_sale_customer:
-                price_sale = item.get('sale_price')
-                price_sale_str = (f"{price_sale:,.0f}đ" if price_sale and price_sale > 0 else "Liên hệ")
-                context.append(f"  Giá bán buôn: {price_sale_str}")
-            inventory = item.get('inventory')
-            if inventory is not None:
-                context.append(f"  Tình trạng: {f'Còn hàng (còn {inventory})' if inventory > 0 else 'Hết hàng'}")
-            # if item.get('specifications'):
-            #     context.append(f"  Mô tả: {item.get('specifications')}")
-            if item.get('guarantee'):
-                context.append(f"  Bảo hành: {item.get('guarantee')}")
-            if item.get('link_product'):
-                context.append(f"  Link sản phẩm: {item.get('link_product')}")
-            if item.get('avatar_images'):
-                context.append(f"  Link ảnh: {item.get('avatar_images')}")
-        
-        price_str = f"{price:,.0f}đ" if price > 0 else "Liên hệ"
-        price_label = "Giá bán lẻ" if is_sale_customer else "Giá"
-        context.append(f"  {price_label}: {price_str}")
-            
-        formatted_results.append("\n".join(context))
-    return formatted_results
+def _search_projection(is_sale_customer: bool) -> dict:
+    """Chỉ lấy đoạn mô tả dựng sẵn phù hợp với loại khách trong _source."""
+    return {"source": {"includes": [agent_text_field(is_sale_customer)]}}
+
+async def _format_results_for_agent(es_client: AsyncElasticsearch, index_name: str, response,
+                                    is_sale_customer: bool = False) -> List[str]:
+    """
+    Lấy đoạn mô tả đã dựng sẵn lúc nạp (bản giá lẻ hoặc bản khách buôn) của từng kết quả cho agent.
+    Bản ghi nạp trước khi có trường này (chưa chạy backfill_agent_text.py) được lấy đủ _source
+    bằng một lệnh mget và dựng mô tả tại chỗ.
+    """
+    field = agent_text_field(is_sale_customer)
+    hits = response['hits']['hits']
+    texts = [hit.get('_source', {}).get(field) for hit in hits]
+    missing = [i for i, text in enumerate(texts) if not text]
+    if missing:
+        docs = [{"_index": hits[i]['_index'], "_id": hits[i]['_id'],
+                 **({"routing": hits[i]['_routing']} if hits[i].get('_routing') else {})} for i in missing]
+        try:
+            mget_response = await es_client.mget(docs=docs)
+            for i, doc in zip(missing, mget_response['docs']):
+                if doc.get('found'):
+                    texts[i] = render_agent_text(SHARED_INDEX_TYPES.get(index_name), doc['_source'], is_sale_customer)
+        except Exception as e:
+            print(f"⚠️ Không thể lấy đầy đủ bản ghi thiếu '{field}' trong index '{index_name}': {e}")
+    return [text for text in texts if text]
+
+def _vi_match(field: str, text: str, boost: float = 1.0, operator: str = "or") -> dict:
+    """
+    Khớp trường gốc (có dấu) hoặc subfield `folded` (bỏ dấu + từ đồng nghĩa), để "man hinh"
+    vẫn tìm được "Màn hình". Index cũ chưa có subfield vẫn khớp qua trường gốc.
+    """
+    return {
+        "bool": {
+            "should": [
+                {"match": {field: {"query": text, "boost": boost, "operator": operator}}},
+                {"match": {f"{field}.folded": {"query": text, "boost": boost, "operator": operator}}}
+            ]
+        }
+    }
 
 async def search_products(
     es_client: AsyncElasticsearch,
@@ -227,7 +191,8 @@ async def search_products(
     sanitized_customer_id = sanitize_for_es(customer_id)
     query = {"bool": {"must": [], "should": [], "filter": []}}
     
-    query["bool"]["filter"].append({"term": {"customer_id": sanitized_customer_id}})
+    query["bool"]["filter"].extend(await catalog_filter(PRODUCTS_INDEX, sanitized_customer_id))
+    search_index, search_routing = await resolve_search_target(PRODUCTS_INDEX, sanitized_customer_id)
     
     if model:
         query["bool"]["must"].append({
@@ -235,15 +200,18 @@ async def search_products(
                 "should": [
                     {"term": {"model.keyword": {"value": model, "boost": 3.0}}},
                     {"match_phrase": {"model": {"query": model, "boost": 2.0}}},
-                    {"match": {"model": model}}
+                    {"match_phrase": {"model.folded": {"query": model, "boost": 1.5}}},
+                    {"match": {"model": model}},
+                    {"match": {"model.folded": model}},
+                    {"match": {"model.ngram": {"query": model, "operator": "and"}}}
                 ]
             }
         })
 
-    if mau_sac: query["bool"]["must"].append({"match": {"mau_sac": mau_sac}})
-    if loai_thiet_bi: query["bool"]["should"].append({"match": {"loai_thiet_bi": loai_thiet_bi}})
+    if mau_sac: query["bool"]["must"].append(_vi_match("mau_sac", mau_sac))
+    if loai_thiet_bi: query["bool"]["should"].append(_vi_match("loai_thiet_bi", loai_thiet_bi))
     if dung_luong: query["bool"]["must"].append({"match": {"dung_luong": dung_luong}})
-    if tinh_trang_may: query["bool"]["should"].append({"match": {"tinh_trang_may": tinh_trang_may}})
+    if tinh_trang_may: query["bool"]["should"].append(_vi_match("tinh_trang_may", tinh_trang_may))
     
     price_range = {}
     if min_gia is not None: price_range["gte"] = min_gia
@@ -251,19 +219,20 @@ async def search_products(
     if price_range: query["bool"]["filter"].append({"range": {"gia": price_range}})
 
     try:
-        response = await es_client.search(
-            index=PRODUCTS_INDEX,
+        is_sale = _get_customer_is_sale(customer_id, thread_id)
+        response = await batched_search(
+            es_client,
+            index=search_index,
             query=query,
-            routing=sanitized_customer_id,
+            routing=search_routing,
             size=10,
-            from_=offset
+            from_=offset,
+            **_search_projection(is_sale)
         )
-        hits = [hit['_source'] for hit in response['hits']['hits']]
-        print(f"Tìm thấy {len(hits)} sản phẩm phù hợp cho khách hàng '{customer_id}'.")
-        is_sale = _get_customer_is_sale(customer_id, thread_id)
-        formatted_hits = _format_results_for_agent(hits, is_sale)
+        formatted_hits = await _format_results_for_agent(es_client, PRODUCTS_INDEX, response, is_sale)
+        print(f"Tìm thấy {len(formatted_hits)} sản phẩm phù hợp cho khách hàng '{customer_id}'.")
         if original_query and llm:
-            return await filter_results_with_ai(original_query, formatted_hits, llm, chat_history)
+            return await filter_results_with_ai(original_query, formatted_hits, llm, chat_history, customer_id)
         return formatted_hits
     except Exception as e:
         print(f"Lỗi khi tìm kiếm sản phẩm: {e}")
@@ -291,16 +260,19 @@ async def search_services(
 
     sanitized_customer_id = sanitize_for_es(customer_id)
     query = {"bool": {"must": [], "should": [], "filter": []}}
-    query["bool"]["filter"].append({"term": {"customer_id": sanitized_customer_id}})
+    query["bool"]["filter"].extend(await catalog_filter(SERVICES_INDEX, sanitized_customer_id))
+    search_index, search_routing = await resolve_search_target(SERVICES_INDEX, sanitized_customer_id)
 
     if ten_dich_vu:
-        query["bool"]["must"].append({"match": {"ten_dich_vu": {"query": ten_dich_vu}}})
+        query["bool"]["must"].append(_vi_match("ten_dich_vu", ten_dich_vu))
         query["bool"]["should"].append({"match_phrase": {"ten_dich_vu": {"query": ten_dich_vu, "boost": 10.0}}})
     
-    if ten_san_pham: query["bool"]["should"].append({"match_phrase": {"ten_san_pham": {"query": ten_san_pham, "boost": 10.0}}})
+    if ten_san_pham:
+        query["bool"]["should"].append({"match_phrase": {"ten_san_pham": {"query": ten_san_pham, "boost": 10.0}}})
+        query["bool"]["should"].append({"match_phrase": {"ten_san_pham.folded": {"query": ten_san_pham, "boost": 8.0}}})
 
     if loai_dich_vu:
-        query["bool"]["should"].append({"match": {"loai_dich_vu": {"query": loai_dich_vu, "boost": 5.0}}})
+        query["bool"]["should"].append(_vi_match("loai_dich_vu", loai_dich_vu, boost=5.0))
 
     price_range = {}
     if min_gia is not None: price_range["gte"] = min_gia
@@ -308,20 +280,21 @@ async def search_services(
     if price_range: query["bool"]["filter"].append({"range": {"gia": price_range}})
 
     try:
-        response = await es_client.search(
-            index=SERVICES_INDEX,
+        is_sale = _get_customer_is_sale(customer_id, thread_id)
+        response = await batched_search(
+            es_client,
+            index=search_index,
             query=query,
-            routing=sanitized_customer_id,
+            routing=search_routing,
             size=10,
-            from_=offset
+            from_=offset,
+            **_search_projection(is_sale)
         )
-        hits = [hit['_source'] for hit in response['hits']['hits']]
-        if hits:
-            print(f"Tìm thấy {len(hits)} dịch vụ phù hợp cho khách hàng '{customer_id}'.")
-            is_sale = _get_customer_is_sale(customer_id, thread_id)
-            formatted_hits = _format_results_for_agent(hits, is_sale)
+        formatted_hits = await _format_results_for_agent(es_client, SERVICES_INDEX, response, is_sale)
+        if formatted_hits:
+            print(f"Tìm thấy {len(formatted_hits)} dịch vụ phù hợp cho khách hàng '{customer_id}'.")
             if original_query and llm:
-                return await filter_results_with_ai(original_query, formatted_hits, llm, chat_history)
+                return await filter_results_with_ai(original_query, formatted_hits, llm, chat_history, customer_id)
             return formatted_hits
 
         search_terms: List[str] = []
@@ -340,24 +313,22 @@ async def search_services(
                             "fuzziness": "AUTO"
                         }
                     },
-                    "filter": [
-                        {"term": {"customer_id": sanitized_customer_id}}
-                    ]
+                    "filter": await catalog_filter(SERVICES_INDEX, sanitized_customer_id)
                 }
             }
-            response = await es_client.search(
-                index=SERVICES_INDEX,
+            response = await batched_search(
+                es_client,
+                index=search_index,
                 query=fallback_query,
-                routing=sanitized_customer_id,
+                routing=search_routing,
                 size=10,
-                from_=offset
+                from_=offset,
+                **_search_projection(is_sale)
             )
-            hits = [hit['_source'] for hit in response['hits']['hits']]
-            print(f"Fallback multi_match: tìm thấy {len(hits)} dịch vụ phù hợp.")
-            is_sale = _get_customer_is_sale(customer_id, thread_id)
-            formatted_hits = _format_results_for_agent(hits, is_sale)
+            formatted_hits = await _format_results_for_agent(es_client, SERVICES_INDEX, response, is_sale)
+            print(f"Fallback multi_match: tìm thấy {len(formatted_hits)} dịch vụ phù hợp.")
             if original_query and llm:
-                return await filter_results_with_ai(original_query, formatted_hits, llm, chat_history)
+                return await filter_results_with_ai(original_query, formatted_hits, llm, chat_history, customer_id)
             return formatted_hits
 
         return []
@@ -387,23 +358,32 @@ async def search_accessories(
 
     sanitized_customer_id = sanitize_for_es(customer_id)
     query = {"bool": {"must": [], "should": [], "filter": []}}
-    query["bool"]["filter"].append({"term": {"customer_id": sanitized_customer_id}})
+    query["bool"]["filter"].extend(await catalog_filter(ACCESSORIES_INDEX, sanitized_customer_id))
+    search_index, search_routing = await resolve_search_target(ACCESSORIES_INDEX, sanitized_customer_id)
 
     if ten_phu_kien:
-        query["bool"]["must"].append({"match": {"accessory_name": {"query": ten_phu_kien}}})
+        query["bool"]["must"].append({
+            "bool": {
+                "should": [
+                    {"match": {"accessory_name": {"query": ten_phu_kien}}},
+                    {"match": {"accessory_name.folded": {"query": ten_phu_kien}}},
+                    {"match": {"accessory_name.ngram": {"query": ten_phu_kien, "operator": "and"}}}
+                ]
+            }
+        })
         query["bool"]["should"].append({"match_phrase": {"accessory_name": {"query": ten_phu_kien, "boost": 10.0}}})
 
     if phan_loai_phu_kien:
         query["bool"]["should"].append({
             "bool": {
                 "should": [
-                    {"match": {"category": {"query": phan_loai_phu_kien, "boost": 5.0}}}
+                    _vi_match("category", phan_loai_phu_kien, boost=5.0)
                 ]
             }
         })
     
     if thuoc_tinh_phu_kien:
-        query["bool"]["should"].append({"match": {"properties": {"query": thuoc_tinh_phu_kien, "operator": "and"}}})
+        query["bool"]["should"].append(_vi_match("properties", thuoc_tinh_phu_kien, operator="and"))
 
     price_range = {}
     if min_gia is not None: price_range["gte"] = min_gia
@@ -411,19 +391,20 @@ async def search_accessories(
     if price_range: query["bool"]["filter"].append({"range": {"lifecare_price": price_range}})
 
     try:
-        response = await es_client.search(
-            index=ACCESSORIES_INDEX,
+        is_sale = _get_customer_is_sale(customer_id, thread_id)
+        response = await batched_search(
+            es_client,
+            index=search_index,
             query=query,
-            routing=sanitized_customer_id,
+            routing=search_routing,
             size=10,
-            from_=offset
+            from_=offset,
+            **_search_projection(is_sale)
         )
-        hits = [hit['_source'] for hit in response['hits']['hits']]
-        print(f"Tìm thấy {len(hits)} phụ kiện phù hợp cho khách hàng '{customer_id}'.")
-        is_sale = _get_customer_is_sale(customer_id, thread_id)
-        formatted_hits = _format_results_for_agent(hits, is_sale)
+        formatted_hits = await _format_results_for_agent(es_client, ACCESSORIES_INDEX, response, is_sale)
+        print(f"Tìm thấy {len(formatted_hits)} phụ kiện phù hợp cho khách hàng '{customer_id}'.")
         if original_query and llm:
-            return await filter_results_with_ai(original_query, formatted_hits, llm, chat_history)
+            return await filter_results_with_ai(original_query, formatted_hits, llm, chat_history, customer_id)
         return formatted_hits
 
     except Exception as e:
@@ -442,20 +423,23 @@ async def search_faqs(
         return []
 
     sanitized_customer_id = sanitize_for_es(customer_id)
+    search_index, search_routing = await resolve_search_target(FAQ_INDEX, sanitized_customer_id)
 
     try:
-        response = await es_client.search(
-            index=FAQ_INDEX,
+        response = await batched_search(
+            es_client,
+            index=search_index,
             query={
                 "bool": {
                     "must": [
-                        {"term": {"customer_id": sanitized_customer_id}},
-                        {"match": {"question": query}}
-                    ]
+                        _vi_match("question", query)
+                    ],
+                    "filter": await catalog_filter(FAQ_INDEX, sanitized_customer_id)
                 }
             },
-            routing=sanitized_customer_id,
-            size=1
+            routing=search_routing,
+            size=1,
+            source={"includes": ["question", "answer", "image"]}
         )
         return [hit['_source'] for hit in response['hits']['hits']]
     except Exception as e:
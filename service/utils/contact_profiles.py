@@ -0,0 +1,65 @@
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from config.settings import CONTACT_PROFILE_CACHE_TTL
+from database.database import SessionLocal, CustomerContactProfile
+
+# (customer_id, thread_id) -> (thời điểm hết hạn, thông tin liên hệ)
+_profile_cache: Dict[Tuple[str, str], Tuple[float, dict]] = {}
+
+def _profile_dict(ten_khach_hang: str, so_dien_thoai: str, dia_chi: str) -> dict:
+    return {"ten_khach_hang": ten_khach_hang, "so_dien_thoai": so_dien_thoai, "dia_chi": dia_chi}
+
+def get_contact_profile(customer_id: str, thread_id: str) -> Optional[dict]:
+    """Thông tin liên hệ (tên, SĐT, địa chỉ) từ đơn hàng gần nhất của thread; đọc theo khóa chính, có cache."""
+    key = (customer_id, thread_id)
+    now = time.monotonic()
+    cached = _profile_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    db = SessionLocal()
+    try:
+        row = db.get(CustomerContactProfile, {"customer_id": customer_id, "thread_id": thread_id})
+        profile = _profile_dict(row.ten_khach_hang, row.so_dien_thoai, row.dia_chi) if row else None
+    finally:
+        db.close()
+
+    # Chỉ cache khi đã có thông tin: thread chưa có đơn thì luôn đọc lại, để worker khác thấy ngay
+    # đơn vừa được tạo.
+    if profile is not None:
+        _profile_cache[key] = (now + CONTACT_PROFILE_CACHE_TTL, profile)
+    return profile
+
+def upsert_contact_profile(db: Session, customer_id: str, thread_id: str, ten_khach_hang: str,
+                           so_dien_thoai: str, dia_chi: str, order_id: str):
+    """
+    Ghi thông tin liên hệ của thread trong cùng session với đơn hàng (commit cùng nhau), bằng một câu
+    INSERT ... ON CONFLICT DO UPDATE: hai tool tạo đơn chạy song song trên thread mới không làm lỗi nhau.
+    """
+    values = {
+        "customer_id": customer_id,
+        "thread_id": thread_id,
+        "ten_khach_hang": ten_khach_hang,
+        "so_dien_thoai": so_dien_thoai,
+        "dia_chi": dia_chi,
+        "last_order_id": order_id,
+        "updated_at": datetime.now(timezone.utc),
+    }
+    dialect_insert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else postgresql_insert
+    statement = dialect_insert(CustomerContactProfile).values(**values)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[CustomerContactProfile.customer_id, CustomerContactProfile.thread_id],
+        set_={key: getattr(statement.excluded, key) for key in values if key not in ("customer_id", "thread_id")}
+    ))
+
+def remember_contact_profile(customer_id: str, thread_id: str, ten_khach_hang: str, so_dien_thoai: str, dia_chi: str):
+    """Cập nhật cache sau khi đơn hàng (và thông tin liên hệ) đã được commit."""
+    _profile_cache[(customer_id, thread_id)] = (
+        time.monotonic() + CONTACT_PROFILE_CACHE_TTL, _profile_dict(ten_khach_hang, so_dien_thoai, dia_chi)
+    )
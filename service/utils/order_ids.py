@@ -0,0 +1,47 @@
+import contextlib
+import hashlib
+import os
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+# Bảng chữ Crockford base32 (không có I, L, O, U) dùng cho ULID
+_ULID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+_current_turn_id: ContextVar[Optional[str]] = ContextVar("order_turn_id", default=None)
+
+def _ulid() -> str:
+    """ULID 26 ký tự: 48 bit thời gian (ms) + 80 bit ngẫu nhiên, sắp xếp được theo thời gian tạo."""
+    value = (int(time.time() * 1000) << 80) | int.from_bytes(os.urandom(10), "big")
+    chars = []
+    for _ in range(26):
+        value, index = divmod(value, 32)
+        chars.append(_ULID_ALPHABET[index])
+    return "".join(reversed(chars))
+
+def new_order_id(prefix: str, so_dien_thoai: str, item_code: str) -> str:
+    """
+    Mã đơn hàng dạng `{prefix}_{4 số cuối SĐT}_{mã hàng}_{ULID}`: giữ phần dễ đọc như trước,
+    phần ULID đảm bảo không trùng kể cả khi hai đơn giống nhau được tạo cùng một giây.
+    """
+    return f"{prefix}_{so_dien_thoai[-4:]}_{item_code.split('-')[-1]}_{_ulid()}"
+
+@contextlib.contextmanager
+def order_turn_scope():
+    """Phạm vi một lượt chat: các lần gọi tool tạo đơn trong lượt dùng chung một turn id."""
+    token = _current_turn_id.set(uuid.uuid4().hex)
+    try:
+        yield
+    finally:
+        _current_turn_id.reset(token)
+
+def order_idempotency_key(thread_id: str, item_code: str) -> Optional[str]:
+    """
+    Khóa idempotency của lần tạo đơn, tính từ (thread_id, mã hàng, turn id): agent gọi lại cùng tool
+    trong cùng lượt sẽ nhận lại đơn đã tạo. Ngoài lượt chat (không có turn id) thì không áp dụng.
+    """
+    turn_id = _current_turn_id.get()
+    if turn_id is None:
+        return None
+    return hashlib.sha1(f"{thread_id}|{item_code}|{turn_id}".encode("utf-8")).hexdigest()
@@ -0,0 +1,68 @@
+import time
+from typing import Dict, Tuple
+
+from config.settings import STORE_INFO_CACHE_TTL
+from database.database import SessionLocal, StoreInfo
+
+# customer_id -> (thời điểm hết hạn, kết quả đã render cho get_store_info_tool)
+_store_info_cache: Dict[str, Tuple[float, dict]] = {}
+
+# (cột, khóa trong store_info, nhãn hiển thị) theo thứ tự hiển thị
+_STORE_FIELDS = [
+    ("store_name", "ten_cua_hang", "🏪 **Tên cửa hàng**"),
+    ("store_address", "dia_chi", "📍 **Địa chỉ**"),
+    ("store_phone", "so_dien_thoai", "📞 **Số điện thoại**"),
+    ("store_email", "email", "📧 **Email**"),
+    ("store_website", "website", "🌐 **Website**"),
+    ("store_facebook", "facebook", "📘 **Facebook**"),
+    ("store_address_map", "ban_do", "🗺️ **Bản đồ**"),
+    ("store_image", "hinh_anh", "🖼️ **Hình ảnh cửa hàng**"),
+]
+
+def render_store_info(store_info) -> dict:
+    """Kết quả của get_store_info_tool: thông tin cửa hàng dạng Markdown kèm dữ liệu có cấu trúc."""
+    if not store_info:
+        return {
+            "status": "no_info",
+            "message": "Chưa có thông tin cửa hàng được cấu hình. Vui lòng liên hệ quản trị viên để cập nhật thông tin."
+        }
+
+    store_data = {}
+    info_parts = []
+    for column, key, label in _STORE_FIELDS:
+        value = getattr(store_info, column)
+        if value:
+            store_data[key] = value
+            info_parts.append(f"{label}: {value}")
+
+    if not info_parts:
+        return {
+            "status": "empty_info",
+            "message": "Thông tin cửa hàng chưa được cập nhật đầy đủ. Vui lòng liên hệ quản trị viên."
+        }
+
+    return {
+        "status": "success",
+        "message": "**THÔNG TIN CỬA HÀNG**\n\n" + "\n\n".join(info_parts),
+        "store_info": store_data
+    }
+
+def get_store_info_result(customer_id: str) -> dict:
+    """Thông tin cửa hàng đã render của khách hàng, cache theo tenant."""
+    now = time.monotonic()
+    cached = _store_info_cache.get(customer_id)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    db = SessionLocal()
+    try:
+        result = render_store_info(db.query(StoreInfo).filter(StoreInfo.customer_id == customer_id).first())
+    finally:
+        db.close()
+
+    _store_info_cache[customer_id] = (now + STORE_INFO_CACHE_TTL, result)
+    return result
+
+def invalidate_store_info(customer_id: str):
+    """Xóa cache khi thông tin cửa hàng thay đổi."""
+    _store_info_cache.pop(customer_id, None)
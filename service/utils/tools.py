@@ -1,7 +1,6 @@
 from langchain_core.tools import tool
 import json
 import re
-import requests
 from typing import List, Optional, Dict, Any
 from functools import partial
 from langchain.tools import StructuredTool
@@ -12,6 +11,12 @@ from sqlalchemy.orm import Session
 from datetime import datetime
 from elasticsearch import AsyncElasticsearch
 from service.retrieve.retrieve_vector_service import retrieve_documents
+from service.agents.tool_output_budget import compact_tool_output
+from service.utils.zalo_outbox import add_order_notifications, wake_zalo_dispatcher
+from service.utils.order_ids import new_order_id, order_idempotency_key
+from service.utils.store_info_cache import get_store_info_result
+from service.utils.contact_profiles import get_contact_profile, upsert_contact_profile, remember_contact_profile
+from sqlalchemy.exc import IntegrityError
 from service.models.schemas import (
     SearchProductInput, SearchServiceInput, SearchAccessoryInput,
     RetrieveDocumentInput, 
@@ -21,7 +26,7 @@ from service.models.schemas import (
 )
 from pydantic import BaseModel, Field
 from langchain_core.language_models.base import BaseLanguageModel
-from database.database import get_db, ProductOrder, ServiceOrder, AccessoryOrder, StoreInfo
+from database.database import get_db, ProductOrder, ServiceOrder, AccessoryOrder
 
 # Schema for checking existing customer info
 class CheckCustomerInfoInput(BaseModel):
@@ -33,91 +38,32 @@ class GetStoreInfoInput(BaseModel):
     """Schema for getting store information"""
     pass  # No input needed as customer_id is bound
 
-def validate_thread_id(thread_id: str) -> bool:
-    """
-    Validate thread_id: must be all digits and at least 9 characters long
-    """
-    return thread_id.isdigit() and len(thread_id) >= 9
+def _existing_order(db: Session, model, idempotency_key: Optional[str]):
+    if not idempotency_key:
+        return None
+    return db.query(model).filter(model.idempotency_key == idempotency_key).first()
 
-def call_zalo_api(customer_id: str, thread_id: str, customer_name: str, phone: str, address: str, product_name: str, order_message: str) -> dict:
-    """
-    Call Zalo API to create group with order information
-    """
-    try:
-        url = "https://zaloapi.doiquanai.vn/api/groups/managers"
-        
-        # Create name with customer info and product
-        group_name = f"{customer_name} {phone} {address} {product_name}"
-        message = order_message
-        payload = {
-            "session_key": customer_id,
-            "thread_id": thread_id,
-            "name": group_name,
-            "message": message
-        }
-        
-        response = requests.post(url, json=payload, timeout=10)
-        
-        if response.status_code == 200:
-            return {
-                "status": "success",
-                "message": "Đã tạo nhóm Zalo thành công",
-                "data": response.json()
-            }
-        else:
-            return {
-                "status": "error",
-                "message": f"Lỗi API Zalo: {response.status_code} - {response.text}"
-            }
-            
-    except requests.exceptions.Timeout:
-        return {
-            "status": "error",
-            "message": "Timeout khi gọi API Zalo"
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "message": f"Lỗi khi gọi API Zalo: {str(e)}"
-        }
-
-def send_order_notification(customer_id: str, thread_id: str, message: str) -> dict:
+def _commit_new_order(db: Session, model, idempotency_key: Optional[str]):
     """
-    Send order notification to group using the send-message API
+    Commit đơn hàng mới. Nếu một lần gọi trùng (cùng idempotency_key) đã tạo đơn trước đó
+    thì bỏ đơn này và trả về đơn đã có.
     """
     try:
-        url = "https://zaloapi.doiquanai.vn/api/groups/send-message"
-        
-        payload = {
-            "session_key": customer_id,
-            "thread_id": thread_id,
-            "message": message
-        }
-        
-        response = requests.post(url, json=payload, timeout=10)
-        
-        if response.status_code == 200:
-            return {
-                "status": "success",
-                "message": "Đã gửi thông báo đơn hàng thành công",
-                "data": response.json()
-            }
-        else:
-            return {
-                "status": "error",
-                "message": f"Lỗi API gửi thông báo: {response.status_code} - {response.text}"
-            }
-            
-    except requests.exceptions.Timeout:
-        return {
-            "status": "error",
-            "message": "Timeout khi gửi thông báo đơn hàng"
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "message": f"Lỗi khi gửi thông báo đơn hàng: {str(e)}"
-        }
+        db.commit()
+        return None
+    except IntegrityError:
+        db.rollback()
+        existing_order = _existing_order(db, model, idempotency_key)
+        if existing_order is None:
+            raise
+        return existing_order
+
+def _order_detail(order, fields) -> dict:
+    """Chi tiết đơn trả về cho agent, luôn lấy từ bản ghi đã lưu."""
+    return {
+        field: getattr(order, field)
+        for field in ("order_id", *fields, "ten_khach_hang", "so_dien_thoai", "dia_chi", "loai_don_hang")
+    }
 
 def create_check_customer_info_tool(customer_id: str, thread_id: str):
     def check_existing_customer_info():
@@ -132,48 +78,16 @@ def create_check_customer_info_tool(customer_id: str, thread_id: str):
         """
         print("--- Agent đã gọi công cụ kiểm tra thông tin khách hàng ---")
         
-        db = next(get_db())
         try:
-            # Tìm đơn hàng gần nhất của customer trong thread này
-            existing_product_order = db.query(ProductOrder).filter(
-                ProductOrder.customer_id == customer_id,
-                ProductOrder.thread_id == thread_id
-            ).order_by(ProductOrder.created_at.desc()).first()
-            
-            existing_service_order = db.query(ServiceOrder).filter(
-                ServiceOrder.customer_id == customer_id,
-                ServiceOrder.thread_id == thread_id
-            ).order_by(ServiceOrder.created_at.desc()).first()
-            
-            existing_accessory_order = db.query(AccessoryOrder).filter(
-                AccessoryOrder.customer_id == customer_id,
-                AccessoryOrder.thread_id == thread_id
-            ).order_by(AccessoryOrder.created_at.desc()).first()
-            
-            # Tìm đơn hàng gần nhất trong tất cả các loại
-            all_orders = []
-            if existing_product_order:
-                all_orders.append(existing_product_order)
-            if existing_service_order:
-                all_orders.append(existing_service_order)
-            if existing_accessory_order:
-                all_orders.append(existing_accessory_order)
+            # Thông tin liên hệ được lưu theo thread mỗi khi tạo đơn (đọc theo khóa chính, có cache).
+            existing_info = get_contact_profile(customer_id, thread_id)
             
-            if not all_orders:
+            if not existing_info:
                 return {
                     "status": "no_existing_info",
                     "message": "Không tìm thấy đơn hàng nào trong cuộc trò chuyện này. Vui lòng cung cấp đầy đủ thông tin cá nhân: tên, số điện thoại và địa chỉ."
                 }
             
-            # Lấy đơn hàng gần nhất
-            latest_order = max(all_orders, key=lambda x: x.created_at)
-            
-            existing_info = {
-                "ten_khach_hang": latest_order.ten_khach_hang,
-                "so_dien_thoai": latest_order.so_dien_thoai,
-                "dia_chi": latest_order.dia_chi
-            }
-            
             return {
                 "status": "found_existing_info",
                 "message": f"Tôi thấy anh/chị đã có thông tin từ đơn hàng trước trong cuộc trò chuyện này:\n"
@@ -189,8 +103,6 @@ def create_check_customer_info_tool(customer_id: str, thread_id: str):
                 "status": "error",
                 "message": f"Lỗi khi kiểm tra thông tin khách hàng: {str(e)}"
             }
-        finally:
-            db.close()
     
     return StructuredTool.from_function(
         func=check_existing_customer_info,
@@ -215,73 +127,13 @@ def create_get_store_info_tool(customer_id: str):
         """
         print("--- Agent đã gọi công cụ lấy thông tin cửa hàng ---")
         
-        db = next(get_db())
         try:
-            store_info = db.query(StoreInfo).filter(StoreInfo.customer_id == customer_id).first()
-            
-            if not store_info:
-                return {
-                    "status": "no_info",
-                    "message": "Chưa có thông tin cửa hàng được cấu hình. Vui lòng liên hệ quản trị viên để cập nhật thông tin."
-                }
-            
-            # Tạo thông tin cửa hàng để trả về
-            store_data = {}
-            info_parts = []
-            
-            if store_info.store_name:
-                store_data["ten_cua_hang"] = store_info.store_name
-                info_parts.append(f"🏪 **Tên cửa hàng**: {store_info.store_name}")
-            
-            if store_info.store_address:
-                store_data["dia_chi"] = store_info.store_address
-                info_parts.append(f"📍 **Địa chỉ**: {store_info.store_address}")
-            
-            if store_info.store_phone:
-                store_data["so_dien_thoai"] = store_info.store_phone
-                info_parts.append(f"📞 **Số điện thoại**: {store_info.store_phone}")
-            
-            if store_info.store_email:
-                store_data["email"] = store_info.store_email
-                info_parts.append(f"📧 **Email**: {store_info.store_email}")
-            
-            if store_info.store_website:
-                store_data["website"] = store_info.store_website
-                info_parts.append(f"🌐 **Website**: {store_info.store_website}")
-            
-            if store_info.store_facebook:
-                store_data["facebook"] = store_info.store_facebook
-                info_parts.append(f"📘 **Facebook**: {store_info.store_facebook}")
-            
-            if store_info.store_address_map:
-                store_data["ban_do"] = store_info.store_address_map
-                info_parts.append(f"🗺️ **Bản đồ**: {store_info.store_address_map}")
-            
-            if store_info.store_image:
-                store_data["hinh_anh"] = store_info.store_image
-                info_parts.append(f"🖼️ **Hình ảnh cửa hàng**: {store_info.store_image}")
-            
-            if not info_parts:
-                return {
-                    "status": "empty_info",
-                    "message": "Thông tin cửa hàng chưa được cập nhật đầy đủ. Vui lòng liên hệ quản trị viên."
-                }
-            
-            formatted_message = "**THÔNG TIN CỬA HÀNG**\n\n" + "\n\n".join(info_parts)
-            
-            return {
-                "status": "success",
-                "message": formatted_message,
-                "store_info": store_data
-            }
-            
+            return get_store_info_result(customer_id)
         except Exception as e:
             return {
                 "status": "error",
                 "message": f"Lỗi khi lấy thông tin cửa hàng: {str(e)}"
             }
-        finally:
-            db.close()
     
     return StructuredTool.from_function(
         func=get_store_info,
@@ -301,7 +153,7 @@ async def retrieve_document_logic(
     """
     print(f"\n--- Agent đã gọi công cụ truy xuất tài liệu cho tenant: {tenant_id} ---")
     results = await retrieve_documents(query=query, customer_id=tenant_id)
-    return results
+    return compact_tool_output("retrieve_document_tool", results)
 
 async def search_products_logic(
     es_client: AsyncElasticsearch,
@@ -340,7 +192,7 @@ async def search_products_logic(
         llm=llm,
         chat_history=chat_history
     )
-    return results
+    return compact_tool_output("search_products_tool", results)
 
 async def search_services_logic(
     es_client: AsyncElasticsearch,
@@ -376,7 +228,7 @@ async def search_services_logic(
         llm=llm,
         chat_history=chat_history
     )
-    return results
+    return compact_tool_output("search_services_tool", results)
 
 async def search_accessories_logic(
     es_client: AsyncElasticsearch,
@@ -411,7 +263,7 @@ async def search_accessories_logic(
         llm=llm,
         chat_history=chat_history
     )
-    return results
+    return compact_tool_output("search_accessories_tool", results)
 
 def create_order_product_tool_with_db(customer_id: str, thread_id: str):
     def create_order_product(
@@ -432,58 +284,46 @@ def create_order_product_tool_with_db(customer_id: str, thread_id: str):
         """
         print("--- LangChain Agent đã gọi công cụ tạo đơn hàng sản phẩm ---")
 
-        import time
-        timestamp = str(int(time.time()))[-6:]  # Lấy 6 chữ số cuối của timestamp
-        order_id = f"DHSP_{so_dien_thoai[-4:]}_{ma_san_pham.split('-')[-1]}_{timestamp}"
+        order_id = new_order_id("DHSP", so_dien_thoai, ma_san_pham)
+        idempotency_key = order_idempotency_key(thread_id, ma_san_pham)
         
         # Lưu vào database
         db = next(get_db())
         try:
-            new_order = ProductOrder(
-                order_id=order_id,
-                customer_id=customer_id,
-                thread_id=thread_id,
-                ma_san_pham=ma_san_pham,
-                ten_san_pham=ten_san_pham,
-                so_luong=so_luong,
-                ten_khach_hang=ten_khach_hang,
-                so_dien_thoai=so_dien_thoai,
-                dia_chi=dia_chi,
-                loai_don_hang="Sản phẩm"
-            )
-            db.add(new_order)
-            db.commit()
-            
-            order_detail = {
-                "order_id": order_id,
-                "ma_san_pham": ma_san_pham,
-                "ten_san_pham": ten_san_pham,
-                "so_luong": so_luong,
-                "ten_khach_hang": ten_khach_hang,
-                "so_dien_thoai": so_dien_thoai,
-                "dia_chi": dia_chi,
-                "loai_don_hang": "Sản phẩm"
-            }
-            
-            # Call Zalo API only if thread_id is valid
-            zalo_result = None
-            notification_result = None
-            if validate_thread_id(thread_id):
+            order = _existing_order(db, ProductOrder, idempotency_key)
+            if order:
+                # Agent gọi lại tool trong cùng lượt: trả về đơn đã tạo, không tạo đơn mới.
+                print(f"♻️ Đơn hàng {order.order_id} đã được tạo trước đó trong lượt này.")
+            else:
+                new_order = ProductOrder(
+                    order_id=order_id,
+                    customer_id=customer_id,
+                    thread_id=thread_id,
+                    ma_san_pham=ma_san_pham,
+                    ten_san_pham=ten_san_pham,
+                    so_luong=so_luong,
+                    ten_khach_hang=ten_khach_hang,
+                    so_dien_thoai=so_dien_thoai,
+                    dia_chi=dia_chi,
+                    loai_don_hang="Sản phẩm",
+                    idempotency_key=idempotency_key
+                )
+                db.add(new_order)
+                # Thông báo Zalo được ghi vào outbox cùng transaction với đơn và gửi ở nền.
                 order_message = f"Đơn hàng mới: {order_id}\nSản phẩm: {ten_san_pham}\nKhách hàng: {ten_khach_hang}\nSĐT: {so_dien_thoai}\nĐịa chỉ: {dia_chi}\nSố lượng: {so_luong}"
-                zalo_result = call_zalo_api(customer_id, thread_id, ten_khach_hang, so_dien_thoai, dia_chi, ten_san_pham, order_message)
-                
-                # Send order notification
-                notification_result = send_order_notification(customer_id, thread_id, order_message)
+                upsert_contact_profile(db, customer_id, thread_id, ten_khach_hang, so_dien_thoai, dia_chi, order_id)
+                add_order_notifications(db, customer_id, thread_id, order_id, f"{ten_khach_hang} {so_dien_thoai} {dia_chi} {ten_san_pham}", order_message)
+                order = _commit_new_order(db, ProductOrder, idempotency_key)
+                if order is None:
+                    order = new_order
+                    remember_contact_profile(customer_id, thread_id, ten_khach_hang, so_dien_thoai, dia_chi)
+                    wake_zalo_dispatcher()
             
-            success_message = f"Đã tạo đơn hàng thành công! Mã đơn hàng của bạn là {order_id}."
-            if zalo_result and zalo_result["status"] == "success":
-                success_message += " Đã tạo nhóm Zalo để theo dõi đơn hàng."
-            elif zalo_result:
-                success_message += f" Lưu ý: {zalo_result['message']}"
-            
-            if notification_result and notification_result["status"] == "success":
-                success_message += " Đã gửi thông báo đơn hàng cho nhân viên."
+            order_id = order.order_id
+            order_detail = _order_detail(order, ("ma_san_pham", "ten_san_pham", "so_luong"))
             
+            success_message = f"Đã tạo đơn hàng thành công! Mã đơn hàng của bạn là {order_id}."
+
             return {
                 "status": "success",
                 "message": success_message,
@@ -527,9 +367,8 @@ def create_order_service_tool_with_db(customer_id: str, thread_id: str):
         print("--- LangChain Agent đã gọi công cụ tạo đơn hàng dịch vụ ---")
         print(f"Debug - loai_dich_vu type: {type(loai_dich_vu)}, value: {loai_dich_vu}")
 
-        import time
-        timestamp = str(int(time.time()))[-6:]  # Lấy 6 chữ số cuối của timestamp
-        order_id = f"DHDV_{so_dien_thoai[-4:]}_{ma_dich_vu.split('-')[-1]}_{timestamp}"
+        order_id = new_order_id("DHDV", so_dien_thoai, ma_dich_vu)
+        idempotency_key = order_idempotency_key(thread_id, ma_dich_vu)
         
         # Xử lý an toàn cho loai_dich_vu
         safe_loai_dich_vu = None
@@ -539,53 +378,40 @@ def create_order_service_tool_with_db(customer_id: str, thread_id: str):
         # Lưu vào database
         db = next(get_db())
         try:
-            new_order = ServiceOrder(
-                order_id=order_id,
-                customer_id=customer_id,
-                thread_id=thread_id,
-                ma_dich_vu=ma_dich_vu,
-                ten_dich_vu=ten_dich_vu,
-                loai_dich_vu=safe_loai_dich_vu,
-                ten_san_pham_sua_chua=ten_san_pham,
-                ten_khach_hang=ten_khach_hang,
-                so_dien_thoai=so_dien_thoai,
-                dia_chi=dia_chi,
-                loai_don_hang="Dịch vụ"
-            )
-            db.add(new_order)
-            db.commit()
-            
-            order_detail = {
-                "order_id": order_id,
-                "ma_dich_vu": ma_dich_vu,
-                "ten_dich_vu": ten_dich_vu,
-                "loai_dich_vu": safe_loai_dich_vu,
-                "ten_san_pham_sua_chua": ten_san_pham,
-                "ten_khach_hang": ten_khach_hang,
-                "so_dien_thoai": so_dien_thoai,
-                "dia_chi": dia_chi,
-                "loai_don_hang": "Dịch vụ"
-            }
-
-            # Call Zalo API only if thread_id is valid
-            zalo_result = None
-            notification_result = None
-            if validate_thread_id(thread_id):
-                service_name = f"{ten_dich_vu} - {ten_san_pham}"
+            order = _existing_order(db, ServiceOrder, idempotency_key)
+            if order:
+                # Agent gọi lại tool trong cùng lượt: trả về đơn đã tạo, không tạo đơn mới.
+                print(f"♻️ Đơn hàng {order.order_id} đã được tạo trước đó trong lượt này.")
+            else:
+                new_order = ServiceOrder(
+                    order_id=order_id,
+                    customer_id=customer_id,
+                    thread_id=thread_id,
+                    ma_dich_vu=ma_dich_vu,
+                    ten_dich_vu=ten_dich_vu,
+                    loai_dich_vu=safe_loai_dich_vu,
+                    ten_san_pham_sua_chua=ten_san_pham,
+                    ten_khach_hang=ten_khach_hang,
+                    so_dien_thoai=so_dien_thoai,
+                    dia_chi=dia_chi,
+                    loai_don_hang="Dịch vụ",
+                    idempotency_key=idempotency_key
+                )
+                db.add(new_order)
+                # Thông báo Zalo được ghi vào outbox cùng transaction với đơn và gửi ở nền.
                 order_message = f"Đơn hàng mới: {order_id}\nDịch vụ: {ten_dich_vu}\nSản phẩm sửa chữa: {ten_san_pham}\nKhách hàng: {ten_khach_hang}\nSĐT: {so_dien_thoai}\nĐịa chỉ: {dia_chi}"
-                zalo_result = call_zalo_api(customer_id, thread_id, ten_khach_hang, so_dien_thoai, dia_chi, service_name, order_message)
-                
-                # Send order notification
-                notification_result = send_order_notification(customer_id, thread_id, order_message)
-            
+                upsert_contact_profile(db, customer_id, thread_id, ten_khach_hang, so_dien_thoai, dia_chi, order_id)
+                add_order_notifications(db, customer_id, thread_id, order_id, f"{ten_khach_hang} {so_dien_thoai} {dia_chi} {ten_dich_vu} - {ten_san_pham}", order_message)
+                order = _commit_new_order(db, ServiceOrder, idempotency_key)
+                if order is None:
+                    order = new_order
+                    remember_contact_profile(customer_id, thread_id, ten_khach_hang, so_dien_thoai, dia_chi)
+                    wake_zalo_dispatcher()
+            
+            order_id = order.order_id
+            order_detail = _order_detail(order, ("ma_dich_vu", "ten_dich_vu", "loai_dich_vu", "ten_san_pham_sua_chua"))
+
             success_message = f"Đã tạo đơn hàng thành công! Mã đơn hàng của bạn là {order_id}."
-            if zalo_result and zalo_result["status"] == "success":
-                success_message += " Đã tạo nhóm Zalo để theo dõi đơn hàng."
-            elif zalo_result:
-                success_message += f" Lưu ý: {zalo_result['message']}"
-            
-            if notification_result and notification_result["status"] == "success":
-                success_message += " Đã gửi thông báo đơn hàng cho nhân viên."
 
             return {
                 "status": "success",
@@ -628,58 +454,46 @@ def create_order_accessory_tool_with_db(customer_id: str, thread_id: str):
         """
         print("--- LangChain Agent đã gọi công cụ tạo đơn hàng phụ kiện ---")
 
-        import time
-        timestamp = str(int(time.time()))[-6:]  # Lấy 6 chữ số cuối của timestamp
-        order_id = f"DHPK_{so_dien_thoai[-4:]}_{ma_phu_kien.split('-')[-1]}_{timestamp}"
+        order_id = new_order_id("DHPK", so_dien_thoai, ma_phu_kien)
+        idempotency_key = order_idempotency_key(thread_id, ma_phu_kien)
         
         # Lưu vào database
         db = next(get_db())
         try:
-            new_order = AccessoryOrder(
-                order_id=order_id,
-                customer_id=customer_id,
-                thread_id=thread_id,
-                ma_phu_kien=ma_phu_kien,
-                ten_phu_kien=ten_phu_kien,
-                so_luong=so_luong,
-                ten_khach_hang=ten_khach_hang,
-                so_dien_thoai=so_dien_thoai,
-                dia_chi=dia_chi,
-                loai_don_hang="Phụ kiện"
-            )
-            db.add(new_order)
-            db.commit()
-            
-            order_detail = {
-                "order_id": order_id,
-                "ma_phu_kien": ma_phu_kien,
-                "ten_phu_kien": ten_phu_kien,
-                "so_luong": so_luong,
-                "ten_khach_hang": ten_khach_hang,
-                "so_dien_thoai": so_dien_thoai,
-                "dia_chi": dia_chi,
-                "loai_don_hang": "Phụ kiện"
-            }
-            
-            # Call Zalo API only if thread_id is valid
-            zalo_result = None
-            notification_result = None
-            if validate_thread_id(thread_id):
+            order = _existing_order(db, AccessoryOrder, idempotency_key)
+            if order:
+                # Agent gọi lại tool trong cùng lượt: trả về đơn đã tạo, không tạo đơn mới.
+                print(f"♻️ Đơn hàng {order.order_id} đã được tạo trước đó trong lượt này.")
+            else:
+                new_order = AccessoryOrder(
+                    order_id=order_id,
+                    customer_id=customer_id,
+                    thread_id=thread_id,
+                    ma_phu_kien=ma_phu_kien,
+                    ten_phu_kien=ten_phu_kien,
+                    so_luong=so_luong,
+                    ten_khach_hang=ten_khach_hang,
+                    so_dien_thoai=so_dien_thoai,
+                    dia_chi=dia_chi,
+                    loai_don_hang="Phụ kiện",
+                    idempotency_key=idempotency_key
+                )
+                db.add(new_order)
+                # Thông báo Zalo được ghi vào outbox cùng transaction với đơn và gửi ở nền.
                 order_message = f"Đơn hàng mới: {order_id}\nPhụ kiện: {ten_phu_kien}\nKhách hàng: {ten_khach_hang}\nSĐT: {so_dien_thoai}\nĐịa chỉ: {dia_chi}\nSố lượng: {so_luong}"
-                zalo_result = call_zalo_api(customer_id, thread_id, ten_khach_hang, so_dien_thoai, dia_chi, ten_phu_kien, order_message)
-                
-                # Send order notification
-                notification_result = send_order_notification(customer_id, thread_id, order_message)
+                upsert_contact_profile(db, customer_id, thread_id, ten_khach_hang, so_dien_thoai, dia_chi, order_id)
+                add_order_notifications(db, customer_id, thread_id, order_id, f"{ten_khach_hang} {so_dien_thoai} {dia_chi} {ten_phu_kien}", order_message)
+                order = _commit_new_order(db, AccessoryOrder, idempotency_key)
+                if order is None:
+                    order = new_order
+                    remember_contact_profile(customer_id, thread_id, ten_khach_hang, so_dien_thoai, dia_chi)
+                    wake_zalo_dispatcher()
             
-            success_message = f"Đã tạo đơn hàng thành công! Mã đơn hàng của bạn là {order_id}."
-            if zalo_result and zalo_result["status"] == "success":
-                success_message += " Đã tạo nhóm Zalo để theo dõi đơn hàng."
-            elif zalo_result:
-                success_message += f" Lưu ý: {zalo_result['message']}"
+            order_id = order.order_id
+            order_detail = _order_detail(order, ("ma_phu_kien", "ten_phu_kien", "so_luong"))
             
-            if notification_result and notification_result["status"] == "success":
-                success_message += " Đã gửi thông báo đơn hàng cho nhân viên."
-        
+            success_message = f"Đã tạo đơn hàng thành công! Mã đơn hàng của bạn là {order_id}."
+
             return {
                 "status": "success",
                 "message": success_message,
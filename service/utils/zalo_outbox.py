@@ -0,0 +1,176 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import httpx
+from sqlalchemy import exists
+from sqlalchemy.orm import Session, aliased
+
+from config.settings import (
+    ZALO_API_BASE_URL, ZALO_API_TIMEOUT_SECONDS, ZALO_OUTBOX_POLL_SECONDS, ZALO_OUTBOX_MAX_ATTEMPTS
+)
+from database.database import SessionLocal, OrderNotification
+
+# Loại thông báo -> endpoint của Zalo API
+ZALO_ENDPOINTS = {
+    "create_group": "/api/groups/managers",
+    "send_message": "/api/groups/send-message",
+}
+
+_BATCH_SIZE = 50
+# Thời gian giữ chỗ một thông báo đang gửi: worker khác (process khác) không lấy lại trong khoảng này.
+_CLAIM_SECONDS = 60
+_MAX_BACKOFF_SECONDS = 300
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_wakeup: Optional[asyncio.Event] = None
+_worker: Optional[asyncio.Task] = None
+
+def validate_thread_id(thread_id: str) -> bool:
+    """
+    Validate thread_id: must be all digits and at least 9 characters long
+    """
+    return thread_id.isdigit() and len(thread_id) >= 9
+
+def add_order_notifications(db: Session, customer_id: str, thread_id: str, order_id: str, group_name: str, message: str):
+    """
+    Thêm thông báo tạo nhóm Zalo và gửi tin nhắn đơn hàng vào outbox, trong cùng session với đơn hàng
+    (được commit cùng nhau). Chỉ áp dụng cho thread Zalo hợp lệ.
+    """
+    if not validate_thread_id(thread_id):
+        return
+    payloads = {
+        "create_group": {"session_key": customer_id, "thread_id": thread_id, "name": group_name, "message": message},
+        "send_message": {"session_key": customer_id, "thread_id": thread_id, "message": message},
+    }
+    for kind, payload in payloads.items():
+        db.add(OrderNotification(
+            order_id=order_id,
+            customer_id=customer_id,
+            thread_id=thread_id,
+            kind=kind,
+            payload=json.dumps(payload, ensure_ascii=False)
+        ))
+
+def wake_zalo_dispatcher():
+    """Báo cho task nền gửi ngay (an toàn khi gọi từ thread khác, ví dụ tool đồng bộ)."""
+    if _loop is not None and _wakeup is not None and not _loop.is_closed():
+        _loop.call_soon_threadsafe(_wakeup.set)
+
+def _claim_due(db: Session):
+    now = datetime.now(timezone.utc)
+    earlier = aliased(OrderNotification)
+    rows = db.query(OrderNotification).filter(
+        OrderNotification.status == "pending",
+        OrderNotification.next_attempt_at <= now,
+        # Bước sau của một đơn chỉ được gửi khi các bước trước đã xong.
+        ~exists().where(
+            earlier.order_id == OrderNotification.order_id,
+            earlier.id < OrderNotification.id,
+            earlier.status == "pending"
+        )
+    ).order_by(OrderNotification.id.asc()).limit(_BATCH_SIZE).with_for_update(skip_locked=True).all()
+    for row in rows:
+        row.attempts += 1
+        row.next_attempt_at = now + timedelta(seconds=_CLAIM_SECONDS)
+    db.commit()
+    return [(row.id, row.order_id, row.kind, row.payload, row.attempts) for row in rows]
+
+async def _send(client: httpx.AsyncClient, kind: str, payload: str) -> Optional[str]:
+    """Gửi một thông báo; trả về None nếu thành công, ngược lại là mô tả lỗi."""
+    try:
+        response = await client.post(ZALO_ENDPOINTS[kind], content=payload, headers={"Content-Type": "application/json"})
+    except httpx.TimeoutException:
+        return "Timeout khi gọi API Zalo"
+    except httpx.HTTPError as e:
+        return f"Lỗi khi gọi API Zalo: {e}"
+    if response.status_code == 200:
+        return None
+    return f"Lỗi API Zalo: {response.status_code} - {response.text[:500]}"
+
+def _record_result(db: Session, notification_id: int, attempts: int, error: Optional[str]):
+    row = db.get(OrderNotification, notification_id)
+    if row is None:
+        return
+    if error is None:
+        row.status = "sent"
+        row.last_error = None
+    else:
+        row.last_error = error
+        if attempts >= ZALO_OUTBOX_MAX_ATTEMPTS:
+            row.status = "failed"
+        else:
+            backoff = min(2 ** attempts, _MAX_BACKOFF_SECONDS)
+            row.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=backoff)
+    db.commit()
+
+def _release_claim(db: Session, notification_id: int):
+    # Chưa gửi vì bước trước của đơn lỗi: trả lại lượt thử, gửi sau bước trước.
+    row = db.get(OrderNotification, notification_id)
+    if row is not None:
+        row.attempts -= 1
+        row.next_attempt_at = datetime.now(timezone.utc)
+        db.commit()
+
+async def dispatch_pending(client: httpx.AsyncClient) -> int:
+    """
+    Gửi các thông báo đến hạn trong outbox, trả về số thông báo đã xử lý. Thông báo của cùng một đơn
+    được gửi theo thứ tự (tạo nhóm trước, gửi tin nhắn sau); nếu một bước lỗi thì các bước sau chờ lần quét tới.
+    """
+    db = SessionLocal()
+    try:
+        claimed = _claim_due(db)
+        blocked_orders = set()
+        for notification_id, order_id, kind, payload, attempts in claimed:
+            if order_id in blocked_orders:
+                _release_claim(db, notification_id)
+                continue
+            error = await _send(client, kind, payload)
+            if error:
+                blocked_orders.add(order_id)
+                print(f"⚠️ Gửi thông báo Zalo '{kind}' cho đơn {order_id} thất bại (lần {attempts}): {error}")
+            else:
+                print(f"📨 Đã gửi thông báo Zalo '{kind}' cho đơn {order_id}.")
+            _record_result(db, notification_id, attempts, error)
+        return len(claimed)
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Lỗi khi xử lý outbox thông báo Zalo: {e}")
+        return 0
+    finally:
+        db.close()
+
+async def _run():
+    async with httpx.AsyncClient(base_url=ZALO_API_BASE_URL, timeout=ZALO_API_TIMEOUT_SECONDS) as client:
+        while True:
+            _wakeup.clear()
+            # Còn việc (lô đầy hoặc bước tiếp theo của đơn vừa được mở) thì quét tiếp ngay.
+            if await dispatch_pending(client):
+                continue
+            try:
+                await asyncio.wait_for(_wakeup.wait(), ZALO_OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+def start_zalo_dispatcher():
+    """Khởi động task nền gửi thông báo Zalo (gọi khi ứng dụng khởi động)."""
+    global _loop, _wakeup, _worker
+    if _worker is not None and not _worker.done():
+        return
+    _loop = asyncio.get_running_loop()
+    _wakeup = asyncio.Event()
+    _worker = asyncio.create_task(_run())
+    print("✅ Đã khởi động bộ gửi thông báo Zalo.")
+
+async def stop_zalo_dispatcher():
+    """Dừng task nền; thông báo chưa gửi vẫn nằm trong outbox và được gửi ở lần khởi động sau."""
+    global _worker
+    if _worker is None:
+        return
+    _worker.cancel()
+    try:
+        await _worker
+    except asyncio.CancelledError:
+        pass
+    _worker = None
@@ -0,0 +1,34 @@
+import pytest
+
+from service.agents.model_router import (
+    ROUTE_AGENT, ROUTE_FAQ, ROUTE_SMALL_TALK, ROUTE_STORE_INFO, route_turn
+)
+
+@pytest.mark.parametrize("user_input", ["ok", "Oke", "okay", "Vâng", "Dạ", "Được", "ừ", "uk", "Dạ vâng", "ok em"])
+def test_confirmations_go_to_agent(user_input):
+    # Câu xác nhận đặt đơn phải để agent gọi tool tạo đơn.
+    assert route_turn(user_input, has_store_info=True) == ROUTE_AGENT
+
+@pytest.mark.parametrize("user_input", ["Cảm ơn shop", "xin chào", "ok"])
+def test_reply_to_bot_question_goes_to_agent(user_input):
+    last_bot_message = "Anh/chị xác nhận đặt đơn iPhone 15 128GB với thông tin trên chứ ạ?"
+    assert route_turn(user_input, has_store_info=True, last_bot_message=last_bot_message) == ROUTE_AGENT
+
+@pytest.mark.parametrize("user_input", ["xin chào", "Chào shop", "Cảm ơn em nhé", "thanks"])
+def test_small_talk(user_input):
+    assert route_turn(user_input, last_bot_message="Dạ em có thể giúp gì thêm cho anh/chị không ạ") == ROUTE_SMALL_TALK
+
+def test_store_info_requires_prompt_store_info():
+    assert route_turn("shop ở đâu vậy", has_store_info=True) == ROUTE_STORE_INFO
+    assert route_turn("shop ở đâu vậy", has_store_info=False) == ROUTE_AGENT
+
+def test_faq_match():
+    assert route_turn("Shop có giao hàng không?", faq_question="Shop có giao hàng không") == ROUTE_FAQ
+
+@pytest.mark.parametrize("user_input", [
+    "iphone 15 còn hàng không",
+    "Tên Nam, sđt 0912345678",
+    "chào shop cho hỏi iphone 15 pro max giá bao nhiêu",
+])
+def test_everything_else_goes_to_agent(user_input):
+    assert route_turn(user_input, has_store_info=True) == ROUTE_AGENT